@@ -5,8 +5,14 @@ AI Analyzer - анализ влияния изменений состава на
 
 import os
 import re
+import time
 from openai import OpenAI
 from dotenv import load_dotenv
+from ai_cache import make_cache_key, get_cached_response, store_response
+from player_index import PlayerIndex
+from stat_matrix import summarize_player_games
+from team_analytics import format_player_analytics
+from prompt_budget import PromptBuilder
 
 # Импорт для поиска новостей
 try:
@@ -221,7 +227,83 @@ def init_openai():
         return False
 
 
-def analyze_lineup_changes(team_abbrev: str, changes: dict, team_stats: dict) -> str:
+def cached_chat_completion(model: str, messages: list, max_tokens: int, temperature: float,
+                           timeout: float = None, on_delta=None, on_complete=None) -> str:
+    """
+    Запрос к OpenAI через кэш ответов.
+
+    Одинаковый промпт с теми же параметрами возвращается из кэша
+    без обращения к API. Ошибки не кэшируются.
+
+    Args:
+        on_delta: Колбэк (фрагмент текста) - потоковый режим: фрагменты
+                  передаются по мере генерации (из потока запроса);
+                  ответ из кэша приходит одним фрагментом
+        on_complete: Колбэк (источник) после успешного ответа - 'api' или
+                     'cache' (ошибки его не вызывают)
+
+    Returns:
+        Полный текст ответа модели
+    """
+    key = make_cache_key(model, messages, max_tokens=max_tokens, temperature=temperature)
+    cached = get_cached_response(key)
+    if cached is not None:
+        print(f"AI ответ из кэша ({model})")
+        if on_delta is not None:
+            on_delta(cached)
+        if on_complete is not None:
+            on_complete('cache')
+        return cached
+
+    request_params = {}
+    if timeout is not None:
+        request_params['timeout'] = timeout
+
+    if on_delta is not None:
+        content = _stream_chat_completion(model, messages, max_tokens, temperature, on_delta, **request_params)
+    else:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **request_params
+        )
+        content = response.choices[0].message.content
+
+    store_response(key, content, model)
+    if on_complete is not None:
+        on_complete('api')
+    return content
+
+
+def _stream_chat_completion(model, messages, max_tokens, temperature, on_delta, **request_params) -> str:
+    """Потоковый запрос: фрагменты - в on_delta, возвращает собранный текст."""
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        **request_params
+    )
+    parts = []
+    started = time.perf_counter()
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if not parts:
+            print(f"AI первый фрагмент через {time.perf_counter() - started:.1f}с ({model})")
+        parts.append(delta)
+        on_delta(delta)
+    return "".join(parts)
+
+
+def analyze_lineup_changes(team_abbrev: str, changes: dict, team_stats: dict, on_delta=None,
+                           on_complete=None) -> str:
     """
     Анализ влияния изменений состава на других игроков.
 
@@ -229,6 +311,9 @@ def analyze_lineup_changes(team_abbrev: str, changes: dict, team_stats: dict) ->
         team_abbrev: Аббревиатура команды
         changes: Словарь с изменениями {'new_players': [...], 'removed_players': [...]}
         team_stats: Статистика команды за последние игры
+        on_delta: Колбэк потокового вывода (см. cached_chat_completion)
+        on_complete: Колбэк ('api' / 'cache') - только если анализ получен от модели;
+                     сообщения об ошибке, отсутствии ключа или изменений его не вызывают
 
     Returns:
         Текст анализа от AI
@@ -281,18 +366,18 @@ def analyze_lineup_changes(team_abbrev: str, changes: dict, team_stats: dict) ->
 Ответ должен быть на русском языке, кратким и структурированным (максимум 250 слов)."""
 
     try:
-        response = client.chat.completions.create(
+        return cached_chat_completion(
             model="gpt-4o",  # Более точная модель
             messages=[
                 {"role": "system", "content": "Ты NBA аналитик. Даёшь краткие, конкретные прогнозы ТОЛЬКО на основе фактических данных. НЕ делай предположений о возможных изменениях или травмах, если они не указаны явно в промпте."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=500,
-            temperature=0.7
+            temperature=0.7,
+            on_delta=on_delta,
+            on_complete=on_complete
         )
 
-        return response.choices[0].message.content
-
     except Exception as e:
         return f"Ошибка AI анализа: {e}"
 
@@ -365,7 +450,7 @@ def analyze_game_matchup(away_team: dict, home_team: dict, away_stats: dict, hom
 Ответ на русском, кратко (150 слов максимум)."""
 
     try:
-        response = client.chat.completions.create(
+        return cached_chat_completion(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "Ты NBA аналитик. Даёшь краткие превью матчей ТОЛЬКО на основе предоставленных составов и результатов. НЕ предполагай составы или травмы, если они не указаны явно."},
@@ -375,12 +460,41 @@ def analyze_game_matchup(away_team: dict, home_team: dict, away_stats: dict, hom
             temperature=0.7
         )
 
-        return response.choices[0].message.content
-
     except Exception as e:
         return f"Ошибка AI анализа: {e}"
 
 
+# Параметры запроса прогноза игрока (общие для клика и пакетного прогона)
+PLAYER_PROJECTION_MODEL = "gpt-4o"
+PLAYER_PROJECTION_MAX_TOKENS = 1500
+PLAYER_PROJECTION_TEMPERATURE = 0.3
+
+# Бюджет токенов промпта прогноза (вместе с инструкциями) и лимиты разделов.
+# Статистика с трендами и травмы не сокращаются; составы и новости - кратко, если не влезают
+PLAYER_PROJECTION_PROMPT_BUDGET = 5000
+PLAYER_PROJECTION_SECTION_BUDGETS = {
+    'opponent': 300,
+    'lineups': 1200,
+    'news': 900,
+}
+
+# Сколько символов статьи оставлять в кратком варианте новостей
+NEWS_EXCERPT_CHARS = 300
+
+PLAYER_PROJECTION_SYSTEM_PROMPT = """Ты NBA аналитик с фокусом на количественный анализ.
+
+⚠️ КРИТИЧЕСКИ ВАЖНО: В данных есть готовые строки "ТРЕНД ОЧКОВ" и "ТРЕНД МИНУТ".
+Ты ДОЛЖЕН СКОПИРОВАТЬ их ТОЧНО как есть, НЕ МЕНЯЯ порядок чисел!
+
+Ключевые принципы:
+1. ТРЕНДЫ - копируй готовые строки из данных, не пересчитывай!
+2. При выбытии ключевого игрока → его нагрузка перераспределяется другим.
+3. РОЛЬ (минуты, позиция) важнее формы при нестабильном тренде.
+4. БАЗА прогноза = среднее за 3 игры с корректировками.
+5. Диапазон прогноза узкий (4-6 очков).
+6. НЕ делай предположений о возможных выбытиях."""
+
+
 def analyze_player_projection(
     player_name: str,
     player_position: str,
@@ -390,11 +504,167 @@ def analyze_player_projection(
     opponent_stats: dict,
     is_home: bool,
     team_injuries: list = None,
-    team_games: list = None
+    team_games: list = None,
+    player_index: PlayerIndex = None,
+    team_analytics=None,
+    on_delta=None
 ) -> str:
     """
     AI анализ и прогноз статистики конкретного игрока на следующую игру.
 
+    Аргументы - как у build_player_projection_messages; on_delta - колбэк
+    потокового вывода (сравнение с линиями - только в итоговом тексте).
+
+    Returns:
+        (текст прогноза, промпт)
+    """
+    if not client:
+        if not init_openai():
+            return "AI анализ недоступен: не настроен API ключ"
+
+    messages, prompt = build_player_projection_messages(
+        player_name, player_position, team_abbrev, player_stats, opponent_abbrev, opponent_stats,
+        is_home, team_injuries, team_games, player_index, team_analytics
+    )
+
+    try:
+        # Возвращаем и анализ, и промпт для отладки
+        return (complete_player_projection(player_name, messages, on_delta=on_delta), prompt)
+
+    except Exception as e:
+        return (f"Ошибка AI анализа: {e}", "")
+
+
+def complete_player_projection(player_name: str, messages: list, timeout: float = None, on_delta=None) -> str:
+    """
+    Запрос прогноза по готовым сообщениям + сравнение с букмекерскими линиями.
+
+    Ошибки API пробрасываются (повторы - на стороне вызывающего).
+    """
+    if not client:
+        if not init_openai():
+            raise RuntimeError("AI анализ недоступен: не настроен API ключ")
+
+    ai_response = cached_chat_completion(
+        model=PLAYER_PROJECTION_MODEL,
+        messages=messages,
+        max_tokens=PLAYER_PROJECTION_MAX_TOKENS,
+        temperature=PLAYER_PROJECTION_TEMPERATURE,
+        timeout=timeout,
+        on_delta=on_delta
+    )
+
+    # Сравнение с линиями считаем заново и для ответа из кэша - коэффициенты могли обновиться
+    # Диапазоны разбираются по полному ответу - после окончания потока
+    # Парсим прогнозы AI и сравниваем с букмекерскими линиями
+    ai_predictions = parse_ai_prediction_ranges(ai_response)
+    return ai_response + compare_with_bookmaker_odds(player_name, ai_predictions)
+
+
+def _format_news_block(news_data: dict, content_chars: int = None) -> str:
+    """
+    Блок новостей для промпта.
+
+    Args:
+        content_chars: None - полный текст статей, 0 - только заголовки,
+                       N - первые N символов статьи (до конца предложения)
+    """
+    if not news_data['has_relevant_news']:
+        return "\n\nАКТУАЛЬНЫЕ НОВОСТИ: За последние 3 дня релевантных новостей об этом игроке или команде не найдено."
+
+    def article(news):
+        text = f"\n• {news.get('title', '')}"
+        content = news.get('content', '')  # Полный текст новости
+        if content and content_chars != 0:
+            if content_chars is not None and len(content) > content_chars:
+                excerpt = content[:content_chars]
+                sentence_end = excerpt.rfind('. ')
+                content = (excerpt[:sentence_end + 1] if sentence_end > content_chars // 2 else excerpt) + "…"
+            text += f"\n  {content}"
+        return text
+
+    news_text = "\n\nАКТУАЛЬНЫЕ НОВОСТИ (последние 3 дня):"
+    if news_data['player_news']:
+        news_text += "\n\nНовости об игроке:"
+        for news in news_data['player_news'][:3]:
+            news_text += article(news)
+
+    if news_data['team_news']:
+        news_text += "\n\nНовости о команде:"
+        for news in news_data['team_news'][:2]:
+            news_text += article(news)
+    return news_text
+
+
+def _format_lineups_context(player_name: str, team_abbrev: str, team_games: list, player_rows: list,
+                            n_games: int = 10) -> str:
+    """
+    Составы команды в последних n_games играх и сводка по ролям игрока (за 10 игр).
+
+    n_games=0 - только сводка по ролям.
+    """
+    lineups_context = ""
+    if n_games:
+        lineups_context = f"\n\nСОСТАВЫ КОМАНДЫ {team_abbrev} В ПОСЛЕДНИХ {n_games} ИГРАХ:"
+    for i, game in enumerate(team_games[:n_games], 1):
+        matchup = game.get('matchup', 'N/A')
+        result = game.get('result', 'N/A')
+        game_date = game.get('date', '')
+        starters = game.get('starters', [])
+
+        if starters:
+            starters_names = [s.get('name', 'Unknown') for s in starters[:5]]
+            lineups_context += f"\n  Игра {i}. [{game_date}] {matchup} ({result}):"
+            lineups_context += f"\n    Старт: {', '.join(starters_names)}"
+
+            # Игрок среди всех игроков матча (стартеры + скамейка)
+            p = player_rows[i - 1]
+            if p is not None:
+                is_starter = p.get('is_starter', True)
+                mins = p.get('min', 'N/A')
+                role_marker = "СТАРТ" if is_starter else "СКАМЕЙКА"
+                lineups_context += f"\n    → {player_name} [{role_marker}]: {p.get('pts', 0)}pts, {p.get('reb', 0)}reb, {p.get('ast', 0)}ast, {mins} мин"
+            else:
+                # Игрок не найден - он не играл в этой игре
+                lineups_context += f"\n    → {player_name}: НЕ ИГРАЛ (травма/отдых)"
+
+    # Добавляем сводку по ролям
+    starter_count = 0
+    bench_count = 0
+    dnp_count = 0
+    for p in player_rows[:10]:
+        if p is None:
+            dnp_count += 1
+        elif p.get('is_starter', True):
+            starter_count += 1
+        else:
+            bench_count += 1
+
+    lineups_context += f"\n\n📊 СВОДКА ПО РОЛЯМ {player_name} (последние 10 игр):"
+    lineups_context += f"\n  - В старте: {starter_count} игр"
+    lineups_context += f"\n  - Со скамейки: {bench_count} игр"
+    if dnp_count > 0:
+        lineups_context += f"\n  - Не играл: {dnp_count} игр"
+    lineups_context += f"\n\n💡 АНАЛИЗ: Как менялась статистика {player_name} в зависимости от роли (старт vs скамейка) и состава партнёров?"
+    return lineups_context
+
+
+def build_player_projection_messages(
+    player_name: str,
+    player_position: str,
+    team_abbrev: str,
+    player_stats: list,
+    opponent_abbrev: str,
+    opponent_stats: dict,
+    is_home: bool,
+    team_injuries: list = None,
+    team_games: list = None,
+    player_index: PlayerIndex = None,
+    team_analytics=None
+) -> tuple:
+    """
+    Промпт прогноза статистики игрока на следующую игру (без запроса к API).
+
     Args:
         player_name: Имя игрока
         player_position: Позиция игрока
@@ -405,49 +675,23 @@ def analyze_player_projection(
         is_home: Домашняя игра или нет
         team_injuries: Список травмированных игроков команды (OUT)
         team_games: Данные о последних 5 играх команды (составы, результаты)
+        player_index: PlayerIndex по team_games (None - построить)
+        team_analytics: TeamAnalytics команды - на 36 минут, скользящие средние, доли (опционально)
 
     Returns:
-        Текст с прогнозом статистики
+        (messages для chat completions, текст промпта)
     """
-    if not client:
-        if not init_openai():
-            return "AI анализ недоступен: не настроен API ключ"
-
-    # Функция конвертации минут из строки "MM:SS" в число
-    def parse_minutes(min_val):
-        if min_val is None:
-            return 0
-        if isinstance(min_val, (int, float)):
-            return float(min_val)
-        if isinstance(min_val, str) and ':' in min_val:
-            try:
-                parts = min_val.split(':')
-                return int(parts[0]) + int(parts[1]) / 60
-            except:
-                return 0
-        try:
-            return float(min_val)
-        except:
-            return 0
-
     # Форматируем статистику игрока
     player_stats_text = ""
     if player_stats:
-        # Считаем средние только по играм где игрок НЕ был травмирован
-        played_games = [g for g in player_stats if not g.get('injured', False)]
-        injured_games = [g for g in player_stats if g.get('injured', False)]
-
-        if played_games:
-            avg_pts = sum(g.get('pts', 0) for g in played_games) / len(played_games)
-            avg_reb = sum(g.get('reb', 0) for g in played_games) / len(played_games)
-            avg_ast = sum(g.get('ast', 0) for g in played_games) / len(played_games)
-            avg_min = sum(parse_minutes(g.get('min')) for g in played_games) / len(played_games)
-            avg_stl = sum(g.get('stl', 0) for g in played_games) / len(played_games)
-            avg_blk = sum(g.get('blk', 0) for g in played_games) / len(played_games)
-
-            games_played_note = f" (из {len(player_stats)} последних игр команды, играл в {len(played_games)})"
+        # Считаем средние только по играм где игрок НЕ был травмирован (маска в stat_matrix)
+        averages = summarize_player_games(player_stats)
+        avg_pts, avg_reb, avg_ast = averages['pts'], averages['reb'], averages['ast']
+        avg_min, avg_stl, avg_blk = averages['min'], averages['stl'], averages['blk']
+
+        if averages['games_played']:
+            games_played_note = f" (из {len(player_stats)} последних игр команды, играл в {averages['games_played']})"
         else:
-            avg_pts = avg_reb = avg_ast = avg_min = avg_stl = avg_blk = 0
             games_played_note = " (игрок не играл в последних 10 играх - ТРАВМА)"
 
         player_stats_text = f"""
@@ -505,6 +749,9 @@ def analyze_player_projection(
         player_stats_text += f"\nТРЕНД МИНУТ: {'→'.join(min_trend_reversed)}"
         player_stats_text += f"\n" + "="*60
 
+    # Скользящие средние, на 36 минут, доля минут/владений, старт vs скамейка
+    player_stats_text += format_player_analytics(team_analytics, player_name)
+
     # Форматируем информацию о сопернике
     opponent_text = ""
     if opponent_stats and 'games' in opponent_stats:
@@ -533,30 +780,12 @@ def analyze_player_projection(
         days=3
     )
 
-    # Формируем блок новостей для промпта
-    news_text = ""
-    if news_data['has_relevant_news']:
-        news_text = "\n\nАКТУАЛЬНЫЕ НОВОСТИ (последние 3 дня):"
-
-        if news_data['player_news']:
-            news_text += "\n\nНовости об игроке:"
-            for news in news_data['player_news'][:3]:
-                title = news.get('title', '')
-                content = news.get('content', '')  # Полный текст новости
-                news_text += f"\n• {title}"
-                if content:
-                    news_text += f"\n  {content}"
-
-        if news_data['team_news']:
-            news_text += "\n\nНовости о команде:"
-            for news in news_data['team_news'][:2]:
-                title = news.get('title', '')
-                content = news.get('content', '')  # Полный текст новости
-                news_text += f"\n• {title}"
-                if content:
-                    news_text += f"\n  {content}"
-    else:
-        news_text = "\n\nАКТУАЛЬНЫЕ НОВОСТИ: За последние 3 дня релевантных новостей об этом игроке или команде не найдено."
+    # Блок новостей: полный текст -> начало статей -> только заголовки (по бюджету)
+    news_variants = [
+        _format_news_block(news_data),
+        _format_news_block(news_data, content_chars=NEWS_EXCERPT_CHARS),
+        _format_news_block(news_data, content_chars=0),
+    ]
 
     # Добавляем информацию о травмах команды из RotoWire (со статистикой)
     injuries_text = ""
@@ -601,70 +830,15 @@ def analyze_player_projection(
     else:
         injuries_text = f"\n\nСОСТАВ КОМАНДЫ {team_abbrev}: Полный состав, нет травмированных игроков."
 
-    # Добавляем информацию о составах в последних 10 играх
-    lineups_context = ""
-
-    # Функция для сравнения имён по фамилии
-    def get_last_name(name):
-        parts = name.replace('.', '').split()
-        return parts[-1].lower() if parts else ''
-
-    player_last_name = get_last_name(player_name)
-
+    # Составы команды: 10 игр -> 5 игр -> только сводка по ролям (по бюджету)
+    lineups_variants = [""]
     if team_games:
-        lineups_context = f"\n\nСОСТАВЫ КОМАНДЫ {team_abbrev} В ПОСЛЕДНИХ 10 ИГРАХ:"
-        for i, game in enumerate(team_games[:10], 1):
-            matchup = game.get('matchup', 'N/A')
-            result = game.get('result', 'N/A')
-            game_date = game.get('date', '')
-            starters = game.get('starters', [])
-            all_players = game.get('all_players', starters)
-            bench = game.get('bench', [])
-
-            if starters:
-                starters_names = [s.get('name', 'Unknown') for s in starters[:5]]
-                lineups_context += f"\n  Игра {i}. [{game_date}] {matchup} ({result}):"
-                lineups_context += f"\n    Старт: {', '.join(starters_names)}"
-
-                # Ищем игрока во всех игроках матча (стартеры + скамейка)
-                player_found = False
-                for p in all_players:
-                    if get_last_name(p.get('name', '')) == player_last_name:
-                        is_starter = p.get('is_starter', True)
-                        mins = p.get('min', 'N/A')
-                        role_marker = "СТАРТ" if is_starter else "СКАМЕЙКА"
-                        lineups_context += f"\n    → {player_name} [{role_marker}]: {p.get('pts', 0)}pts, {p.get('reb', 0)}reb, {p.get('ast', 0)}ast, {mins} мин"
-                        player_found = True
-                        break
-
-                # Если игрок не найден - он не играл в этой игре
-                if not player_found:
-                    lineups_context += f"\n    → {player_name}: НЕ ИГРАЛ (травма/отдых)"
-
-        # Добавляем сводку по ролям
-        starter_count = 0
-        bench_count = 0
-        dnp_count = 0
-        for game in team_games[:10]:
-            all_players = game.get('all_players', game.get('starters', []))
-            found = False
-            for p in all_players:
-                if get_last_name(p.get('name', '')) == player_last_name:
-                    if p.get('is_starter', True):
-                        starter_count += 1
-                    else:
-                        bench_count += 1
-                    found = True
-                    break
-            if not found:
-                dnp_count += 1
-
-        lineups_context += f"\n\n📊 СВОДКА ПО РОЛЯМ {player_name} (последние 10 игр):"
-        lineups_context += f"\n  - В старте: {starter_count} игр"
-        lineups_context += f"\n  - Со скамейки: {bench_count} игр"
-        if dnp_count > 0:
-            lineups_context += f"\n  - Не играл: {dnp_count} игр"
-        lineups_context += f"\n\n💡 АНАЛИЗ: Как менялась статистика {player_name} в зависимости от роли (старт vs скамейка) и состава партнёров?"
+        # Строки игрока по играм - из индекса имён, без сравнения с каждым игроком
+        if player_index is None:
+            player_index = PlayerIndex(team_games)
+        player_rows = player_index.player_rows(player_name)
+        lineups_variants = [_format_lineups_context(player_name, team_abbrev, team_games, player_rows, n_games)
+                            for n_games in (10, 5, 0)]
 
     # Анализ команды для контекста
     team_context = ""
@@ -680,17 +854,18 @@ def analyze_player_projection(
         team_context = f"\n\nКОНТЕКСТ КОМАНДЫ {team_abbrev}:"
         team_context += f"\nПоследние 10 игр - анализ производительности основного состава"
 
-    prompt = f"""Ты эксперт по NBA аналитике. Дай прогноз статистики игрока на предстоящую игру.
+    def render(sections):
+        return f"""Ты эксперт по NBA аналитике. Дай прогноз статистики игрока на предстоящую игру.
 
 ИГРОК: {player_name} ({player_position})
 КОМАНДА: {team_abbrev}
 СОПЕРНИК: {opponent_abbrev} ({venue})
-{player_stats_text}
-{opponent_text}
+{sections.get('stats', '')}
+{sections.get('opponent', '')}
 {team_context}
-{lineups_context}
-{injuries_text}
-{news_text}
+{sections.get('lineups', '')}
+{sections.get('injuries', '')}
+{sections.get('news', '')}
 
 ⚠️ КРИТИЧЕСКИ ВАЖНО ПРО ПОРЯДОК ИГР:
 - Игра №1 = САМАЯ ПОСЛЕДНЯЯ игра (НОВЕЙШАЯ, самая свежая дата)
@@ -779,39 +954,21 @@ def analyze_player_projection(
 
 Ответ на русском, структурированно, максимум 400 слов."""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": """Ты NBA аналитик с фокусом на количественный анализ.
-
-⚠️ КРИТИЧЕСКИ ВАЖНО: В данных есть готовые строки "ТРЕНД ОЧКОВ" и "ТРЕНД МИНУТ".
-Ты ДОЛЖЕН СКОПИРОВАТЬ их ТОЧНО как есть, НЕ МЕНЯЯ порядок чисел!
-
-Ключевые принципы:
-1. ТРЕНДЫ - копируй готовые строки из данных, не пересчитывай!
-2. При выбытии ключевого игрока → его нагрузка перераспределяется другим.
-3. РОЛЬ (минуты, позиция) важнее формы при нестабильном тренде.
-4. БАЗА прогноза = среднее за 3 игры с корректировками.
-5. Диапазон прогноза узкий (4-6 очков).
-6. НЕ делай предположений о возможных выбытиях."""},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.3
-        )
-
-        ai_response = response.choices[0].message.content
-
-        # Парсим прогнозы AI и сравниваем с букмекерскими линиями
-        ai_predictions = parse_ai_prediction_ranges(ai_response)
-        odds_comparison = compare_with_bookmaker_odds(player_name, ai_predictions)
-
-        # Возвращаем и анализ, и промпт для отладки
-        return (ai_response + odds_comparison, prompt)
-
-    except Exception as e:
-        return (f"Ошибка AI анализа: {e}", "")
+    # Разделы укладываются в бюджет токенов: сначала сокращаются новости, потом составы
+    builder = PromptBuilder("player_projection", PLAYER_PROJECTION_PROMPT_BUDGET, PLAYER_PROJECTION_MODEL)
+    builder.add_fixed(render({}))
+    builder.add('stats', player_stats_text, priority=0, required=True)
+    builder.add('injuries', injuries_text, priority=1, required=True)
+    builder.add('opponent', opponent_text, priority=2, budget=PLAYER_PROJECTION_SECTION_BUDGETS['opponent'])
+    builder.add('lineups', lineups_variants, priority=3, budget=PLAYER_PROJECTION_SECTION_BUDGETS['lineups'])
+    builder.add('news', news_variants, priority=4, budget=PLAYER_PROJECTION_SECTION_BUDGETS['news'])
+    prompt = render(builder.build())
+
+    messages = [
+        {"role": "system", "content": PLAYER_PROJECTION_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    return messages, prompt
 
 
 # Тест
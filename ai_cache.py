@@ -0,0 +1,140 @@
+"""
+AI Cache - постоянный кэш ответов OpenAI.
+
+Ключ - SHA-256 от полностью собранных сообщений и параметров модели.
+Любое изменение входных данных (статистика, травмы, новости, соперник)
+меняет промпт, а значит и ключ - старая запись просто не находится.
+Вытеснение по LRU + TTL.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from cache_metrics import record_hit, record_miss, record_eviction, set_cache_file_size
+
+# Файл кэша ответов AI
+AI_CACHE_FILE = "ai_cache.json"  # Сохраняем в текущую директорию
+
+# Максимум записей в кэше (LRU)
+AI_CACHE_MAX_ENTRIES = 300
+
+# Время жизни ответа (часы)
+AI_CACHE_TTL_HOURS = 12
+
+_ai_cache = None  # OrderedDict {key: {'response': str, 'model': str, 'created': ts}}
+_ai_cache_lock = threading.Lock()
+
+
+def make_cache_key(model: str, messages: list, **params) -> str:
+    """
+    Ключ кэша: хэш сообщений + модель + параметры генерации.
+
+    Args:
+        model: Название модели
+        messages: Список сообщений в формате OpenAI
+        **params: max_tokens, temperature и т.д.
+    """
+    payload = json.dumps(
+        {'model': model, 'messages': messages, 'params': params},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _load_ai_cache() -> OrderedDict:
+    """Загрузка кэша с диска (один раз за процесс)."""
+    global _ai_cache
+    if _ai_cache is None:
+        _ai_cache = OrderedDict()
+        try:
+            if os.path.exists(AI_CACHE_FILE):
+                with open(AI_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get('entries', [])
+                # На диске записи лежат от старых к новым - порядок LRU сохраняется
+                for entry in entries:
+                    _ai_cache[entry['key']] = entry
+                print(f"Загружен AI кэш: {len(_ai_cache)} ответов")
+                set_cache_file_size('ai', AI_CACHE_FILE, len(_ai_cache))
+        except Exception as e:
+            print(f"Ошибка загрузки AI кэша: {e}")
+            _ai_cache = OrderedDict()
+    return _ai_cache
+
+
+def _save_ai_cache():
+    """Сохранение кэша на диск."""
+    try:
+        tmp_file = AI_CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'entries': list(_ai_cache.values())}, f, ensure_ascii=False)
+        os.replace(tmp_file, AI_CACHE_FILE)
+        set_cache_file_size('ai', AI_CACHE_FILE, len(_ai_cache))
+    except Exception as e:
+        print(f"Ошибка сохранения AI кэша: {e}")
+
+
+def _is_expired(entry: dict) -> bool:
+    return time.time() - entry.get('created', 0) > AI_CACHE_TTL_HOURS * 3600
+
+
+def get_cached_response(key: str) -> Optional[str]:
+    """Ответ из кэша или None (нет записи / истёк TTL)."""
+    with _ai_cache_lock:
+        cache = _load_ai_cache()
+        entry = cache.get(key)
+        if entry is None:
+            record_miss('ai')
+            return None
+
+        if _is_expired(entry):
+            del cache[key]
+            record_eviction('ai')
+            record_miss('ai', invalidated=True)
+            _save_ai_cache()
+            return None
+
+        # Недавно использованные - в конец (LRU)
+        cache.move_to_end(key)
+        record_hit('ai', time.time() - entry.get('created', 0))
+        return entry['response']
+
+
+def store_response(key: str, response: str, model: str = ''):
+    """Сохранение ответа в кэш с вытеснением старых записей."""
+    if not response:
+        return
+
+    with _ai_cache_lock:
+        cache = _load_ai_cache()
+        cache[key] = {
+            'key': key,
+            'response': response,
+            'model': model,
+            'created': time.time(),
+        }
+        cache.move_to_end(key)
+
+        # Сначала выкидываем просроченные, потом самые давно использованные
+        expired_keys = [k for k, e in cache.items() if _is_expired(e)]
+        for old_key in expired_keys:
+            del cache[old_key]
+        evicted = len(expired_keys)
+        while len(cache) > AI_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+            evicted += 1
+        record_eviction('ai', evicted)
+
+        _save_ai_cache()
+
+
+def clear_ai_cache():
+    """Полная очистка кэша."""
+    global _ai_cache
+    with _ai_cache_lock:
+        _ai_cache = OrderedDict()
+        _save_ai_cache()
@@ -5,9 +5,13 @@
 
 import os
 import csv
+import time
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from cache_metrics import record_hit, record_miss, set_cache_file_size
+from name_resolver import get_resolver, SOURCE_ODDS, SOURCE_NEWS_RU
+
 # Путь к файлу с коэффициентами (можно переопределить)
 DEFAULT_ODDS_FILE = r"D:\nba-lineups-monitor\line stats\nba_players.csv"
 
@@ -352,12 +356,20 @@ def normalize_player_name(name: str) -> str:
 
 def get_english_name(russian_name: str) -> Optional[str]:
     """Получить английское имя по русскому."""
-    return RUSSIAN_TO_ENGLISH_PLAYERS.get(russian_name)
+    return RUSSIAN_TO_ENGLISH_PLAYERS.get(russian_name) or get_resolver().canonical_name(russian_name)
 
 
 def get_russian_name(english_name: str) -> Optional[str]:
-    """Получить русское имя по английскому."""
-    return ENGLISH_TO_RUSSIAN_PLAYERS.get(english_name)
+    """Получить русское имя по английскому (любое написание - через справочник имён)."""
+    if english_name in ENGLISH_TO_RUSSIAN_PLAYERS:
+        return ENGLISH_TO_RUSSIAN_PLAYERS[english_name]
+    aliases = get_resolver().aliases(english_name, sources=(SOURCE_ODDS, SOURCE_NEWS_RU))
+    return aliases[0] if aliases else None
+
+
+def odds_key(player: str) -> str:
+    """Ключ коэффициентов: id игрока из справочника имён, иначе нормализованное имя."""
+    return get_resolver().resolve(player) or normalize_player_name(player)
 
 
 def load_odds_from_csv(file_path: str = DEFAULT_ODDS_FILE) -> Dict[str, List[PlayerOdds]]:
@@ -365,7 +377,7 @@ def load_odds_from_csv(file_path: str = DEFAULT_ODDS_FILE) -> Dict[str, List[Pla
     Загрузка коэффициентов из CSV файла.
 
     Returns:
-        Словарь {normalized_player_name: [PlayerOdds, ...]}
+        Словарь {odds_key(игрок): [PlayerOdds, ...]} - id игрока или нормализованное имя
     """
     if not os.path.exists(file_path):
         print(f"Файл не найден: {file_path}")
@@ -447,11 +459,11 @@ def load_odds_from_csv(file_path: str = DEFAULT_ODDS_FILE) -> Dict[str, List[Pla
                 under_odds=odds_data['under'] or 0
             )
 
-            # Нормализуем имя для поиска
-            norm_name = normalize_player_name(player)
-            if norm_name not in odds_by_player:
-                odds_by_player[norm_name] = []
-            odds_by_player[norm_name].append(player_odds)
+            # Ключ для поиска - id игрока (одно обращение к dict при поиске)
+            key = odds_key(player)
+            if key not in odds_by_player:
+                odds_by_player[key] = []
+            odds_by_player[key].append(player_odds)
 
     return odds_by_player
 
@@ -479,6 +491,11 @@ def find_player_odds(
     Returns:
         Список найденных коэффициентов
     """
+    # Игрок известен справочнику имён - прямое попадание по id
+    player_id = get_resolver().resolve(player_name)
+    if player_id is not None and player_id in odds_data:
+        return [odds for odds in odds_data[player_id] if stat_type is None or odds.stat_type == stat_type]
+
     # Пробуем найти по английскому имени
     norm_name = normalize_player_name(player_name)
 
@@ -634,20 +651,29 @@ def format_odds_comparison(player_name: str, comparisons: List[Dict]) -> str:
 
 # Глобальный кэш загруженных данных
 _odds_cache = None
+_odds_loaded_at = None
+
+
+def _load_odds_into_cache():
+    global _odds_cache, _odds_loaded_at
+    _odds_cache = load_odds_from_csv()
+    _odds_loaded_at = time.time()
+    set_cache_file_size('odds', DEFAULT_ODDS_FILE, len(_odds_cache))
 
 
 def get_cached_odds() -> Dict[str, List[PlayerOdds]]:
     """Получить закэшированные данные или загрузить."""
-    global _odds_cache
     if _odds_cache is None:
-        _odds_cache = load_odds_from_csv()
+        record_miss('odds')
+        _load_odds_into_cache()
+    else:
+        record_hit('odds', time.time() - _odds_loaded_at)
     return _odds_cache
 
 
 def reload_odds():
     """Перезагрузить данные."""
-    global _odds_cache
-    _odds_cache = load_odds_from_csv()
+    _load_odds_into_cache()
     return _odds_cache
 
 
@@ -0,0 +1,203 @@
+"""
+Cache Metrics - счётчики попаданий/промахов и свежести для всех слоёв кэша.
+
+Слои: lineups, historical, team_stats, boxscores, ai, odds.
+По каждому слою: hits, misses, stale (отдали устаревшее), invalidations
+(запись была, но признана неактуальной), evictions (вытеснение LRU/TTL),
+размер (записи, байты) и распределение возраста отданных записей.
+Потокобезопасно - кэши пишутся из фоновых потоков.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Optional
+
+# Файл для выгрузки метрик
+CACHE_METRICS_FILE = "cache_metrics.json"  # Сохраняем в текущую директорию
+
+# Слои кэша (порядок - для отображения)
+CACHE_LAYERS = ('lineups', 'historical', 'team_stats', 'boxscores', 'ai', 'odds')
+
+# Границы корзин возраста (минуты); всё что больше последней - в '>24h'
+AGE_BUCKETS = (
+    (5, '<5m'),
+    (30, '<30m'),
+    (60, '<1h'),
+    (240, '<4h'),
+    (720, '<12h'),
+    (1440, '<24h'),
+)
+AGE_OVERFLOW_BUCKET = '>24h'
+
+_metrics_lock = threading.Lock()
+_started_at = datetime.now()
+
+
+def _new_layer() -> dict:
+    ages = {label: 0 for _, label in AGE_BUCKETS}
+    ages[AGE_OVERFLOW_BUCKET] = 0
+    return {
+        'hits': 0,
+        'misses': 0,
+        'stale': 0,
+        'invalidations': 0,
+        'evictions': 0,
+        'entries': None,
+        'bytes': None,
+        'ages': ages,
+    }
+
+
+_metrics = {layer: _new_layer() for layer in CACHE_LAYERS}
+
+
+def _layer(layer: str) -> dict:
+    if layer not in _metrics:
+        _metrics[layer] = _new_layer()
+    return _metrics[layer]
+
+
+def _age_bucket(age_seconds: float) -> str:
+    minutes = age_seconds / 60
+    for limit, label in AGE_BUCKETS:
+        if minutes < limit:
+            return label
+    return AGE_OVERFLOW_BUCKET
+
+
+def record_hit(layer: str, age_seconds: Optional[float] = None):
+    """Запись отдана из кэша (age_seconds - возраст записи)."""
+    with _metrics_lock:
+        data = _layer(layer)
+        data['hits'] += 1
+        if age_seconds is not None:
+            data['ages'][_age_bucket(age_seconds)] += 1
+
+
+def record_miss(layer: str, invalidated: bool = False):
+    """Записи нет (или она неактуальна) - идём в источник."""
+    with _metrics_lock:
+        data = _layer(layer)
+        data['misses'] += 1
+        if invalidated:
+            data['invalidations'] += 1
+
+
+def record_stale(layer: str, age_seconds: Optional[float] = None):
+    """Отдали устаревшую запись (источник недоступен или ещё не обновлён)."""
+    with _metrics_lock:
+        data = _layer(layer)
+        data['stale'] += 1
+        if age_seconds is not None:
+            data['ages'][_age_bucket(age_seconds)] += 1
+
+
+def record_eviction(layer: str, count: int = 1):
+    """Записи вытеснены (LRU / TTL)."""
+    if count <= 0:
+        return
+    with _metrics_lock:
+        _layer(layer)['evictions'] += count
+
+
+def set_cache_size(layer: str, entries: Optional[int] = None, size_bytes: Optional[int] = None):
+    """Текущий размер кэша: число записей и/или байты на диске."""
+    with _metrics_lock:
+        data = _layer(layer)
+        if entries is not None:
+            data['entries'] = entries
+        if size_bytes is not None:
+            data['bytes'] = size_bytes
+
+
+def set_cache_file_size(layer: str, path: str, entries: Optional[int] = None):
+    """Размер кэша по файлу на диске."""
+    try:
+        size_bytes = os.path.getsize(path)
+    except OSError:
+        size_bytes = None
+    set_cache_size(layer, entries, size_bytes)
+
+
+def age_since(timestamp: str) -> Optional[float]:
+    """Возраст в секундах для метки 'YYYY-MM-DD HH:MM:SS' (None если не распознана)."""
+    try:
+        cached_time = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+    return (datetime.now() - cached_time).total_seconds()
+
+
+def get_metrics() -> dict:
+    """Копия всех метрик с вычисленным hit rate."""
+    with _metrics_lock:
+        layers = {}
+        for layer, data in _metrics.items():
+            copy = dict(data)
+            copy['ages'] = dict(data['ages'])
+            lookups = data['hits'] + data['misses'] + data['stale']
+            copy['hit_rate'] = round(data['hits'] / lookups, 3) if lookups else None
+            layers[layer] = copy
+
+    return {
+        'since': _started_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'layers': layers,
+    }
+
+
+def dump_metrics(path: str = CACHE_METRICS_FILE) -> str:
+    """Выгрузка метрик в JSON. Возвращает путь к файлу."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(get_metrics(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def reset_metrics():
+    """Сброс счётчиков (размеры кэшей сохраняются)."""
+    global _started_at
+    with _metrics_lock:
+        for layer, data in _metrics.items():
+            fresh = _new_layer()
+            fresh['entries'] = data['entries']
+            fresh['bytes'] = data['bytes']
+            _metrics[layer] = fresh
+        _started_at = datetime.now()
+
+
+def _format_bytes(size_bytes) -> str:
+    if size_bytes is None:
+        return '-'
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    if size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / 1024 / 1024:.1f} MB"
+
+
+def format_metrics_report() -> str:
+    """Текстовая таблица метрик (для окна диагностики и консоли)."""
+    metrics = get_metrics()
+    lines = [f"Cache metrics since {metrics['since']} (now {metrics['generated_at']})", ""]
+
+    header = f"{'layer':<11}{'hits':>7}{'miss':>7}{'rate':>7}{'stale':>7}{'inval':>7}{'evict':>7}{'entries':>9}{'size':>10}"
+    lines.append(header)
+    lines.append('-' * len(header))
+    for layer, data in metrics['layers'].items():
+        rate = f"{data['hit_rate'] * 100:.0f}%" if data['hit_rate'] is not None else '-'
+        entries = data['entries'] if data['entries'] is not None else '-'
+        lines.append(
+            f"{layer:<11}{data['hits']:>7}{data['misses']:>7}{rate:>7}{data['stale']:>7}"
+            f"{data['invalidations']:>7}{data['evictions']:>7}{entries:>9}{_format_bytes(data['bytes']):>10}"
+        )
+
+    lines.append("")
+    lines.append("Age of served entries:")
+    labels = [label for _, label in AGE_BUCKETS] + [AGE_OVERFLOW_BUCKET]
+    lines.append(f"{'layer':<11}" + ''.join(f"{label:>7}" for label in labels))
+    for layer, data in metrics['layers'].items():
+        lines.append(f"{layer:<11}" + ''.join(f"{data['ages'][label]:>7}" for label in labels))
+
+    return "\n".join(lines)
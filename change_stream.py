@@ -0,0 +1,314 @@
+"""
+Change Stream - отдача изменений составов внешним сервисам.
+
+- Локальный HTTP сервер:
+    GET /events          - Server-Sent Events (поддерживает Last-Event-ID и ?since=N)
+    GET /changes?since=N - JSON со всеми событиями после N (для поллинга)
+    GET /health          - состояние
+- Исходящие webhooks: пачки событий POST'ом, с повторами при ошибках.
+
+Каждое событие получает монотонный номер seq, который переживает
+перезапуск приложения, - клиент может продолжить с последнего номера.
+
+Настройка через .env:
+    CHANGE_STREAM_HOST=127.0.0.1
+    CHANGE_STREAM_PORT=8765          (0 - сервер выключен)
+    CHANGE_WEBHOOK_URLS=http://localhost:9000/lineups,http://...
+    CHANGE_WEBHOOK_BATCH_MS=200
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Файл состояния: последний seq и хвост событий для resume после перезапуска
+CHANGE_STREAM_STATE_FILE = "change_stream_state.json"  # Сохраняем в текущую директорию
+
+# Сколько последних событий хранить для resume
+CHANGE_STREAM_BUFFER_SIZE = 500
+
+# Интервал heartbeat-комментариев SSE (секунды)
+SSE_HEARTBEAT_SECONDS = 15
+
+# Webhooks: максимум событий в пачке и число повторов
+WEBHOOK_MAX_BATCH = 100
+WEBHOOK_MAX_RETRIES = 5
+WEBHOOK_TIMEOUT_SECONDS = 5
+
+
+class ChangeStream:
+    """Буфер событий с монотонными номерами + HTTP сервер + webhooks."""
+
+    def __init__(self, host='127.0.0.1', port=8765, webhook_urls=None, batch_ms=200):
+        self.host = host
+        self.port = port
+        self.batch_seconds = batch_ms / 1000
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=CHANGE_STREAM_BUFFER_SIZE)
+        self.last_seq = 0
+        self.clients = 0
+        self._server = None
+        self._webhook_queues = {}
+        self._load_state()
+
+        for url in webhook_urls or []:
+            self._start_webhook_sender(url)
+
+    # ===== Состояние =====
+
+    def _load_state(self):
+        try:
+            if os.path.exists(CHANGE_STREAM_STATE_FILE):
+                with open(CHANGE_STREAM_STATE_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.last_seq = data.get('last_seq', 0)
+                self._events.extend(data.get('events', []))
+                print(f"[STREAM] Восстановлено: seq={self.last_seq}, событий в буфере: {len(self._events)}")
+        except Exception as e:
+            print(f"[STREAM] Ошибка загрузки состояния: {e}")
+
+    def _save_state(self):
+        try:
+            tmp_file = CHANGE_STREAM_STATE_FILE + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'last_seq': self.last_seq, 'events': list(self._events)}, f, ensure_ascii=False)
+            os.replace(tmp_file, CHANGE_STREAM_STATE_FILE)
+        except Exception as e:
+            print(f"[STREAM] Ошибка сохранения состояния: {e}")
+
+    # ===== Публикация =====
+
+    def publish(self, changes: list) -> list:
+        """
+        Присвоение номеров и рассылка событий.
+
+        Тестовые изменения (кнопка Test Change, 'simulated') наружу не уходят
+        и номеров не получают.
+
+        Returns:
+            События с полями seq и published_at
+        """
+        changes = [change for change in changes if not change.get('simulated')]
+        if not changes:
+            return []
+        published_at = datetime.now().isoformat(timespec='milliseconds')
+        with self._cond:
+            events = []
+            for change in changes:
+                self.last_seq += 1
+                events.append(dict(change, seq=self.last_seq, published_at=published_at))
+            self._events.extend(events)
+            self._save_state()
+            self._cond.notify_all()
+
+        for event_queue in self._webhook_queues.values():
+            for event in events:
+                event_queue.put(event)
+
+        return events
+
+    def events_since(self, since: int) -> tuple:
+        """
+        События с seq > since.
+
+        Returns:
+            (events, gap) - gap=True если часть событий уже вытеснена из буфера
+        """
+        with self._cond:
+            events = [e for e in self._events if e['seq'] > since]
+            first_seq = self._events[0]['seq'] if self._events else self.last_seq + 1
+        gap = since + 1 < first_seq and since < self.last_seq
+        return events, gap
+
+    def wait_for_events(self, since: int, timeout: float) -> bool:
+        """Ожидание событий новее since. True - есть новые."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.last_seq > since, timeout=timeout)
+
+    # ===== HTTP =====
+
+    def start_server(self):
+        """Запуск HTTP сервера в фоновом потоке."""
+        stream = self
+
+        class Handler(_ChangeStreamHandler):
+            change_stream = stream
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, name='change-stream', daemon=True)
+        thread.start()
+        print(f"[STREAM] SSE: http://{self.host}:{self.port}/events")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+
+    # ===== Webhooks =====
+
+    def _start_webhook_sender(self, url):
+        event_queue = queue.Queue()
+        self._webhook_queues[url] = event_queue
+        thread = threading.Thread(target=self._webhook_loop, args=(url, event_queue),
+                                  name=f"webhook-{url}", daemon=True)
+        thread.start()
+        print(f"[STREAM] Webhook: {url}")
+
+    def _webhook_loop(self, url, event_queue):
+        """Отправка событий пачками: ждём batch_ms после первого события, затем POST с повторами."""
+        while True:
+            batch = [event_queue.get()]
+            deadline = time.monotonic() + self.batch_seconds
+            while len(batch) < WEBHOOK_MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(event_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._send_webhook_batch(url, batch)
+
+    def _send_webhook_batch(self, url, batch):
+        payload = {
+            'events': batch,
+            'first_seq': batch[0]['seq'],
+            'last_seq': batch[-1]['seq'],
+        }
+        delay = 0.5
+        for attempt in range(1, WEBHOOK_MAX_RETRIES + 1):
+            try:
+                response = requests.post(url, json=payload, timeout=WEBHOOK_TIMEOUT_SECONDS)
+                if response.status_code < 300:
+                    return True
+                error = f"HTTP {response.status_code}"
+            except Exception as e:
+                error = str(e)
+
+            print(f"[STREAM] Webhook {url}: попытка {attempt}/{WEBHOOK_MAX_RETRIES} не удалась ({error})")
+            if attempt < WEBHOOK_MAX_RETRIES:
+                time.sleep(delay)
+                delay = min(delay * 2, 10)
+
+        print(f"[STREAM] Webhook {url}: события {payload['first_seq']}-{payload['last_seq']} не доставлены "
+              f"(клиент может догнать через /changes?since=)")
+        return False
+
+
+class _ChangeStreamHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP запросов к потоку изменений."""
+
+    change_stream = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Без лога каждого запроса в консоль
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+
+        if parsed.path == '/events':
+            self._serve_sse(params)
+        elif parsed.path == '/changes':
+            since = self._int_param(params.get('since', ['0'])[0])
+            events, gap = self.change_stream.events_since(since)
+            self._send_json({'last_seq': self.change_stream.last_seq, 'gap': gap, 'events': events})
+        elif parsed.path == '/health':
+            self._send_json({
+                'status': 'ok',
+                'last_seq': self.change_stream.last_seq,
+                'clients': self.change_stream.clients,
+            })
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    @staticmethod
+    def _int_param(value):
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_sse(self, text):
+        self.wfile.write(text.encode('utf-8'))
+        self.wfile.flush()
+
+    def _serve_sse(self, params):
+        stream = self.change_stream
+        # Last-Event-ID (переподключение EventSource) важнее ?since=
+        since = self._int_param(self.headers.get('Last-Event-ID') or params.get('since', [None])[0])
+        if self.headers.get('Last-Event-ID') is None and 'since' not in params:
+            since = stream.last_seq  # Новый клиент без resume - только новые события
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+
+        stream.clients += 1
+        try:
+            self._write_sse("retry: 2000\n\n")
+            while True:
+                events, gap = stream.events_since(since)
+                if gap:
+                    # Часть событий уже вытеснена из буфера - сообщаем и идём дальше
+                    self._write_sse(f"event: gap\ndata: {json.dumps({'since': since})}\n\n")
+                    since = events[0]['seq'] - 1 if events else stream.last_seq
+                for event in events:
+                    data = json.dumps(event, ensure_ascii=False)
+                    self._write_sse(f"id: {event['seq']}\nevent: lineup_change\ndata: {data}\n\n")
+                    since = event['seq']
+
+                if not stream.wait_for_events(since, SSE_HEARTBEAT_SECONDS):
+                    self._write_sse(": heartbeat\n\n")
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        finally:
+            stream.clients -= 1
+
+
+def start_change_stream():
+    """
+    Запуск потока изменений по настройкам из .env.
+
+    Returns:
+        ChangeStream или None, если выключен или порт занят
+    """
+    host = os.getenv('CHANGE_STREAM_HOST', '127.0.0.1')
+    port = int(os.getenv('CHANGE_STREAM_PORT', '8765') or 0)
+    webhook_urls = [u.strip() for u in os.getenv('CHANGE_WEBHOOK_URLS', '').split(',') if u.strip()]
+    batch_ms = int(os.getenv('CHANGE_WEBHOOK_BATCH_MS', '200') or 200)
+
+    if not port and not webhook_urls:
+        return None
+
+    stream = ChangeStream(host, port, webhook_urls, batch_ms)
+    if port:
+        try:
+            stream.start_server()
+        except OSError as e:
+            print(f"[STREAM] Не удалось запустить сервер на {host}:{port}: {e}")
+    return stream
@@ -0,0 +1,147 @@
+"""
+Event Bus - публикация/подписка для событий изменений составов.
+
+Каждый подписчик получает собственную ограниченную очередь и рабочий
+поток, поэтому медленный потребитель (уведомление, окно, AI) не задерживает
+ни публикацию, ни других потребителей. При переполнении очереди
+выбрасывается самое старое событие (back-pressure без блокировки издателя).
+"""
+
+import queue
+import threading
+import traceback
+
+# Топик изменений составов (payload - список событий lineup_diff)
+LINEUP_CHANGES_TOPIC = 'lineup.changes'
+
+# Сохранение слейта на диск (payload - копия состояния для записи)
+SLATE_PERSIST_TOPIC = 'slate.persist'
+
+# Размер очереди подписчика по умолчанию
+DEFAULT_QUEUE_SIZE = 50
+
+_STOP = object()
+
+
+class Subscription:
+    """Подписчик: очередь + рабочий поток + счётчики."""
+
+    def __init__(self, name, handler, topics, maxsize):
+        self.name = name
+        self.handler = handler
+        self.topics = set(topics)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=f"bus-{name}", daemon=True)
+        self.thread.start()
+
+    def offer(self, topic, payload):
+        """Положить событие в очередь, не блокируя издателя."""
+        item = (topic, payload)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                # Выбрасываем самое старое событие и пробуем снова
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            topic, payload = item
+            try:
+                self.handler(payload)
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"[BUS] Ошибка подписчика {self.name} ({topic}): {e}")
+                traceback.print_exc()
+
+    def stop(self):
+        try:
+            self.queue.put_nowait(_STOP)
+        except queue.Full:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(_STOP)
+
+
+class EventBus:
+    """Шина событий с независимыми подписчиками."""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, name, handler, topics=(LINEUP_CHANGES_TOPIC,), maxsize=DEFAULT_QUEUE_SIZE):
+        """
+        Подписка обработчика на топики.
+
+        Обработчик вызывается в собственном потоке подписчика - для работы
+        с Tk он должен сам передать вызов в UI поток через root.after.
+
+        Args:
+            name: Уникальное имя подписчика (повторная подписка заменяет старую)
+            handler: Функция handler(payload)
+            topics: Топики, на которые подписываемся
+            maxsize: Размер очереди (при переполнении теряются самые старые события)
+        """
+        subscription = Subscription(name, handler, topics, maxsize)
+        with self._lock:
+            old = self._subscriptions.get(name)
+            self._subscriptions[name] = subscription
+        if old:
+            old.stop()
+        return subscription
+
+    def unsubscribe(self, name):
+        with self._lock:
+            subscription = self._subscriptions.pop(name, None)
+        if subscription:
+            subscription.stop()
+
+    def publish(self, topic, payload) -> int:
+        """
+        Публикация события. Никогда не ждёт потребителей.
+
+        Returns:
+            Количество подписчиков, получивших событие
+        """
+        with self._lock:
+            targets = [s for s in self._subscriptions.values() if topic in s.topics]
+        for subscription in targets:
+            subscription.offer(topic, payload)
+        return len(targets)
+
+    def stats(self) -> dict:
+        """Состояние очередей: {имя: {'queued', 'delivered', 'dropped', 'errors'}}."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        return {
+            s.name: {
+                'queued': s.queue.qsize(),
+                'delivered': s.delivered,
+                'dropped': s.dropped,
+                'errors': s.errors,
+            }
+            for s in subscriptions
+        }
+
+    def shutdown(self):
+        """Остановка всех подписчиков."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.stop()
@@ -0,0 +1,170 @@
+"""
+Latency - сквозная задержка обнаружения изменений составов.
+
+Каждый опрос источника получает trace - словарь меток времени (epoch, сек):
+    fetch_start      - начало загрузки страницы / API
+    fetch_end        - ответ получен
+    parse_done       - составы разобраны
+    diff_done        - изменения найдены
+    notified         - системное уведомление показано
+    ai_done          - первый AI-анализ по изменению получен от модели
+    ai_cached        - анализ взят из кэша ответов (в выборки не идёт)
+    upstream_updated - время обновления у источника (Last-Modified, meta API), если есть
+
+Копия trace на момент обнаружения прикрепляется к событиям изменения
+(change['latency']); поздние этапы отмечаются только в самом trace.
+Для trace, которые привели к изменениям, задержки этапов от fetch_start
+копятся в выборках и сводятся в перцентили. Выборки сохраняются в
+lineups_cache.json рядом с changes_log.
+"""
+
+import math
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+# Сколько последних замеров хранить на этап
+LATENCY_MAX_SAMPLES = 500
+
+# Этапы (порядок - для отображения); задержка считается от fetch_start
+LATENCY_STAGES = ('fetch_end', 'parse_done', 'diff_done', 'notified', 'ai_done')
+
+# Отставание от источника: от upstream_updated до уведомления
+UPSTREAM_LAG_STAGE = 'upstream_lag'
+
+_latency_lock = threading.Lock()
+_samples = {stage: deque(maxlen=LATENCY_MAX_SAMPLES) for stage in LATENCY_STAGES + (UPSTREAM_LAG_STAGE,)}
+
+
+def new_trace(source: str = '') -> dict:
+    """Новый trace с отметкой fetch_start."""
+    return {'source': source, 'fetch_start': round(time.time(), 3)}
+
+
+def parse_upstream_time(value):
+    """
+    Время обновления у источника в epoch.
+
+    Понимает HTTP-дату (Last-Modified) и ISO-формат; None если не разобрать.
+    """
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def set_upstream_time(trace: dict, value):
+    """Запомнить время обновления у источника (если удалось разобрать)."""
+    if trace is None:
+        return
+    upstream = parse_upstream_time(value)
+    if upstream:
+        trace['upstream_updated'] = round(upstream, 3)
+
+
+def mark(trace: dict, stage: str, ts: float = None):
+    """
+    Отметка этапа. Повторная отметка этапа игнорируется.
+
+    Если trace уже учтён (record_trace), задержка этапа сразу идёт в выборку.
+    """
+    if trace is None or stage in trace:
+        return
+    trace[stage] = round(ts if ts is not None else time.time(), 3)
+    if trace.get('recorded') and stage in _samples:
+        with _latency_lock:
+            _record_stage(trace, stage)
+
+
+def _record_stage(trace: dict, stage: str):
+    start = trace.get('fetch_start')
+    if start is None or stage not in trace:
+        return
+    _samples[stage].append(round((trace[stage] - start) * 1000, 1))
+    if stage == 'notified' and trace.get('upstream_updated'):
+        _samples[UPSTREAM_LAG_STAGE].append(round((trace['notified'] - trace['upstream_updated']) * 1000, 1))
+
+
+def record_trace(trace: dict):
+    """Учесть trace в статистике (вызывается, когда опрос дал изменения)."""
+    if trace is None or trace.get('recorded'):
+        return
+    trace['recorded'] = True
+    with _latency_lock:
+        for stage in LATENCY_STAGES:
+            _record_stage(trace, stage)
+
+
+def trace_summary(trace: dict) -> str:
+    """Короткая строка этапов trace для лога."""
+    start = trace.get('fetch_start')
+    if start is None:
+        return ''
+    parts = [f"{stage} +{(trace[stage] - start) * 1000:.0f}ms" for stage in LATENCY_STAGES if stage in trace]
+    return f"{trace.get('source', '')}: " + ", ".join(parts)
+
+
+def _percentile(sorted_values: list, p: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize_samples(values) -> dict:
+    """Сводка выборки: {'count', 'p50', 'p90', 'p99', 'max'}."""
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'p50': _percentile(values, 50),
+        'p90': _percentile(values, 90),
+        'p99': _percentile(values, 99),
+        'max': values[-1] if values else None,
+    }
+
+
+def get_latency_stats() -> dict:
+    """Перцентили задержек по этапам: {stage: {'count', 'p50', 'p90', 'p99', 'max'}} (мс)."""
+    with _latency_lock:
+        samples = {stage: list(values) for stage, values in _samples.items()}
+    return {stage: summarize_samples(values) for stage, values in samples.items()}
+
+
+def export_latency_samples() -> dict:
+    """Выборки для сохранения в кэш."""
+    with _latency_lock:
+        return {stage: list(values) for stage, values in _samples.items()}
+
+
+def load_latency_samples(data: dict):
+    """Восстановление выборок из кэша."""
+    if not data:
+        return
+    with _latency_lock:
+        for stage, values in data.items():
+            if stage in _samples:
+                _samples[stage].clear()
+                _samples[stage].extend(values[-LATENCY_MAX_SAMPLES:])
+
+
+def format_latency_report() -> str:
+    """Текстовая таблица перцентилей (для окна диагностики и консоли)."""
+    stats = get_latency_stats()
+    lines = ["Detection latency from fetch start (ms)", ""]
+    header = f"{'stage':<14}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+    lines.append(header)
+    lines.append('-' * len(header))
+    for stage in LATENCY_STAGES + (UPSTREAM_LAG_STAGE,):
+        data = stats[stage]
+        values = [f"{data[key]:>9.0f}" if data[key] is not None else f"{'-':>9}" for key in ('p50', 'p90', 'p99', 'max')]
+        lines.append(f"{stage:<14}{data['count']:>7}" + ''.join(values))
+    return "\n".join(lines)
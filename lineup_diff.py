@@ -0,0 +1,222 @@
+"""
+Lineup Diff - структурное сравнение составов с отпечатками команд.
+
+Для каждой команды считается отпечаток (хэш имён, позиций, статусов и
+заметок о травмах). Команды с неизменным отпечатком пропускаются, для
+изменившихся строятся типизированные события.
+
+Каждое событие сохраняет старые ключи ('time', 'game', 'team', 'position',
+'old_player', 'new_player'), поэтому лог изменений и уведомления
+работают и со старыми записями.
+"""
+
+import hashlib
+from datetime import datetime
+
+# Типы событий
+CHANGE_STARTER_SWAP = 'starter_swap'
+CHANGE_STATUS = 'status_change'
+CHANGE_PLAYER_ADDED = 'player_added'
+CHANGE_PLAYER_REMOVED = 'player_removed'
+CHANGE_POSITION_MOVE = 'position_move'
+CHANGE_INJURY_NOTE = 'injury_note'
+
+# Позиции стартовой пятёрки
+STARTER_POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+
+# Статусы, переходы в которые/из которых важнее всего
+SERIOUS_STATUSES = {'out', 'doubtful'}
+
+SEVERITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def team_fingerprint(team: dict) -> str:
+    """Отпечаток состава команды: меняется при любом изменении игроков, позиций, статусов, заметок."""
+    parts = [team.get('abbrev') or '']
+    for player in team.get('lineup', []):
+        parts.append("|".join([
+            player.get('name') or '',
+            player.get('position') or '',
+            player.get('status') or 'active',
+            player.get('injury_note') or '',
+        ]))
+    return hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest()
+
+
+def fingerprint_lineups(lineups: dict) -> dict:
+    """Отпечатки всех команд: {'AWAY@HOME|away_team': hash, ...}."""
+    fingerprints = {}
+    for game_key, game in lineups.items():
+        if not isinstance(game, dict):
+            continue
+        for team_type in ('away_team', 'home_team'):
+            fingerprints[f"{game_key}|{team_type}"] = team_fingerprint(game.get(team_type, {}))
+    return fingerprints
+
+
+def get_starters(lineup: list) -> dict:
+    """Стартовая пятёрка {позиция: имя} (первый активный игрок на позиции)."""
+    starters = {}
+    for player in lineup:
+        pos = player.get('position', '')
+        status = player.get('status', 'active')
+        if pos in STARTER_POSITIONS and pos not in starters and status != 'out':
+            starters[pos] = player.get('name', 'Unknown')
+    return starters
+
+
+def _event(change_type, severity, timestamp, game_key, team_abbrev, position,
+           old_player='', new_player='', player='', old_value=None, new_value=None) -> dict:
+    return {
+        'type': change_type,
+        'severity': severity,
+        'time': timestamp,
+        'game': game_key,
+        'team': team_abbrev,
+        'position': position,
+        'old_player': old_player,
+        'new_player': new_player,
+        'player': player or new_player or old_player,
+        'old_value': old_value,
+        'new_value': new_value,
+    }
+
+
+def diff_team(game_key: str, old_team: dict, new_team: dict, timestamp: str = None) -> list:
+    """
+    События изменений одной команды.
+
+    Returns:
+        Список событий (dict), отсортированный по важности
+    """
+    timestamp = timestamp or datetime.now().strftime('%H:%M:%S')
+    team_abbrev = new_team.get('abbrev') or old_team.get('abbrev') or '???'
+
+    old_lineup = old_team.get('lineup', [])
+    new_lineup = new_team.get('lineup', [])
+    old_starters = get_starters(old_lineup)
+    new_starters = get_starters(new_lineup)
+    old_starter_names = set(old_starters.values())
+
+    old_players = {}
+    for player in old_lineup:
+        old_players.setdefault(player.get('name'), player)
+    new_players = {}
+    for player in new_lineup:
+        new_players.setdefault(player.get('name'), player)
+
+    events = []
+
+    # Замена стартера: на позиции новый игрок, которого не было в пятёрке
+    # (перестановки внутри пятёрки - это position_move)
+    swapped_in = set()
+    swapped_out = set()
+    for pos in STARTER_POSITIONS:
+        old_player = old_starters.get(pos, '')
+        new_player = new_starters.get(pos, '')
+        if old_player and new_player and old_player != new_player and new_player not in old_starter_names:
+            events.append(_event(CHANGE_STARTER_SWAP, 'high', timestamp, game_key, team_abbrev, pos,
+                                 old_player=old_player, new_player=new_player))
+            swapped_in.add(new_player)
+            swapped_out.add(old_player)
+
+    for name, player in new_players.items():
+        if not name:
+            continue
+        position = player.get('position') or ''
+        old = old_players.get(name)
+
+        if old is None:
+            if name in swapped_in:
+                continue  # Уже в событии замены стартера
+            severity = 'high' if position in STARTER_POSITIONS else 'medium'
+            events.append(_event(CHANGE_PLAYER_ADDED, severity, timestamp, game_key, team_abbrev, position,
+                                 new_player=name))
+            continue
+
+        old_status = old.get('status') or 'active'
+        new_status = player.get('status') or 'active'
+        if old_status != new_status:
+            serious = old_status in SERIOUS_STATUSES or new_status in SERIOUS_STATUSES
+            events.append(_event(CHANGE_STATUS, 'high' if serious else 'medium', timestamp, game_key,
+                                 team_abbrev, position, old_player=name, new_player=name,
+                                 old_value=old_status, new_value=new_status))
+        elif (old.get('injury_note') or '') != (player.get('injury_note') or ''):
+            events.append(_event(CHANGE_INJURY_NOTE, 'low', timestamp, game_key, team_abbrev, position,
+                                 old_player=name, new_player=name,
+                                 old_value=old.get('injury_note'), new_value=player.get('injury_note')))
+
+        old_position = old.get('position') or ''
+        if old_position != position:
+            events.append(_event(CHANGE_POSITION_MOVE, 'medium', timestamp, game_key, team_abbrev, position,
+                                 old_player=name, new_player=name,
+                                 old_value=old_position, new_value=position))
+
+    for name, player in old_players.items():
+        if name and name not in new_players and name not in swapped_out:
+            position = player.get('position') or ''
+            severity = 'high' if name in old_starter_names else 'medium'
+            events.append(_event(CHANGE_PLAYER_REMOVED, severity, timestamp, game_key, team_abbrev, position,
+                                 old_player=name))
+
+    events.sort(key=lambda e: SEVERITY_ORDER.get(e['severity'], 9))
+    return events
+
+
+def diff_lineups(old_lineups: dict, new_lineups: dict, old_fingerprints: dict = None):
+    """
+    Сравнение составов всех игр.
+
+    Новые игры (которых не было в old_lineups) не сравниваются.
+
+    Args:
+        old_lineups: Предыдущие составы {game_key: {'away_team', 'home_team', ...}}
+        new_lineups: Текущие составы в том же формате
+        old_fingerprints: Отпечатки old_lineups (если уже посчитаны)
+
+    Returns:
+        (список событий, отпечатки new_lineups)
+    """
+    if old_fingerprints is None:
+        old_fingerprints = fingerprint_lineups(old_lineups)
+
+    timestamp = datetime.now().strftime('%H:%M:%S')
+    new_fingerprints = {}
+    changes = []
+
+    for game_key, game in new_lineups.items():
+        old_game = old_lineups.get(game_key)
+        for team_type in ('away_team', 'home_team'):
+            team = game.get(team_type, {})
+            key = f"{game_key}|{team_type}"
+            fingerprint = team_fingerprint(team)
+            new_fingerprints[key] = fingerprint
+
+            if not isinstance(old_game, dict):
+                continue  # Новая игра, не сравниваем
+            if old_fingerprints.get(key) == fingerprint:
+                continue  # Состав не изменился
+
+            changes.extend(diff_team(game_key, old_game.get(team_type, {}), team, timestamp))
+
+    return changes, new_fingerprints
+
+
+def describe_change(change: dict) -> str:
+    """Короткая строка для уведомления / лога."""
+    change_type = change.get('type', CHANGE_STARTER_SWAP)
+    team = change.get('team', '???')
+    position = change.get('position', '')
+    player = change.get('player') or change.get('new_player') or change.get('old_player', '')
+
+    if change_type == CHANGE_STATUS:
+        return f"{team} {player}: {change.get('old_value')} -> {str(change.get('new_value')).upper()}"
+    if change_type == CHANGE_PLAYER_ADDED:
+        return f"{team} {position}: + {player}"
+    if change_type == CHANGE_PLAYER_REMOVED:
+        return f"{team} {position}: - {player}"
+    if change_type == CHANGE_POSITION_MOVE:
+        return f"{team} {player}: {change.get('old_value')} -> {change.get('new_value')}"
+    if change_type == CHANGE_INJURY_NOTE:
+        return f"{team} {player}: note '{change.get('new_value') or ''}'"
+    return f"{team} {position}: {change.get('old_player')} -> {change.get('new_player')}"
@@ -0,0 +1,442 @@
+"""
+Lineup History - append-only история составов за день.
+
+На каждом опросе по каждой команде пишется только дельта относительно
+предыдущего состояния (изменённые/удалённые игроки). Без изменений -
+ничего не пишется. Периодически пишется полный ключевой кадр, чтобы
+восстановление любого момента требовало не больше KEYFRAME_INTERVAL дельт.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+DB_FILE = Path(__file__).parent / "lineup_history.db"
+
+# Полный снимок команды каждые N дельт
+KEYFRAME_INTERVAL = 30
+
+_state_lock = threading.Lock()
+_last_states = {}  # {team_abbrev: {'slate_date', 'state', 'deltas_since_keyframe'}}
+
+
+def set_db_file(path):
+    """Переключение на другую базу (прогоны replay_harness.py), сброс состояний в памяти."""
+    global DB_FILE
+    with _state_lock:
+        DB_FILE = Path(path)
+        _last_states.clear()
+
+
+def init_db():
+    """Инициализация базы данных."""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lineup_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slate_date TEXT NOT NULL,
+            team_abbrev TEXT NOT NULL,
+            recorded_at TEXT NOT NULL,
+            is_keyframe INTEGER NOT NULL DEFAULT 0,
+            payload TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_team_time ON lineup_history(team_abbrev, recorded_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_team_keyframe ON lineup_history(team_abbrev, is_keyframe, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_slate ON lineup_history(slate_date)
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
+# ===== Кодирование состояния =====
+
+def _encode_player(index: int, player: dict) -> str:
+    """Игрок в компактную строку 'порядок|позиция|статус|заметка'."""
+    return "|".join([
+        str(index),
+        player.get('position') or '',
+        player.get('status') or 'active',
+        (player.get('injury_note') or '').replace('|', '/'),
+    ])
+
+
+def _decode_player(name: str, value: str) -> dict:
+    index, position, status, note = value.split('|', 3)
+    return {
+        'name': name,
+        'position': position,
+        'status': status,
+        'injury_note': note or None,
+        '_order': int(index),
+    }
+
+
+def _team_states_from_games(games: list) -> dict:
+    """Состояние каждой команды слейта: {'team': {'meta': {...}, 'players': {name: code}}}."""
+    states = {}
+    for game in games:
+        away = game.get('away_team', {})
+        home = game.get('home_team', {})
+        game_key = f"{away.get('abbrev', '')}@{home.get('abbrev', '')}"
+
+        for team in (away, home):
+            abbrev = team.get('abbrev')
+            if not abbrev:
+                continue
+            players = {}
+            for index, player in enumerate(team.get('lineup', [])):
+                name = player.get('name')
+                if name and name not in players:
+                    players[name] = _encode_player(index, player)
+            states[abbrev] = {
+                'meta': {
+                    'game': game_key,
+                    'time': game.get('game_time') or '',
+                    'record': team.get('record') or '',
+                },
+                'players': players,
+            }
+    return states
+
+
+def _make_delta(old_state: dict, new_state: dict) -> dict:
+    """Дельта между двумя состояниями команды (пустой dict - изменений нет)."""
+    delta = {}
+
+    meta = {k: v for k, v in new_state['meta'].items() if old_state['meta'].get(k) != v}
+    if meta:
+        delta['m'] = meta
+
+    old_players = old_state['players']
+    new_players = new_state['players']
+    changed = {name: code for name, code in new_players.items() if old_players.get(name) != code}
+    if changed:
+        delta['s'] = changed
+    removed = [name for name in old_players if name not in new_players]
+    if removed:
+        delta['d'] = removed
+
+    return delta
+
+
+def _apply_delta(state: dict, delta: dict) -> dict:
+    result = {'meta': dict(state['meta']), 'players': dict(state['players'])}
+    result['meta'].update(delta.get('m', {}))
+    result['players'].update(delta.get('s', {}))
+    for name in delta.get('d', []):
+        result['players'].pop(name, None)
+    return result
+
+
+def decode_team_state(state: dict) -> dict:
+    """Состояние команды в формате слейта: {'game', 'game_time', 'record', 'lineup': [...]}."""
+    lineup = [_decode_player(name, code) for name, code in state['players'].items()]
+    lineup.sort(key=lambda p: p['_order'])
+    for player in lineup:
+        del player['_order']
+    return {
+        'game': state['meta'].get('game', ''),
+        'game_time': state['meta'].get('time', ''),
+        'record': state['meta'].get('record', ''),
+        'lineup': lineup,
+    }
+
+
+# ===== Восстановление =====
+
+def _reconstruct(cursor, team_abbrev: str, at: str = None):
+    """
+    Состояние команды на момент at (включительно) или последнее известное.
+
+    Returns:
+        (slate_date, state, deltas_since_keyframe) или None
+    """
+    time_filter = "AND recorded_at <= ?" if at else ""
+    params = (team_abbrev, at) if at else (team_abbrev,)
+
+    cursor.execute(f'''
+        SELECT id, slate_date, payload FROM lineup_history
+        WHERE team_abbrev = ? AND is_keyframe = 1 {time_filter}
+        ORDER BY id DESC LIMIT 1
+    ''', params)
+    keyframe = cursor.fetchone()
+    if not keyframe:
+        return None
+
+    keyframe_id, slate_date, payload = keyframe
+    state = json.loads(payload)
+
+    cursor.execute(f'''
+        SELECT payload FROM lineup_history
+        WHERE team_abbrev = ? AND id > ? AND is_keyframe = 0 {time_filter}
+        ORDER BY id
+    ''', (team_abbrev, keyframe_id, at) if at else (team_abbrev, keyframe_id))
+    deltas = cursor.fetchall()
+    for (delta_payload,) in deltas:
+        state = _apply_delta(state, json.loads(delta_payload))
+
+    return slate_date, state, len(deltas)
+
+
+def _get_last_state(cursor, team_abbrev: str):
+    """Последнее записанное состояние команды (из памяти или из базы)."""
+    if team_abbrev not in _last_states:
+        restored = _reconstruct(cursor, team_abbrev)
+        if restored:
+            slate_date, state, deltas = restored
+            _last_states[team_abbrev] = {
+                'slate_date': slate_date,
+                'state': state,
+                'deltas_since_keyframe': deltas,
+            }
+    return _last_states.get(team_abbrev)
+
+
+# ===== Запись =====
+
+def record_snapshot(games: list, recorded_at: str = None, slate_date: str = None) -> int:
+    """
+    Запись опроса: по каждой команде ключевой кадр или дельта.
+
+    Args:
+        games: Список игр слейта (формат parse_lineups)
+        recorded_at: Время опроса 'YYYY-MM-DD HH:MM:SS' (по умолчанию - сейчас)
+        slate_date: Дата слейта (по умолчанию - сегодня)
+
+    Returns:
+        Количество записанных строк (0 - составы не менялись)
+    """
+    now = datetime.now()
+    recorded_at = recorded_at or now.strftime('%Y-%m-%d %H:%M:%S')
+    slate_date = slate_date or now.strftime('%Y-%m-%d')
+
+    new_states = _team_states_from_games(games)
+    if not new_states:
+        return 0
+
+    with _state_lock:
+        init_db()
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        written = 0
+        for team_abbrev, new_state in new_states.items():
+            last = _get_last_state(cursor, team_abbrev)
+
+            is_keyframe = (
+                last is None
+                or last['slate_date'] != slate_date
+                or last['deltas_since_keyframe'] >= KEYFRAME_INTERVAL
+            )
+            if is_keyframe:
+                payload = new_state
+            else:
+                payload = _make_delta(last['state'], new_state)
+                if not payload:
+                    continue  # Без изменений - ничего не пишем
+
+            cursor.execute('''
+                INSERT INTO lineup_history (slate_date, team_abbrev, recorded_at, is_keyframe, payload)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (slate_date, team_abbrev, recorded_at, int(is_keyframe),
+                  json.dumps(payload, ensure_ascii=False, separators=(',', ':'))))
+            written += 1
+
+            _last_states[team_abbrev] = {
+                'slate_date': slate_date,
+                'state': new_state,
+                'deltas_since_keyframe': 0 if is_keyframe else last['deltas_since_keyframe'] + 1,
+            }
+
+        conn.commit()
+        conn.close()
+
+    if written:
+        print(f"[HISTORY] Записано {written} изменений составов ({recorded_at})")
+    return written
+
+
+# ===== Запросы =====
+
+def get_team_state_at(team_abbrev: str, at: str) -> dict:
+    """
+    Состав команды на момент времени.
+
+    Args:
+        team_abbrev: Аббревиатура команды
+        at: Время 'YYYY-MM-DD HH:MM:SS'
+
+    Returns:
+        dict {'slate_date', 'game', 'game_time', 'record', 'lineup'} или None
+    """
+    if not DB_FILE.exists():
+        return None
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    restored = _reconstruct(cursor, team_abbrev, at)
+    conn.close()
+
+    if not restored:
+        return None
+    slate_date, state, _ = restored
+    result = decode_team_state(state)
+    result['slate_date'] = slate_date
+    return result
+
+
+def get_snapshot_at(at: str, slate_date: str = None) -> dict:
+    """
+    Снимок всех команд на момент времени.
+
+    Args:
+        at: Время 'YYYY-MM-DD HH:MM:SS'
+        slate_date: Дата слейта (по умолчанию - дата из at)
+
+    Returns:
+        dict {team_abbrev: состояние команды}
+    """
+    if not DB_FILE.exists():
+        return {}
+
+    slate_date = slate_date or at[:10]
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT DISTINCT team_abbrev FROM lineup_history
+        WHERE slate_date = ? AND recorded_at <= ?
+    ''', (slate_date, at))
+    teams = [row[0] for row in cursor.fetchall()]
+
+    snapshot = {}
+    for team_abbrev in teams:
+        restored = _reconstruct(cursor, team_abbrev, at)
+        if restored and restored[0] == slate_date:
+            snapshot[team_abbrev] = decode_team_state(restored[1])
+    conn.close()
+
+    return snapshot
+
+
+def get_team_history(team_abbrev: str, date_from: str, date_to: str = None) -> list:
+    """
+    Все изменения состава команды за период слейтов.
+
+    Args:
+        team_abbrev: Аббревиатура команды
+        date_from: Первая дата слейта 'YYYY-MM-DD'
+        date_to: Последняя дата слейта (по умолчанию = date_from)
+
+    Returns:
+        Список [{'recorded_at', 'slate_date', 'is_keyframe', 'delta', 'state'}]
+        по времени, state - полный состав после изменения
+    """
+    if not DB_FILE.exists():
+        return []
+
+    date_to = date_to or date_from
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT slate_date, recorded_at, is_keyframe, payload FROM lineup_history
+        WHERE team_abbrev = ? AND slate_date BETWEEN ? AND ?
+        ORDER BY id
+    ''', (team_abbrev, date_from, date_to))
+    rows = cursor.fetchall()
+
+    # Первая строка периода может быть дельтой - нужна база до неё
+    state = None
+    if rows and not rows[0][2]:
+        cursor.execute('''
+            SELECT MIN(id) FROM lineup_history
+            WHERE team_abbrev = ? AND slate_date BETWEEN ? AND ?
+        ''', (team_abbrev, date_from, date_to))
+        first_id = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT recorded_at FROM lineup_history WHERE id < ? AND team_abbrev = ?
+            ORDER BY id DESC LIMIT 1
+        ''', (first_id, team_abbrev))
+        previous = cursor.fetchone()
+        if previous:
+            restored = _reconstruct(cursor, team_abbrev, previous[0])
+            state = restored[1] if restored else None
+    conn.close()
+
+    history = []
+    for slate_date, recorded_at, is_keyframe, payload in rows:
+        data = json.loads(payload)
+        if is_keyframe:
+            state = data
+        elif state is not None:
+            state = _apply_delta(state, data)
+        else:
+            continue
+
+        history.append({
+            'recorded_at': recorded_at,
+            'slate_date': slate_date,
+            'is_keyframe': bool(is_keyframe),
+            'delta': None if is_keyframe else data,
+            'state': decode_team_state(state),
+        })
+
+    return history
+
+
+def get_recorded_times(slate_date: str) -> list:
+    """Моменты опросов слейта, в которые что-то записывалось (по возрастанию)."""
+    if not DB_FILE.exists():
+        return []
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT DISTINCT recorded_at FROM lineup_history
+        WHERE slate_date = ? ORDER BY recorded_at
+    ''', (slate_date,))
+    times = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return times
+
+
+def get_history_stats() -> dict:
+    """Статистика по базе истории составов."""
+    if not DB_FILE.exists():
+        return {'rows': 0, 'keyframes': 0, 'teams': 0, 'dates': 0, 'bytes': 0}
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT COUNT(*), COALESCE(SUM(is_keyframe), 0), COUNT(DISTINCT team_abbrev), '
+                   'COUNT(DISTINCT slate_date) FROM lineup_history')
+    rows, keyframes, teams, dates = cursor.fetchone()
+    conn.close()
+
+    return {
+        'rows': rows,
+        'keyframes': keyframes,
+        'teams': teams,
+        'dates': dates,
+        'bytes': DB_FILE.stat().st_size,
+    }
+
+
+# CLI для тестирования
+if __name__ == "__main__":
+    init_db()
+    print(f"DB stats: {get_history_stats()}")
@@ -0,0 +1,579 @@
+"""
+Lineup Sources - параллельная загрузка составов из нескольких источников.
+
+Источники (опрашиваются одновременно):
+    file_drop      - локальный файл lineups_drop.json (для тестов)
+    rotowire_auth  - RotoWire с cookies (если есть авторизация)
+    rotowire_anon  - RotoWire без авторизации (через прокси)
+    nba_live       - nba_api live scoreboard/boxscore (стартеры после начала игры)
+
+Результаты сводятся в один слейт по полям команды:
+    starters  - стартовая пятёрка
+    statuses  - статусы игроков и заметки о травмах
+    record    - W-L
+
+Для каждого поля побеждает источник, который ПЕРВЫМ сообщил об изменении
+(остальные догонят позже и не откатят значение). Пока изменений нет -
+значение остаётся за прежним источником, а изначально берётся источник
+с наивысшим приоритетом. Расхождения источников помечаются как конфликты.
+Происхождение каждого поля хранится в team['provenance'].
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+from nba_lineups_scraper import fetch_page_with_meta, parse_lineups, ROTOWIRE_URL
+from latency import new_trace, mark, set_upstream_time
+from lineup_diff import STARTER_POSITIONS, fingerprint_lineups
+from team_mapping import normalize_abbrev
+
+# Файл для ручной подмены составов (тестирование)
+LINEUP_DROP_FILE = "lineups_drop.json"  # Сохраняем в текущую директорию
+
+# Файл подмены старше этого игнорируется (часы) - забытый файл
+# не должен перекрывать живые составы следующих слейтов
+FILE_DROP_MAX_AGE_HOURS = 6
+
+# Общий таймаут одного опроса всех источников (секунды)
+SOURCE_TIMEOUT_SECONDS = 35
+
+# Данные источника старше этого не участвуют в сведении (минуты)
+SOURCE_STALE_MINUTES = 15
+
+# Поля команды, по которым ведётся сведение
+MERGE_FIELDS = ('starters', 'statuses', 'record')
+
+# Суффиксы имён, которые не учитываются при сравнении игроков
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv'}
+
+
+def name_key(name: str) -> str:
+    """Ключ игрока для сравнения между источниками: 'J. Brunson' == 'Jalen Brunson'."""
+    parts = [p for p in (name or '').replace('.', ' ').lower().split() if p not in NAME_SUFFIXES]
+    if not parts:
+        return ''
+    if len(parts) == 1:
+        return parts[0]
+    return f"{parts[0][0]} {parts[-1]}"
+
+
+def game_merge_key(game: dict) -> str:
+    """Ключ игры независимо от написания аббревиатур (GS/GSW, NY/NYK)."""
+    away = normalize_abbrev(game.get('away_team', {}).get('abbrev') or '')
+    home = normalize_abbrev(game.get('home_team', {}).get('abbrev') or '')
+    return f"{away}@{home}"
+
+
+# ===== Источники =====
+
+class LineupSource:
+    """Базовый источник составов."""
+
+    name = 'base'
+    priority = 100          # Меньше - важнее (используется пока нет изменений)
+    fields = MERGE_FIELDS   # Какие поля команды источник знает
+    authoritative = False   # Первый же ответ, расходящийся с текущим, считается изменением
+    exact_positions = True  # Позиции стартеров точные (PG/SG/SF/PF/C), а не условные
+
+    def available(self, date: str) -> bool:
+        return True
+
+    def fetch(self, date: str, trace: dict = None) -> list:
+        """
+        Список игр в формате parse_lineups().
+
+        trace (latency.py) - если источник может, отмечает fetch_end и
+        время обновления у источника; parse_done отмечается после возврата.
+        """
+        raise NotImplementedError
+
+
+class FileDropSource(LineupSource):
+    """Составы из локального JSON (список игр или {'games': [...]})."""
+
+    name = 'file_drop'
+    priority = 10
+
+    def __init__(self, path=LINEUP_DROP_FILE, max_age_hours=FILE_DROP_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age_hours = max_age_hours
+        self._warned_mtime = None
+
+    def available(self, date):
+        if not os.path.exists(self.path):
+            return False
+        mtime = os.path.getmtime(self.path)
+        age_hours = (time.time() - mtime) / 3600
+        if age_hours > self.max_age_hours:
+            if self._warned_mtime != mtime:
+                self._warned_mtime = mtime
+                print(f"[SOURCES] {self.path} устарел ({age_hours:.1f} ч > {self.max_age_hours} ч) - игнорируется")
+            return False
+        return True
+
+    def fetch(self, date, trace=None):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        mark(trace, 'fetch_end')
+        set_upstream_time(trace, datetime.fromtimestamp(os.path.getmtime(self.path)).isoformat())
+        if isinstance(data, dict):
+            data = data.get(date) or data.get('games', [])
+        return data
+
+
+class RotowireAuthSource(LineupSource):
+    """RotoWire с сохранёнными cookies."""
+
+    name = 'rotowire_auth'
+    priority = 20
+
+    def __init__(self, is_authorized=None):
+        self.is_authorized = is_authorized or (lambda: False)
+
+    def available(self, date):
+        return bool(self.is_authorized())
+
+    def fetch(self, date, trace=None):
+        from rotowire_auth import fetch_lineups_with_auth
+        meta = {}
+        games = fetch_lineups_with_auth(date, meta=meta)
+        if trace is not None and meta:
+            mark(trace, 'fetch_end', meta['fetched_at'])
+            set_upstream_time(trace, meta.get('last_modified'))
+        return games
+
+
+class RotowireAnonSource(LineupSource):
+    """RotoWire без авторизации."""
+
+    name = 'rotowire_anon'
+    priority = 30
+
+    def fetch(self, date, trace=None):
+        url = ROTOWIRE_URL if date == 'today' else f"{ROTOWIRE_URL}?date=tomorrow"
+        soup, meta = fetch_page_with_meta(url)
+        mark(trace, 'fetch_end', meta['fetched_at'])
+        set_upstream_time(trace, meta.get('last_modified'))
+        return parse_lineups(soup)
+
+
+class NbaLiveSource(LineupSource):
+    """
+    Официальные стартеры из nba_api live (только начавшиеся игры сегодня).
+
+    Позиции G/G/F/F/C переводятся в PG/SG/SF/PF/C по порядку в boxscore -
+    они условные, при сведении стартерам возвращаются позиции RotoWire.
+    """
+
+    name = 'nba_live'
+    priority = 40
+    fields = ('starters',)
+    authoritative = True    # Стартеры из boxscore - факт, а не прогноз
+    exact_positions = False
+
+    POSITION_SLOTS = {'G': ['PG', 'SG'], 'F': ['SF', 'PF'], 'C': ['C']}
+
+    def available(self, date):
+        return date == 'today'
+
+    def fetch(self, date, trace=None):
+        from nba_api.live.nba.endpoints import scoreboard, boxscore
+
+        board = scoreboard.ScoreBoard().get_dict()
+        # meta.time - время генерации фида на стороне NBA
+        set_upstream_time(trace, board.get('meta', {}).get('time'))
+
+        # Дата слейта по версии NBA (ET) - не меняется после полуночи
+        game_date = board['scoreboard'].get('gameDate')
+
+        games = []
+        for sb_game in board['scoreboard']['games']:
+            if sb_game.get('gameStatus', 1) < 2:
+                continue  # Игра не началась - стартеры ещё не официальные
+
+            box = boxscore.BoxScore(sb_game['gameId']).get_dict()['game']
+            games.append({
+                'game_time': sb_game.get('gameStatusText'),
+                'game_date': game_date,
+                'away_team': self._parse_team(box['awayTeam']),
+                'home_team': self._parse_team(box['homeTeam']),
+            })
+        mark(trace, 'fetch_end')
+        return games
+
+    def _parse_team(self, team: dict) -> dict:
+        slots = {k: list(v) for k, v in self.POSITION_SLOTS.items()}
+        lineup = []
+        for player in team.get('players', []):
+            if str(player.get('starter')) != '1':
+                continue
+            position = player.get('position', '')
+            free = slots.get(position[:1]) or [p for s in slots.values() for p in s]
+            slot = free.pop(0) if free else position
+            for s in slots.values():
+                if slot in s:
+                    s.remove(slot)
+            lineup.append({
+                'name': player.get('nameI') or player.get('name'),
+                'position': slot,
+                'status': 'active',
+                'injury_note': None,
+            })
+        lineup.sort(key=lambda p: STARTER_POSITIONS.index(p['position'])
+                    if p['position'] in STARTER_POSITIONS else 9)
+        return {'abbrev': team.get('teamTricode'), 'record': None, 'lineup': lineup, 'injuries': []}
+
+
+def default_sources(is_authorized=None) -> list:
+    """Набор источников приложения."""
+    return [
+        FileDropSource(),
+        RotowireAuthSource(is_authorized),
+        RotowireAnonSource(),
+        NbaLiveSource(),
+    ]
+
+
+# ===== Сведение =====
+
+def _field_values(team: dict) -> dict:
+    """Значения полей команды в сравнимом виде."""
+    # Стартеры сравниваются как набор имён: nba_live не знает точных позиций PG/SG
+    starters = []
+    seen_positions = set()
+    for player in team.get('lineup', []):
+        pos = player.get('position')
+        if pos in STARTER_POSITIONS and pos not in seen_positions:
+            seen_positions.add(pos)
+            starters.append(name_key(player.get('name')))
+    statuses = {
+        name_key(p.get('name')): (p.get('status') or 'active', p.get('injury_note') or '')
+        for p in team.get('lineup', []) if p.get('name')
+    }
+    return {
+        'starters': tuple(sorted(starters)),
+        'statuses': tuple(sorted(statuses.items())),
+        'record': team.get('record') or '',
+    }
+
+
+def _conflict_key(conflict: dict) -> tuple:
+    """Сравнимый ключ конфликта (в dict есть список источников)."""
+    return (conflict['game'], conflict['team'], conflict['field'], conflict['chosen'], tuple(conflict['sources']))
+
+
+class MultiSourceIngestor:
+    """Параллельный опрос источников и сведение в один слейт."""
+
+    def __init__(self, sources=None, timeout=SOURCE_TIMEOUT_SECONDS):
+        self.sources = sources or default_sources()
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix='source')
+        self._lock = threading.Lock()
+        self._date = None
+        self._reset_state()
+        self.source_status = {}  # {source: {'ok', 'games', 'duration', 'error', 'at'}}
+
+    def _reset_state(self):
+        self._results = {}       # {source: (received_ts, {merge_key: game})}
+        self._last_values = {}   # {(source, merge_key, side, field): value}
+        self._winners = {}       # {(merge_key, side, field): source}
+        self.conflicts = []
+        self.merged = []
+        self._merged_fingerprints = {}
+
+    # ===== Опрос =====
+
+    def fetch(self, date: str, on_update=None) -> list:
+        """
+        Опрос всех источников параллельно.
+
+        Args:
+            date: "today" или "tomorrow"
+            on_update: Вызывается из потока источника с (games, source_name, trace)
+                каждый раз, когда сведённый слейт изменился - первый
+                источник с новым составом запускает проверку изменений;
+                trace - метки времени этого опроса (latency.py)
+
+        Returns:
+            Сведённый слейт после ответа всех источников (или таймаута)
+        """
+        with self._lock:
+            if date != self._date:
+                self._date = date
+                self._reset_state()
+
+        futures = []
+        for source in self.sources:
+            try:
+                if not source.available(date):
+                    continue
+            except Exception:
+                continue
+            futures.append(self._executor.submit(self._poll_source, source, date, on_update))
+
+        if not futures:
+            raise Exception("Нет доступных источников составов")
+
+        wait(futures, timeout=self.timeout)
+
+        with self._lock:
+            if not self.merged and not any(s.get('ok') for s in self.source_status.values()):
+                errors = "; ".join(f"{n}: {s.get('error')}" for n, s in self.source_status.items())
+                raise Exception(f"Все источники недоступны ({errors})")
+            return list(self.merged)
+
+    def _poll_source(self, source, date, on_update):
+        """Опрос одного источника и сведение его ответа (в потоке пула)."""
+        trace = new_trace(source.name)
+        started = time.time()
+        error = None
+        try:
+            games = source.fetch(date, trace) or []
+            mark(trace, 'fetch_end')
+            mark(trace, 'parse_done')
+        except Exception as e:
+            games, error = [], str(e)
+        duration = time.time() - started
+
+        self.source_status[source.name] = {
+            'ok': error is None and bool(games),
+            'games': len(games),
+            'duration': round(duration, 2),
+            'error': error,
+            'at': datetime.now().strftime('%H:%M:%S'),
+        }
+        if error:
+            print(f"[SOURCES] {source.name}: ошибка за {duration:.1f}с - {error}")
+            return
+        if not games:
+            return  # Пустой ответ не затирает прежние данные источника
+
+        print(f"[SOURCES] {source.name}: {len(games)} игр за {duration:.1f}с")
+        with self._lock:
+            if date != self._date:
+                return  # Пока источник отвечал, пользователь переключил дату
+            changed = self._ingest(source, games)
+            merged = list(self.merged)
+
+        if changed and on_update:
+            try:
+                on_update(merged, source.name, trace)
+            except Exception as e:
+                print(f"[SOURCES] Ошибка обработчика обновления: {e}")
+
+    # ===== Сведение =====
+
+    def _ingest(self, source, games) -> bool:
+        """Учёт ответа источника. True - сведённый слейт изменился."""
+        by_key = {}
+        for game in games:
+            if isinstance(game, dict) and game.get('away_team', {}).get('abbrev'):
+                by_key[game_merge_key(game)] = game
+        self._results[source.name] = (time.time(), by_key)
+
+        # Какие поля изменились у этого источника относительно его прошлого ответа
+        changed_fields = set()
+        for key, game in by_key.items():
+            for side in ('away_team', 'home_team'):
+                values = _field_values(game.get(side, {}))
+                for field in source.fields:
+                    state_key = (source.name, key, side, field)
+                    previous = self._last_values.get(state_key)
+                    if previous is not None and previous != values[field]:
+                        changed_fields.add((key, side, field))
+                    elif previous is None and source.authoritative:
+                        changed_fields.add((key, side, field))
+                    self._last_values[state_key] = values[field]
+
+        # Первый сообщивший об изменении забирает поле
+        for field_key in changed_fields:
+            winner = self._winners.get(field_key)
+            winner_value = self._last_values.get((winner,) + field_key) if winner else None
+            new_value = self._last_values[(source.name,) + field_key]
+            if winner and winner != source.name and winner_value != new_value:
+                print(f"[SOURCES] {source.name} первым сообщил изменение: "
+                      f"{field_key[0]} {field_key[1]} {field_key[2]}")
+                self._winners[field_key] = source.name
+
+        self.merged = self._merge()
+        fingerprints = fingerprint_lineups({game_merge_key(g): g for g in self.merged})
+        changed = fingerprints != self._merged_fingerprints
+        self._merged_fingerprints = fingerprints
+        return changed
+
+    def _fresh_results(self) -> dict:
+        """Ответы источников, не старше SOURCE_STALE_MINUTES."""
+        cutoff = time.time() - SOURCE_STALE_MINUTES * 60
+        return {name: games for name, (received, games) in self._results.items() if received >= cutoff}
+
+    def _merge(self) -> list:
+        results = self._fresh_results()
+        sources = sorted((s for s in self.sources if s.name in results), key=lambda s: s.priority)
+        conflicts = []
+
+        game_keys = []
+        for source in sources:
+            for key in results[source.name]:
+                if key not in game_keys:
+                    game_keys.append(key)
+
+        merged = []
+        for key in game_keys:
+            reporting = [s for s in sources if key in results[s.name]]
+            base = results[reporting[0].name][key]
+            game = {
+                'game_time': base.get('game_time'),
+                'sources': [s.name for s in reporting],
+            }
+            # Дата игры знают не все источники (RotoWire - нет)
+            game_date = next((results[s.name][key].get('game_date') for s in reporting
+                              if results[s.name][key].get('game_date')), None)
+            if game_date:
+                game['game_date'] = game_date
+            for side in ('away_team', 'home_team'):
+                team, team_conflicts = self._merge_team(key, side, reporting, results)
+                game[side] = team
+                conflicts.extend(team_conflicts)
+            game['away_injuries'] = game['away_team']['injuries']
+            game['home_injuries'] = game['home_team']['injuries']
+            game_conflicts = [c for c in conflicts if c['game'] == key]
+            if game_conflicts:
+                game['conflicts'] = game_conflicts
+            merged.append(game)
+
+        # Новые конфликты - сравнение наборов (замена одного конфликта другим не меняет их число)
+        known = {_conflict_key(c) for c in self.conflicts}
+        for conflict in conflicts:
+            if _conflict_key(conflict) not in known:
+                print(f"[SOURCES] Конфликт {conflict['game']} {conflict['team']} {conflict['field']}: "
+                      f"выбран {conflict['chosen']}, расходятся {', '.join(conflict['sources'])}")
+        self.conflicts = conflicts
+        return merged
+
+    def _merge_team(self, key, side, reporting, results):
+        """Сборка команды из полей разных источников."""
+        provenance = {}
+        conflicts = []
+        for field in MERGE_FIELDS:
+            candidates = [s for s in reporting if field in s.fields]
+            if not candidates:
+                continue
+            winner = self._winners.get((key, side, field))
+            if winner not in [s.name for s in candidates]:
+                winner = candidates[0].name
+                self._winners[(key, side, field)] = winner
+            provenance[field] = winner
+
+            values = {s.name: self._last_values.get((s.name, key, side, field)) for s in candidates}
+            dissenting = sorted(name for name, value in values.items() if value != values[winner])
+            if field != 'record' and dissenting:
+                conflicts.append({
+                    'game': key,
+                    'team': side,
+                    'field': field,
+                    'sources': dissenting,
+                    'chosen': winner,
+                })
+
+        teams = {s.name: results[s.name][key].get(side, {}) for s in reporting}
+        starters_team = teams[provenance['starters']]
+        statuses_team = teams[provenance.get('statuses', provenance['starters'])]
+        record_team = teams[provenance.get('record', provenance['starters'])]
+        base_team = teams[reporting[0].name]
+
+        starters = starters_team.get('lineup', [])
+        starters_source = next(s for s in reporting if s.name == provenance['starters'])
+        if not starters_source.exact_positions and statuses_team is not starters_team:
+            starters = self._keep_positions(starters, statuses_team)
+
+        statuses = {name_key(p.get('name')): p for p in statuses_team.get('lineup', [])}
+        lineup = []
+        used = set()
+        for player in starters:
+            pos = player.get('position')
+            if pos in STARTER_POSITIONS and pos not in {p['position'] for p in lineup}:
+                lineup.append(self._with_status(player, statuses))
+                used.add(name_key(player.get('name')))
+        # Остальные игроки (запасные, травмированные) - из источника статусов,
+        # кроме стартеров, которых источник стартеров уже заменил
+        replaced = set(_field_values(statuses_team)['starters'])
+        for player in statuses_team.get('lineup', []):
+            if name_key(player.get('name')) not in used | replaced:
+                lineup.append(dict(player))
+                used.add(name_key(player.get('name')))
+
+        team = {
+            'abbrev': base_team.get('abbrev'),
+            'record': record_team.get('record') or base_team.get('record'),
+            'lineup': lineup,
+            'injuries': [p['name'] for p in lineup if p.get('status') in ('out', 'doubtful')],
+            'provenance': provenance,
+        }
+        for conflict in conflicts:
+            conflict['team'] = team['abbrev']
+        return team, conflicts
+
+    @staticmethod
+    def _keep_positions(starters: list, reference_team: dict) -> list:
+        """
+        Стартеры источника с условными позициями на позициях опорного
+        источника: тот же состав - те же позиции, новый игрок занимает
+        место выбывшего. Иначе начало игры давало бы ложные перестановки.
+        """
+        reference = {}
+        for player in reference_team.get('lineup', []):
+            pos = player.get('position')
+            if pos in STARTER_POSITIONS and pos not in reference.values():
+                reference[name_key(player.get('name'))] = pos
+
+        placed = [None] * len(starters)
+        taken = set()
+        for i, player in enumerate(starters):
+            pos = reference.get(name_key(player.get('name')))
+            if pos:
+                placed[i] = dict(player, position=pos)
+                taken.add(pos)
+        free = [pos for pos in STARTER_POSITIONS if pos not in taken]
+        for i, player in enumerate(starters):
+            if placed[i] is None:
+                pos = player.get('position') if player.get('position') in free else (free[0] if free else None)
+                if pos in free:
+                    free.remove(pos)
+                placed[i] = dict(player, position=pos or player.get('position'))
+        placed.sort(key=lambda p: STARTER_POSITIONS.index(p['position'])
+                    if p['position'] in STARTER_POSITIONS else 9)
+        return placed
+
+    @staticmethod
+    def _with_status(player: dict, statuses: dict) -> dict:
+        merged = dict(player)
+        status_player = statuses.get(name_key(player.get('name')))
+        if status_player:
+            merged['name'] = status_player.get('name') or merged.get('name')
+            merged['status'] = status_player.get('status') or 'active'
+            merged['injury_note'] = status_player.get('injury_note')
+        return merged
+
+    def get_status_report(self) -> str:
+        """Текстовый отчёт по источникам и конфликтам."""
+        lines = ["Источник        OK   Игр   Время   Ответ"]
+        for source in self.sources:
+            status = self.source_status.get(source.name)
+            if not status:
+                lines.append(f"{source.name:<15} -")
+                continue
+            lines.append(f"{source.name:<15} {'да' if status['ok'] else 'нет':<4} {status['games']:<5} "
+                         f"{status['duration']:<7} {status['at']}"
+                         + (f"  {status['error']}" if status['error'] else ""))
+        if self.conflicts:
+            lines.append("")
+            lines.append(f"Конфликты ({len(self.conflicts)}):")
+            for conflict in self.conflicts:
+                lines.append(f"  {conflict['game']} {conflict['team']} {conflict['field']}: "
+                             f"{conflict['chosen']} (расходятся: {', '.join(conflict['sources'])})")
+        return "\n".join(lines)
@@ -8,19 +8,24 @@ from tkinter import ttk, font, messagebox
 import threading
 import json
 import os
-from datetime import datetime
+import time
+import copy
+from collections import deque
+from datetime import datetime, timedelta
 from plyer import notification
 from nba_lineups_scraper import (
-    get_nba_lineups_detailed, fetch_page, parse_lineups, ROTOWIRE_URL,
+    get_nba_lineups_detailed,
     get_team_last_game_starters_nba_api, get_multiple_teams_last_starters,
-    get_team_last_n_games_stats
+    get_team_last_n_games_stats, get_league_last_game_dates, normalize_game_date
+)
+from ai_analyzer import (
+    analyze_lineup_changes, analyze_player_projection, init_openai, cached_chat_completion
 )
-from ai_analyzer import analyze_lineup_changes, analyze_player_projection, init_openai
 
 # Импорт авторизованного парсера (опционально)
 try:
     from rotowire_auth import (
-        check_playwright_installed, fetch_lineups_with_auth,
+        check_playwright_installed,
         run_login, check_auth_status
     )
     ROTOWIRE_AUTH_AVAILABLE = True
@@ -28,117 +33,45 @@ except ImportError:
     ROTOWIRE_AUTH_AVAILABLE = False
 from news_scraper import get_news_by_team, get_news_for_matchup, get_latest_news, scrape_news, init_database
 from team_mapping import get_team_name
+from cache_metrics import (
+    record_hit, record_miss, record_stale, set_cache_file_size, age_since,
+    format_metrics_report, dump_metrics, reset_metrics, CACHE_METRICS_FILE
+)
 from injuries_history import save_injuries, get_injuries_stats
+from lineup_history import record_snapshot
+from lineup_diff import diff_lineups, describe_change, get_starters, fingerprint_lineups
+from event_bus import EventBus, LINEUP_CHANGES_TOPIC, SLATE_PERSIST_TOPIC
+from change_stream import start_change_stream
+from lineup_sources import MultiSourceIngestor, default_sources
+from latency import (
+    mark, record_trace, trace_summary, export_latency_samples, load_latency_samples,
+    format_latency_report
+)
+from virtual_list import VirtualList
+from team_stats_canvas import TeamStatsCanvas, build_team_stats_view
+from ui_dispatch import UIDispatcher, TextStream
+from ui_watchdog import UIWatchdog, UI_WATCHDOG_FILE
+from worker_pool import (
+    WorkerPool, CancelToken,
+    PRIORITY_INTERACTIVE, PRIORITY_DETECTION, PRIORITY_PRELOAD, PRIORITY_NEWS
+)
+from player_index import match_players_by_lastname
+from stat_matrix import TeamStatMatrix, STAT_INDEX
+from team_analytics import get_team_analytics
+from name_resolver import get_resolver, learn_from_games, learn_from_team_games
+from projection_batch import run_projection_batch, get_projection, save_projection
+from prompt_budget import PromptBuilder, get_stats_report as get_prompt_stats_report
 import webbrowser
 
-def get_last_name(full_name):
-    """Извлечение фамилии из полного имени для сравнения."""
-    if not full_name:
-        return ""
-    # Убираем суффиксы типа Jr., III, II
-    name = full_name.replace(" Jr.", "").replace(" III", "").replace(" II", "").strip()
-    parts = name.split()
-    if len(parts) >= 2:
-        # Берём последнюю часть как фамилию
-        return parts[-1].lower()
-    return name.lower()
-
-def get_first_letter(full_name):
-    """Извлечение первой буквы имени."""
-    if not full_name:
-        return ""
-    name = full_name.strip()
-    if name:
-        return name[0].upper()
-    return ""
-
-# Фамилии где есть несколько игроков с одинаковой первой буквой имени
-# Для этих случаев нужно сравнивать полное имя
-AMBIGUOUS_SURNAMES = {
-    'curry': ['stephen', 'seth'],      # Stephen Curry vs Seth Curry
-    'morris': ['marcus', 'markieff'],  # Marcus Morris vs Markieff Morris
-    'martin': ['caleb', 'cody'],       # Caleb Martin vs Cody Martin
-    'holiday': ['jrue', 'justin', 'aaron'],  # Holiday brothers
-}
-
-def get_first_name(full_name):
-    """Извлечение имени (первого слова)."""
-    if not full_name:
-        return ""
-    parts = full_name.replace('.', '').strip().split()
-    if parts:
-        return parts[0].lower()
-    return ""
-
-def names_match(name1, name2):
-    """
-    Сравнение имён игроков: фамилия + первая буква имени.
-    'S. Gilgeous-Alexander' vs 'Shai Gilgeous-Alexander' -> True
-    'D. Mitchell' vs 'Donovan Mitchell' -> True
-
-    Исключение: для игроков с одинаковой фамилией и первой буквой (Curry, Morris, Martin)
-    сравниваем полные имена.
-    """
-    if not name1 or not name2:
-        return False
-    last1 = get_last_name(name1)
-    last2 = get_last_name(name2)
-    if last1 != last2:
-        return False
-
-    # Проверяем проблемные фамилии (братья с одинаковой первой буквой)
-    if last1 in AMBIGUOUS_SURNAMES:
-        first1 = get_first_name(name1)
-        first2 = get_first_name(name2)
-        # Если хотя бы одно имя полное (не сокращение) - сравниваем полные имена
-        # "Stephen Curry" vs "Seth Curry" -> сравниваем stephen != seth -> False
-        # "Stephen Curry" vs "S. Curry" -> stephen vs s -> первые буквы совпадают -> проверяем полное
-        # "S. Curry" vs "Seth Curry" -> s vs seth -> первые буквы совпадают -> проверяем полное
-        if len(first1) > 1 or len(first2) > 1:
-            # Хотя бы одно полное имя - сравниваем полностью
-            if len(first1) > 1 and len(first2) > 1:
-                return first1 == first2
-            # Одно полное, одно сокращение - проверяем начинается ли полное с сокращения
-            if len(first1) > 1:
-                return first1.startswith(first2)
-            else:
-                return first2.startswith(first1)
-
-    first1 = get_first_letter(name1)
-    first2 = get_first_letter(name2)
-    return first1 == first2
-
-def normalize_name(name):
-    """Нормализация имени для сравнения (D. Booker -> booker)."""
-    if not name:
-        return ""
-    return get_last_name(name)
-
-def match_players_by_lastname(current_names, past_names):
-    """
-    Сравнение списков игроков по фамилиям.
-    Возвращает (new_players, removed_players) с оригинальными именами.
-    """
-    # Создаём словари: фамилия -> оригинальное имя
-    current_by_lastname = {normalize_name(n): n for n in current_names}
-    past_by_lastname = {normalize_name(n): n for n in past_names}
-
-    current_lastnames = set(current_by_lastname.keys())
-    past_lastnames = set(past_by_lastname.keys())
-
-    # Новые игроки (есть сейчас, не было раньше)
-    new_lastnames = current_lastnames - past_lastnames
-    new_players = [current_by_lastname[ln] for ln in new_lastnames]
-
-    # Выбывшие игроки (были раньше, нет сейчас)
-    removed_lastnames = past_lastnames - current_lastnames
-    removed_players = [past_by_lastname[ln] for ln in removed_lastnames]
-
-    return new_players, removed_players
-
 # Файл для хранения составов
 LINEUPS_CACHE_FILE = "lineups_cache.json"  # Сохраняем в текущую директорию
 
+# Журнал изменений составов (JSON Lines, дописывается подписчиком шины)
+CHANGES_LOG_FILE = "changes_log.jsonl"  # Сохраняем в текущую директорию
+
+# Компактный снимок последнего слейта для мгновенного первого рендера
+SLATE_SNAPSHOT_FILE = "slate_snapshot.json"  # Сохраняем в текущую директорию
+
 # Файл для хранения исторических данных (последние игры)
 HISTORICAL_CACHE_FILE = "historical_cache.json"  # Сохраняем в текущую директорию
 
@@ -148,15 +81,33 @@ TEAM_STATS_CACHE_FILE = "team_stats_cache.json"  # Сохраняем в тек
 # Интервал проверки (в миллисекундах) - 3 минуты
 CHECK_INTERVAL_MS = 3 * 60 * 1000
 
-# Время жизни кэша исторических данных (часы)
+# Время жизни кэша исторических данных (часы) - только если нет данных о расписании
 HISTORICAL_CACHE_TTL_HOURS = 12
 
-# Время жизни кэша статистики команд (часы)
+# Время жизни кэша статистики команд (часы) - только если нет данных о расписании
 TEAM_STATS_CACHE_TTL_HOURS = 4
 
+# Как часто сверяться с логом игр лиги (минуты)
+SCHEDULE_CHECK_INTERVAL_MINUTES = 10
+
+# Если игра уже сыграна, но NBA API ещё не отдал её статистику -
+# повторный запрос не чаще чем раз в N минут
+INCOMPLETE_STATS_RETRY_MINUTES = 30
+
 # Максимальный возраст кэша составов при запуске (часы)
 LINEUPS_CACHE_MAX_AGE_HOURS = 4
 
+# Сколько новостей показывать (списки виртуализированы - виджеты только для видимых)
+NEWS_PANEL_LIMIT = 200
+NEWS_WINDOW_LIMIT = 300
+
+# Потоковый вывод ответов AI: текст появляется в окне по мере генерации
+AI_STREAMING_ENABLED = True
+
+# Бюджет токенов промпта AI анализа команды (новости сокращаются первыми)
+TEAM_ANALYSIS_PROMPT_BUDGET = 2500
+TEAM_ANALYSIS_NEWS_BUDGET = 400
+
 # Цвета NBA команд (основные)
 TEAM_COLORS = {
     'ATL': {'primary': '#E03A3E', 'secondary': '#C1D32F'},
@@ -202,54 +153,238 @@ class LineupsGUI:
         self.root.geometry("1200x800")
         self.root.configure(bg='#1a1a2e')
 
+        # Замер колбэков Tk и поиск зависаний - до создания виджетов, чтобы замерялись все
+        self.watchdog = UIWatchdog(self.root)
+        self.watchdog.start()
+
+        # Обновления из фоновых потоков - через одну очередь, разбираемую в UI потоке
+        self.ui = UIDispatcher(self.root, watchdog=self.watchdog)
+        self.ui.start()
+        # Фоновые задачи - в общем пуле с приоритетами; отмена при смене даты
+        self.pool = WorkerPool()
+        self._date_token = CancelToken()
+
         self.games = []
         self.previous_lineups = {}  # Хранение предыдущих составов
+        self._lineup_fingerprints = None  # (составы, их отпечатки) - считаются один раз
+        self._learned_fingerprints = None  # Отпечатки слейта, уже переданного в справочник имён
+        self.event_bus = EventBus()  # Шина событий изменений составов
+        # (копия trace в событиях, живой trace) последних опросов с изменениями:
+        # события получают неизменяемую копию, этапы notified/ai_done отмечаются в живом
+        self._change_traces = deque(maxlen=20)
+        # Источники составов опрашиваются параллельно (RotoWire, nba_api live, файл)
+        self.lineup_sources = MultiSourceIngestor(default_sources(lambda: self.rotowire_auth_available))
+        self._setup_change_consumers()
         self.changes_log = []  # Лог изменений
         self._click_handlers = []  # Хранение ссылок на обработчики кликов (GC protection)
+        self._game_cards = {}  # {game_key: виджеты карточки} - только для отрисованных карточек
         self.auto_check_enabled = True  # Автопроверка включена
         self.check_job = None  # ID задачи автопроверки
         self.historical_cache = {}  # Кэш исторических данных (последние игры команд)
         self.team_stats_cache = {}  # Кэш статистики последних 3 игр команд
+        self.team_last_game_dates = {}  # Дата последней сыгранной игры каждой команды (по логу лиги)
+        self.schedule_checked_at = None  # Когда последний раз сверялись с логом лиги
+        self.slate_date = ''  # Дата слейта в кэше составов
+        self._slate_games = set()  # Ключи игр слейта slate_date - по ним виден переход фида на новый слейт
+        self._schedule_lock = threading.Lock()
+        self._team_stats_lock = threading.Lock()
+        self._team_stats_inflight = {}  # {team_abbrev: Event} - загрузки статистики, идущие сейчас
+        self._player_index = {}  # {имя игрока: команда, соперник, дома/в гостях} для текущего слейта
+        self._player_index_games = None  # Для какого self.games построен индекс
+        self._team_stat_matrices = {}  # {команда: (games, TeamStatMatrix)} - индекс имён + статистика в массивах
         self.cache_is_stale = False  # Флаг устаревшего кэша
         self.ai_enabled = False  # AI анализ
         self.selected_date = "today"  # Выбранная дата: "today" или "tomorrow"
+        self.rotowire_auth_available = False  # Уточняется в фоне (check_auth_status)
+        self._login_thread = None  # Поток интерактивной авторизации RotoWire
+        self.init_done = False  # Фоновая инициализация завершена
+        self.startup_timings = {}  # Время фаз запуска (мс)
+        self._startup_started = time.perf_counter()
+        self._snapshot_games = None  # Игры, отрисованные из снимка
+        self._snapshot_saved_at = ''  # Когда сохранён снимок
+
+        # Тёплый старт: сначала показываем последний сохранённый слейт из снимка,
+        # всё остальное (авторизация, БД, кэши, AI) - в фоне
+        phase_started = time.perf_counter()
+        snapshot_loaded = self.load_slate_snapshot()
+        self._record_startup_phase('snapshot', phase_started)
+
+        phase_started = time.perf_counter()
+        self.setup_ui()
+        self._record_startup_phase('setup_ui', phase_started)
+
+        if snapshot_loaded:
+            phase_started = time.perf_counter()
+            self._update_ui(preload=False)
+            self.status_label.config(text=f"{len(self.games)} games (snapshot), initializing...", fg='#ffd93d')
+            self._record_startup_phase('first_render', phase_started)
+        else:
+            self.status_label.config(text="Initializing...", fg='#ffd93d')
+
+        # Первая отрисовка окна - считаем от старта
+        self.root.after_idle(lambda: self._record_startup_phase('first_paint', self._startup_started))
+
+        self.pool.submit(self._background_init, priority=PRIORITY_DETECTION, key='init')
+
+        # Запускаем автопроверку составов
+        self.schedule_auto_check()
+
+    def _setup_change_consumers(self):
+        """
+        Подписчики на изменения составов.
+
+        Каждый работает в своём потоке со своей очередью - детекция изменений
+        не ждёт уведомлений, окон и AI. Новый потребитель = ещё один subscribe().
+        """
+        # Системное уведомление (plyer может подвисать - отдельный поток)
+        self.event_bus.subscribe('notification', self.show_notification)
+        # Подсветка, мигание, всплывающее окно - в UI потоке
+        self.event_bus.subscribe('ui', lambda changes: self.ui.post(lambda: self.highlight_changes(changes)))
+        # Звуковой сигнал
+        self.event_bus.subscribe('sound', self._play_change_sound)
+        # AI анализ изменившихся команд
+        self.event_bus.subscribe('ai', self.auto_ai_analysis_on_change)
+        # Журнал изменений в файл
+        self.event_bus.subscribe('file_log', self._append_changes_to_file, maxsize=500)
+        # Запись кэша составов, истории и снимка слейта - не в UI потоке;
+        # очередь на одно событие: ждущее сохранение заменяется более новым
+        self.event_bus.subscribe('persist', self._persist_slate, topics=(SLATE_PERSIST_TOPIC,), maxsize=1)
+
+        # SSE сервер + webhooks для внешних сервисов (настройки в .env)
+        self.change_stream = None
+        try:
+            self.change_stream = start_change_stream()
+        except Exception as e:
+            print(f"Ошибка запуска потока изменений: {e}")
+        if self.change_stream:
+            self.event_bus.subscribe('stream', self.change_stream.publish, maxsize=500)
+
+    def _record_startup_phase(self, phase, started):
+        """Запись длительности фазы запуска."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.startup_timings[phase] = round(elapsed_ms, 1)
+        print(f"[STARTUP] {phase}: {elapsed_ms:.0f} мс")
+
+    def _background_init(self):
+        """Фоновая инициализация: авторизация, AI, БД новостей, кэши."""
         # Check if auth cookies exist (Playwright only needed for login, not fetching)
-        self.rotowire_auth_available = ROTOWIRE_AUTH_AVAILABLE and check_auth_status() if ROTOWIRE_AUTH_AVAILABLE else False
+        phase_started = time.perf_counter()
+        try:
+            self.rotowire_auth_available = ROTOWIRE_AUTH_AVAILABLE and check_auth_status()
+        except Exception as e:
+            print(f"Ошибка проверки авторизации RotoWire: {e}")
+            self.rotowire_auth_available = False
+        self._record_startup_phase('auth_check', phase_started)
 
         # Инициализируем AI
+        phase_started = time.perf_counter()
         self.ai_enabled = init_openai()
         if self.ai_enabled:
             print("AI анализатор инициализирован")
         else:
             print("AI анализатор недоступен - проверьте .env файл")
+        self._record_startup_phase('openai', phase_started)
 
         # Инициализируем базу новостей
+        phase_started = time.perf_counter()
         try:
             init_database()
             print("База новостей инициализирована")
         except Exception as e:
             print(f"Ошибка инициализации базы новостей: {e}")
+        self._record_startup_phase('news_db', phase_started)
 
-        # Загружаем кэши если есть
-        self.load_cache()
+        # Загружаем кэши если есть (составы - в локальную переменную: games и
+        # previous_lineups меняются только в UI потоке, где уже отрисован снимок)
+        phase_started = time.perf_counter()
+        lineups_cache = self._read_lineups_cache()
         self.load_historical_cache()
         self.load_team_stats_cache()
+        self._record_startup_phase('caches', phase_started)
 
-        self.setup_ui()
+        self.ui.post(lambda: self._on_background_init_done(lineups_cache))
 
-        # Если кэш устарел (>4 часа), сначала показываем сообщение, потом обновляем
-        if self.cache_is_stale:
-            self.status_label.config(text="Cache is stale (>4h), refreshing...", fg='#ffd93d')
-            print("Кэш устарел более чем на 4 часа - запускаем обновление...")
+    def _on_background_init_done(self, lineups_cache):
+        """Завершение инициализации в UI потоке."""
+        self._apply_lineups_cache(lineups_cache)
+        self.init_done = True
+        self._record_startup_phase('init_total', self._startup_started)
 
-        self.load_data()
+        # Кнопки, зависящие от фоновых проверок
+        self._update_auth_controls()
+        self.ai_btn.config(bg='#9b59b6' if self.ai_enabled else '#555555')
 
-        # Запускаем автопроверку составов
-        self.schedule_auto_check()
+        # Панель новостей - после инициализации БД
+        self._load_news_panel()
+
+        if not self.cache_is_stale and self.games and self.games == self._snapshot_games:
+            # Снимок совпадает с актуальным кэшем - перерисовка не нужна
+            print("Используем кэшированные составы (свежие, уже отрисованы из снимка)")
+            self.status_label.config(text=f"Ready ({len(self.games)} games)", fg='#a0a0a0')
+            self.preload_all_teams_stats()
+        else:
+            if self._snapshot_games:
+                # Пока грузятся свежие составы, на экране устаревший снимок
+                record_stale('lineups', age_since(self._snapshot_saved_at))
+            # Если кэш устарел (>4 часа), сначала показываем сообщение, потом обновляем
+            if self.cache_is_stale:
+                self.status_label.config(text="Cache is stale (>4h), refreshing...", fg='#ffd93d')
+                print("Кэш устарел более чем на 4 часа - запускаем обновление...")
+            self.load_data()
 
         # Запускаем фоновое обновление новостей при старте
         self.update_news_in_background()
 
+    def _update_auth_controls(self):
+        """Показ кнопки RotoWire Login, если есть авторизация."""
+        if self.rotowire_auth_available and self.login_btn is None:
+            self.login_btn = tk.Button(self.date_frame, text="🔑",
+                                       command=self.rotowire_login,
+                                       bg='#2ecc71', fg='white',
+                                       font=('Arial', 10),
+                                       relief='flat', padx=5, pady=3)
+            self.login_btn.pack(side='left', padx=5)
+
+    def load_slate_snapshot(self):
+        """
+        Загрузка компактного снимка последнего слейта.
+
+        Returns:
+            True если снимок загружен и есть что показать
+        """
+        try:
+            if not os.path.exists(SLATE_SNAPSHOT_FILE):
+                return False
+            with open(SLATE_SNAPSHOT_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('selected_date', 'today') != self.selected_date:
+                return False
+            self.games = data.get('games', [])
+            self._snapshot_games = self.games
+            self._snapshot_saved_at = data.get('saved_at', '')
+            print(f"Загружен снимок слейта {data.get('slate_date', '?')}: {len(self.games)} игр "
+                  f"(сохранён {data.get('saved_at', '?')})")
+            return bool(self.games)
+        except Exception as e:
+            print(f"Ошибка загрузки снимка слейта: {e}")
+            return False
+
+    def save_slate_snapshot(self, state):
+        """Сохранение компактного снимка слейта (только игры, без лога и истории)."""
+        try:
+            data = {
+                'saved_at': state['saved_at'],
+                'slate_date': state['slate_date'],
+                'selected_date': state['selected_date'],
+                'games': state['games'],
+            }
+            tmp_file = SLATE_SNAPSHOT_FILE + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, SLATE_SNAPSHOT_FILE)
+        except Exception as e:
+            print(f"Ошибка сохранения снимка слейта: {e}")
+
     def setup_ui(self):
         # Заголовок
         header_frame = tk.Frame(self.root, bg='#16213e', height=60)
@@ -264,6 +399,7 @@ class LineupsGUI:
         # Переключатель дат Today/Tomorrow
         date_frame = tk.Frame(header_frame, bg='#16213e')
         date_frame.pack(side='left', padx=10, pady=15)
+        self.date_frame = date_frame
 
         self.today_btn = tk.Button(date_frame, text="Today",
                                    command=lambda: self.switch_date("today"),
@@ -279,14 +415,9 @@ class LineupsGUI:
                                       relief='flat', padx=12, pady=3)
         self.tomorrow_btn.pack(side='left', padx=2)
 
-        # Кнопка RotoWire Login (если доступен Playwright)
-        if self.rotowire_auth_available:
-            self.login_btn = tk.Button(date_frame, text="🔑",
-                                       command=self.rotowire_login,
-                                       bg='#2ecc71', fg='white',
-                                       font=('Arial', 10),
-                                       relief='flat', padx=5, pady=3)
-            self.login_btn.pack(side='left', padx=5)
+        # Кнопка RotoWire Login (если доступен Playwright) - появится после фоновой проверки
+        self.login_btn = None
+        self._update_auth_controls()
 
         # Кнопка обновления
         self.refresh_btn = tk.Button(header_frame, text="Refresh",
@@ -304,6 +435,22 @@ class LineupsGUI:
                                  relief='flat', padx=15, pady=5)
         self.log_btn.pack(side='right', padx=5, pady=15)
 
+        # Кнопка диагностики кэшей
+        self.cache_stats_btn = tk.Button(header_frame, text="Cache Stats",
+                                         command=self.show_cache_metrics,
+                                         bg='#0f3460', fg='white',
+                                         font=('Arial', 10, 'bold'),
+                                         relief='flat', padx=10, pady=5)
+        self.cache_stats_btn.pack(side='right', padx=5, pady=15)
+
+        # Кнопка диагностики UI (зависания, время колбэков)
+        self.ui_stats_btn = tk.Button(header_frame, text="UI Stats",
+                                      command=self.show_ui_diagnostics,
+                                      bg='#0f3460', fg='white',
+                                      font=('Arial', 10, 'bold'),
+                                      relief='flat', padx=10, pady=5)
+        self.ui_stats_btn.pack(side='right', padx=5, pady=15)
+
         # Кнопка сравнения с прошлой игрой
         self.compare_btn = tk.Button(header_frame, text="vs Last Game",
                                      command=self.compare_with_last_game,
@@ -321,6 +468,14 @@ class LineupsGUI:
                                 relief='flat', padx=10, pady=5)
         self.ai_btn.pack(side='right', padx=5, pady=15)
 
+        # Кнопка пакетных AI-прогнозов для всех стартеров слейта
+        self.ai_batch_btn = tk.Button(header_frame, text="AI Batch",
+                                      command=self.start_projection_batch,
+                                      bg=ai_btn_color, fg='white',
+                                      font=('Arial', 10, 'bold'),
+                                      relief='flat', padx=10, pady=5)
+        self.ai_batch_btn.pack(side='right', padx=5, pady=15)
+
         # Кнопка Новости
         self.news_btn = tk.Button(header_frame, text="📰 News",
                                   command=self.show_news_window,
@@ -361,22 +516,14 @@ class LineupsGUI:
         games_container = tk.Frame(main_container, bg='#1a1a2e')
         games_container.pack(side='left', fill='both', expand=True)
 
-        # Canvas и scrollbar для игр
-        self.canvas = tk.Canvas(games_container, bg='#1a1a2e', highlightthickness=0)
-        scrollbar = ttk.Scrollbar(games_container, orient='vertical', command=self.canvas.yview)
-
-        self.scrollable_frame = tk.Frame(self.canvas, bg='#1a1a2e')
-
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor='nw')
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-
-        scrollbar.pack(side='right', fill='y')
-        self.canvas.pack(side='left', fill='both', expand=True)
+        # Список игр: виджеты только для видимых карточек (+ буфер)
+        self.games_list = VirtualList(games_container, self._create_game_row,
+                                      update_row=self._update_game_row,
+                                      release_row=self._release_game_card,
+                                      key=self.get_game_key, estimated_height=330,
+                                      row_gap=8, recycle=False)
+        self.games_list.pack(fill='both', expand=True)
+        self.canvas = self.games_list.canvas
 
         # Правая часть - панель новостей (фиксированная ширина 320px)
         self._create_news_panel(main_container)
@@ -415,64 +562,89 @@ class LineupsGUI:
                                relief='flat', padx=8, pady=2)
         refresh_btn.pack(side='right', padx=10, pady=8)
 
-        # Скроллируемый контейнер для новостей
+        # Скроллируемый список новостей (виджеты только для видимых карточек)
         container = tk.Frame(news_panel, bg='#1a1a2e')
         container.pack(fill='both', expand=True, padx=5, pady=5)
 
-        self.news_panel_canvas = tk.Canvas(container, bg='#1a1a2e', highlightthickness=0, width=460)
-        scrollbar = ttk.Scrollbar(container, orient='vertical', command=self.news_panel_canvas.yview)
-
-        self.news_panel_frame = tk.Frame(self.news_panel_canvas, bg='#1a1a2e')
-        self.news_panel_frame.bind(
-            "<Configure>",
-            lambda e: self.news_panel_canvas.configure(scrollregion=self.news_panel_canvas.bbox("all"))
-        )
-
-        self.news_panel_canvas.create_window((0, 0), window=self.news_panel_frame, anchor='nw')
-        self.news_panel_canvas.configure(yscrollcommand=scrollbar.set)
+        self.news_panel_list = VirtualList(container, self._create_news_panel_card,
+                                           update_row=self._update_news_panel_card,
+                                           key=self._news_key, estimated_height=70,
+                                           row_gap=3, width=460)
+        self.news_panel_list.pack(fill='both', expand=True)
+        self.news_panel_canvas = self.news_panel_list.canvas
 
         # Mouse wheel для новостей
         self.news_panel_canvas.bind("<Enter>", lambda e: self.news_panel_canvas.bind_all("<MouseWheel>", self._on_news_mousewheel))
         self.news_panel_canvas.bind("<Leave>", lambda e: self.news_panel_canvas.unbind_all("<MouseWheel>"))
 
-        scrollbar.pack(side='right', fill='y')
-        self.news_panel_canvas.pack(side='left', fill='both', expand=True)
+        # Новости загрузятся после инициализации БД (_on_background_init_done)
+        self.news_panel_list.show_message("Loading news...", font=('Arial', 10))
 
-        # Загружаем новости
-        self._load_news_panel()
+    @staticmethod
+    def _news_key(news):
+        return news.get('url') or news.get('title', '')
 
-    def _load_news_panel(self):
-        """Загрузка новостей в боковую панель."""
-        # Очищаем
-        for widget in self.news_panel_frame.winfo_children():
-            widget.destroy()
+    def _unique_news(self, news_list):
+        """Без повторов по ключу (ключи строк VirtualList уникальны)."""
+        return list({self._news_key(news): news for news in news_list}.values())
+
+    @staticmethod
+    def _open_news_url(card):
+        if card.news_url:
+            webbrowser.open(card.news_url)
 
+    def _load_news_panel(self):
+        """Загрузка новостей в боковую панель (позиция прокрутки сохраняется)."""
         try:
-            news_list = get_latest_news(15)  # Последние 15 новостей
+            news_list = get_latest_news(NEWS_PANEL_LIMIT)
         except Exception as e:
-            error_label = tk.Label(self.news_panel_frame,
-                                  text=f"Error: {e}",
-                                  font=('Arial', 10), fg='#ff6b6b', bg='#1a1a2e',
-                                  wraplength=280)
-            error_label.pack(pady=20)
+            self.news_panel_list.show_message(f"Error: {e}", fg='#ff6b6b', font=('Arial', 10))
             return
 
         if not news_list:
-            no_news = tk.Label(self.news_panel_frame,
-                              text="No news available.\nClick Refresh to update.",
-                              font=('Arial', 10), fg='#a0a0a0', bg='#1a1a2e')
-            no_news.pack(pady=30)
+            self.news_panel_list.show_message("No news available.\nClick Refresh to update.",
+                                              font=('Arial', 10))
             return
 
-        # Отображаем новости компактно
-        for news in news_list:
-            self._create_news_panel_card(news)
+        self.news_panel_list.set_items(self._unique_news(news_list))
 
-    def _create_news_panel_card(self, news):
+    def _create_news_panel_card(self, parent, news):
         """Создание компактной карточки новости для боковой панели."""
-        card = tk.Frame(self.news_panel_frame, bg='#0f3460', cursor='hand2')
-        card.pack(fill='x', pady=3, padx=5)  # Добавлен отступ слева/справа для карточки
+        card = tk.Frame(parent, bg='#0f3460', cursor='hand2')
 
+        # Верхняя строка: дата и команды
+        card.meta_frame = tk.Frame(card, bg='#0f3460')
+        card.meta_frame.pack(fill='x', padx=10, pady=(5, 2))
+
+        card.date_label = tk.Label(card.meta_frame, font=('Arial', 8), fg='#888888', bg='#0f3460')
+
+        # Теги команд (максимум 2) - показываются по числу команд новости
+        card.tags = [tk.Label(card.meta_frame, font=('Arial', 7, 'bold'), fg='white', padx=4, pady=1)
+                     for _ in range(2)]
+
+        # Заголовок новости (без обрезки - wraplength сам переносит)
+        card.title_label = tk.Label(card, font=('Arial', 9), fg='#ffffff', bg='#0f3460',
+                                    wraplength=420, justify='left', anchor='w')
+        card.title_label.pack(fill='x', padx=10, pady=(0, 8))
+
+        # Клик открывает ссылку (текущей новости карточки - карточки переиспользуются)
+        for widget in (card, card.title_label, card.meta_frame):
+            widget.bind("<Button-1>", lambda e, c=card: self._open_news_url(c))
+
+        # Hover эффект
+        def set_bg(color):
+            for widget in (card, card.title_label, card.meta_frame, card.date_label):
+                widget.configure(bg=color)
+
+        card.set_bg = set_bg
+        card.bind("<Enter>", lambda e: set_bg('#1a4a7a'))
+        card.bind("<Leave>", lambda e: set_bg('#0f3460'))
+
+        self._update_news_panel_card(card, news)
+        return card
+
+    def _update_news_panel_card(self, card, news, same_key=False):
+        """Заполнение карточки боковой панели данными новости."""
         # Дата
         published = news.get('published_at', '')
         if published:
@@ -484,61 +656,24 @@ class LineupsGUI:
         else:
             date_str = ''
 
-        # Верхняя строка: дата и команды
-        meta_frame = tk.Frame(card, bg='#0f3460')
-        meta_frame.pack(fill='x', padx=10, pady=(5, 2))
-
+        card.date_label.config(text=date_str)
         if date_str:
-            date_label = tk.Label(meta_frame, text=date_str,
-                                 font=('Arial', 8), fg='#888888', bg='#0f3460')
-            date_label.pack(side='left')
-
-        # Теги команд
-        teams_str = news.get('teams', '')
-        if teams_str:
-            teams = teams_str.split(',')[:2]  # Максимум 2 тега
-            for team in teams:
-                team = team.strip()
-                color = TEAM_COLORS.get(team, {}).get('primary', '#444444')
-                tag = tk.Label(meta_frame, text=team,
-                              font=('Arial', 7, 'bold'), fg='white', bg=color,
-                              padx=4, pady=1)
-                tag.pack(side='right', padx=1)
-
-        # Заголовок новости (без обрезки - wraplength сам переносит)
-        title = news.get('title', 'No title')
-
-        title_label = tk.Label(card, text=title,
-                              font=('Arial', 9), fg='#ffffff', bg='#0f3460',
-                              wraplength=420, justify='left', anchor='w')
-        title_label.pack(fill='x', padx=10, pady=(0, 8))
+            card.date_label.pack(side='left')
+        else:
+            card.date_label.pack_forget()
 
-        # Клик открывает ссылку
-        url = news.get('url', '')
-        if url:
-            card.bind("<Button-1>", lambda e, u=url: webbrowser.open(u))
-            title_label.bind("<Button-1>", lambda e, u=url: webbrowser.open(u))
-            meta_frame.bind("<Button-1>", lambda e, u=url: webbrowser.open(u))
+        teams = [team.strip() for team in news.get('teams', '').split(',') if team.strip()][:2]
+        for i, tag in enumerate(card.tags):
+            if i < len(teams):
+                tag.config(text=teams[i], bg=TEAM_COLORS.get(teams[i], {}).get('primary', '#444444'))
+                tag.pack(side='right', padx=1)
+            else:
+                tag.pack_forget()
 
-        # Hover эффект
-        def on_enter(e):
-            card.configure(bg='#1a4a7a')
-            title_label.configure(bg='#1a4a7a')
-            meta_frame.configure(bg='#1a4a7a')
-            for child in meta_frame.winfo_children():
-                if isinstance(child, tk.Label) and child.cget('fg') == '#888888':
-                    child.configure(bg='#1a4a7a')
-
-        def on_leave(e):
-            card.configure(bg='#0f3460')
-            title_label.configure(bg='#0f3460')
-            meta_frame.configure(bg='#0f3460')
-            for child in meta_frame.winfo_children():
-                if isinstance(child, tk.Label) and child.cget('fg') == '#888888':
-                    child.configure(bg='#0f3460')
-
-        card.bind("<Enter>", on_enter)
-        card.bind("<Leave>", on_leave)
+        card.title_label.config(text=news.get('title', 'No title'))
+        card.news_url = news.get('url', '')
+        card.set_bg('#0f3460')
+        return True
 
     def _refresh_news_panel(self):
         """Обновление новостей в боковой панели."""
@@ -547,10 +682,9 @@ class LineupsGUI:
                 scrape_news(pages=2)
             except Exception as e:
                 print(f"Error updating news: {e}")
-            self.root.after(0, self._load_news_panel)
+            self.ui.post(self._load_news_panel)
 
-        thread = threading.Thread(target=update, daemon=True)
-        thread.start()
+        self.pool.submit(update, priority=PRIORITY_NEWS, key='news_panel_refresh')
 
     def load_data(self):
         """Загрузка данных в фоновом потоке."""
@@ -566,27 +700,20 @@ class LineupsGUI:
         self.status_label.config(text="Loading...")
         self.refresh_btn.config(state='disabled')
 
-        thread = threading.Thread(target=self._fetch_data, daemon=True)
-        thread.start()
+        self.pool.submit(self._fetch_data, self._date_token, priority=PRIORITY_INTERACTIVE,
+                         key='fetch_data', token=self._date_token)
 
-    def _fetch_data(self):
-        """Получение данных с сайта."""
+    def _fetch_data(self, token=None):
+        """Получение данных с сайта (token отменяется при смене даты)."""
         try:
-            if self.rotowire_auth_available:
-                # Используем авторизованный парсинг (работает и для today и для tomorrow)
-                print(f"Загрузка лайнапов на {self.selected_date} (авторизованный режим)...")
-                self.games = fetch_lineups_with_auth(self.selected_date)
-            else:
-                # Стандартный парсинг (без Playwright)
-                url = ROTOWIRE_URL
-                if self.selected_date == "tomorrow":
-                    url = f"{ROTOWIRE_URL}?date=tomorrow"
-                    print(f"Загрузка лайнапов на завтра (без авторизации - могут быть ограничения)...")
-                else:
-                    print(f"Загрузка лайнапов на сегодня...")
-
-                soup = fetch_page(url)
-                self.games = parse_lineups(soup)
+            # Все доступные источники параллельно, результат - сведённый слейт
+            mode = "авторизованный режим" if self.rotowire_auth_available else "без авторизации"
+            print(f"Загрузка лайнапов на {self.selected_date} ({mode})...")
+            games = self.lineup_sources.fetch(self.selected_date)
+            if token is not None and token.cancelled:
+                print("Загрузка лайнапов отменена: дата переключена")
+                return
+            self.games = games
 
             # Помечаем кэш как свежий и сохраняем
             self.cache_is_stale = False
@@ -595,10 +722,10 @@ class LineupsGUI:
             # Сохраняем травмы в базу для исторического анализа
             self._save_injuries_to_db()
 
-            self.root.after(0, self._update_ui)
+            self.ui.post(self._update_ui)
         except Exception as e:
-            self.root.after(0, lambda: self.status_label.config(text=f"Error: {e}"))
-            self.root.after(0, lambda: self.refresh_btn.config(state='normal'))
+            self.ui.post(lambda: self.status_label.config(text=f"Error: {e}"), key='status')
+            self.ui.post(lambda: self.refresh_btn.config(state='normal'))
 
     def _save_injuries_to_db(self):
         """Сохранение травм в базу для исторического анализа."""
@@ -628,34 +755,57 @@ class LineupsGUI:
             if home_out and home_abbrev:
                 save_injuries(home_abbrev, home_out, today)
 
-    def _update_ui(self):
-        """Обновление интерфейса с данными."""
-        # Очищаем старые виджеты и обработчики
-        self._click_handlers.clear()
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+    def _update_ui(self, preload=True):
+        """
+        Обновление интерфейса с данными.
 
+        Карточки не пересоздаются: одна карточка на get_game_key(), у
+        отрисованных меняются только изменившиеся подписи. Виджеты есть
+        только у карточек в видимой области (VirtualList).
+        """
         date_text = "today" if self.selected_date == "today" else "tomorrow"
         if not self.games:
-            no_games = tk.Label(self.scrollable_frame, text=f"No games {date_text}",
-                               font=('Arial', 16), fg='#a0a0a0', bg='#1a1a2e')
-            no_games.pack(pady=50)
+            self.games_list.show_message(f"No games {date_text}", font=('Arial', 16))
         else:
-            # Создаем карточки игр
-            for i, game in enumerate(self.games):
-                self.create_game_card(game, i)
+            games_by_key = {}
+            for game in self.games:
+                games_by_key.setdefault(self.get_game_key(game), game)
+            self.games_list.set_items(list(games_by_key.values()))
 
         self.status_label.config(text=f"{len(self.games)} games {date_text}")
         self.refresh_btn.config(state='normal')
 
-        # Предзагружаем статистику всех команд в фоне
-        self.preload_all_teams_stats()
+        # Предзагружаем статистику всех команд в фоне (не до загрузки кэшей)
+        if preload and self.init_done:
+            self.preload_all_teams_stats()
+
+    def _create_game_row(self, parent, game):
+        return self.create_game_card(game, parent)['frame']
+
+    def _update_game_row(self, widget, game, same_key):
+        """Карточка правится только под свою же игру (цвета и клики привязаны к командам)."""
+        if not same_key:
+            return False
+        self._patch_game_card(self._game_cards[self.get_game_key(game)], game)
+        return True
+
+    def _release_game_card(self, widget, key):
+        """Карточка ушла из видимой области - забываем её виджеты."""
+        card = self._game_cards.pop(key, None)
+        if card is None:
+            return
+        for team_view in card['teams'].values():
+            for row in team_view['starter_rows'] + team_view['injured_rows']:
+                self._forget_click_handler(row['name_label'])
 
-    def create_game_card(self, game, index):
-        """Создание карточки одной игры."""
+    def _forget_click_handler(self, label):
+        if label in self._click_handlers:
+            self._click_handlers.remove(label)
+
+    def create_game_card(self, game, parent):
+        """Создание карточки одной игры (размещает её VirtualList)."""
         # Основной контейнер карточки
-        card = tk.Frame(self.scrollable_frame, bg='#16213e', relief='flat')
-        card.pack(fill='x', padx=5, pady=8)
+        card = tk.Frame(parent, bg='#16213e', relief='flat')
 
         # Заголовок игры (время)
         game_time = game.get('game_time', 'TBD')
@@ -677,7 +827,7 @@ class LineupsGUI:
         away_frame = tk.Frame(teams_frame, bg='#16213e')
         away_frame.pack(side='left', fill='both', expand=True, padx=5)
         # Away team plays against Home team, not at home
-        self.create_team_lineup(away_frame, away, 'away', opponent_abbrev=home.get('abbrev'), is_home=False)
+        away_view = self.create_team_lineup(away_frame, away, 'away', opponent_abbrev=home.get('abbrev'), is_home=False)
 
         # VS посередине
         vs_frame = tk.Frame(teams_frame, bg='#16213e', width=60)
@@ -692,7 +842,50 @@ class LineupsGUI:
         home_frame = tk.Frame(teams_frame, bg='#16213e')
         home_frame.pack(side='left', fill='both', expand=True, padx=5)
         # Home team plays against Away team, at home
-        self.create_team_lineup(home_frame, home, 'home', opponent_abbrev=away.get('abbrev'), is_home=True)
+        home_view = self.create_team_lineup(home_frame, home, 'home', opponent_abbrev=away.get('abbrev'), is_home=True)
+
+        card_view = {
+            'frame': card,
+            'time_label': time_label,
+            'game_time': game_time,
+            'teams': {'away_team': away_view, 'home_team': home_view},
+        }
+        self._game_cards[self.get_game_key(game)] = card_view
+        return card_view
+
+    def _patch_game_card(self, card_view, game):
+        """Правка существующей карточки: только подписи, которые реально изменились."""
+        game_time = game.get('game_time', 'TBD')
+        if card_view['game_time'] != game_time:
+            card_view['time_label'].config(text=game_time)
+            card_view['game_time'] = game_time
+
+        for team_type, team_view in card_view['teams'].items():
+            self._patch_team_lineup(team_view, game.get(team_type, {}))
+
+    def _split_lineup(self, lineup):
+        """Стартеры (первые 5 по позициям PG, SG, SF, PF, C) и травмированные (OUT)."""
+        starters = []
+        bench = []
+
+        for player in lineup:
+            pos = player.get('position', '')
+            if pos in POSITIONS_ORDER and len(starters) < 5:
+                # Проверяем что эта позиция еще не занята
+                existing_positions = [p.get('position') for p in starters]
+                if pos not in existing_positions:
+                    starters.append(player)
+                else:
+                    bench.append(player)
+            else:
+                bench.append(player)
+
+        # Если не хватает стартеров, добавляем из bench
+        while len(starters) < 5 and bench:
+            starters.append(bench.pop(0))
+
+        injured = [p for p in lineup if p.get('status') == 'out']
+        return starters, injured
 
     def create_team_lineup(self, parent, team_data, team_type, opponent_abbrev=None, is_home=None):
         """Создание блока состава одной команды."""
@@ -736,33 +929,32 @@ class LineupsGUI:
         players_frame = tk.Frame(parent, bg='#1a1a2e')
         players_frame.pack(fill='x', padx=2, pady=5)
 
-        # Фильтруем только стартовый состав (первые 5 по позициям PG, SG, SF, PF, C)
-        starters = []
-        bench = []
-
-        for player in lineup:
-            pos = player.get('position', '')
-            if pos in POSITIONS_ORDER and len(starters) < 5:
-                # Проверяем что эта позиция еще не занята
-                existing_positions = [p.get('position') for p in starters]
-                if pos not in existing_positions:
-                    starters.append(player)
-                else:
-                    bench.append(player)
-            else:
-                bench.append(player)
-
-        # Если не хватает стартеров, добавляем из bench
-        while len(starters) < 5 and bench:
-            starters.append(bench.pop(0))
+        team_view = {
+            'colors': colors,
+            'record': record,
+            'record_label': record_label,
+            'players_frame': players_frame,
+            'starter_rows': [],
+            'injury_header': None,
+            'injured_rows': [],
+        }
+        starters, injured = self._split_lineup(lineup)
 
         # Отображаем стартеров
         for player in starters:
-            self.create_player_row(players_frame, player, colors, is_starter=True)
+            team_view['starter_rows'].append(
+                self.create_player_row(players_frame, player, colors, is_starter=True))
 
         # Разделитель если есть травмированные
-        injured = [p for p in lineup if p.get('status') == 'out']
-        if injured:
+        for player in injured:
+            self._add_injured_row(team_view, player)
+
+        return team_view
+
+    def _add_injured_row(self, team_view, player):
+        """Строка травмированного (заголовок секции INJURIES - при первой строке)."""
+        players_frame = team_view['players_frame']
+        if team_view['injury_header'] is None:
             separator = tk.Frame(players_frame, bg='#333333', height=1)
             separator.pack(fill='x', pady=5)
 
@@ -770,19 +962,73 @@ class LineupsGUI:
                                 font=('Arial', 8, 'bold'),
                                 fg='#e94560', bg='#1a1a2e')
             inj_label.pack(anchor='w', padx=5)
+            team_view['injury_header'] = (separator, inj_label)
 
-            for player in injured:
-                self.create_player_row(players_frame, player, colors, is_starter=False)
+        team_view['injured_rows'].append(
+            self.create_player_row(players_frame, player, team_view['colors'], is_starter=False))
 
-    def create_player_row(self, parent, player, colors, is_starter=True):
-        """Создание строки с игроком."""
+    def _patch_team_lineup(self, team_view, team_data):
+        """Правка блока команды: W-L, строки стартеров и травмированных."""
+        record = team_data.get('record', '')
+        if team_view['record'] != record:
+            team_view['record_label'].config(text=record)
+            team_view['record'] = record
+
+        starters, injured = self._split_lineup(team_data.get('lineup', []))
+        players_frame = team_view['players_frame']
+        colors = team_view['colors']
+
+        # Стартеры: правим строки по месту, лишние удаляем, недостающие - перед секцией травм
+        rows = team_view['starter_rows']
+        for row, player in zip(rows, starters):
+            self._patch_player_row(row, player, colors)
+        for row in rows[len(starters):]:
+            self._forget_click_handler(row['name_label'])
+            row['frame'].destroy()
+        del rows[len(starters):]
+        for player in starters[len(rows):]:
+            before = team_view['injury_header'][0] if team_view['injury_header'] else None
+            rows.append(self.create_player_row(players_frame, player, colors, is_starter=True, before=before))
+
+        # Травмированные
+        rows = team_view['injured_rows']
+        for row, player in zip(rows, injured):
+            self._patch_player_row(row, player, colors)
+        for row in rows[len(injured):]:
+            self._forget_click_handler(row['name_label'])
+            row['frame'].destroy()
+        del rows[len(injured):]
+        for player in injured[len(rows):]:
+            self._add_injured_row(team_view, player)
+
+        if not injured and team_view['injury_header'] is not None:
+            for widget in team_view['injury_header']:
+                widget.destroy()
+            team_view['injury_header'] = None
+
+    @staticmethod
+    def _player_name_color(status):
+        name_color = '#ffffff' if status == 'active' else '#ff6b6b'
+        if status == 'questionable':
+            name_color = '#ffd93d'
+        elif status == 'probable':
+            name_color = '#6bcb77'
+        elif status == 'doubtful':
+            name_color = '#ff8c00'
+        return name_color
+
+    def create_player_row(self, parent, player, colors, is_starter=True, before=None):
+        """Создание строки с игроком (before - вставить перед этим виджетом)."""
         name = player.get('name', 'Unknown')
         print(f"[CREATE ROW] Создаю строку для: {name}")
         position = player.get('position', '?')
         status = player.get('status', 'active')
 
         row = tk.Frame(parent, bg='#1a1a2e')
-        row.pack(fill='x', pady=1)
+        if before is not None:
+            row.pack(fill='x', pady=1, before=before)
+        else:
+            row.pack(fill='x', pady=1)
 
         # Позиция
         pos_bg = colors['primary'] if is_starter else '#444444'
@@ -791,13 +1037,7 @@ class LineupsGUI:
         pos_label.pack(side='left', padx=2)
 
         # Имя игрока
-        name_color = '#ffffff' if status == 'active' else '#ff6b6b'
-        if status == 'questionable':
-            name_color = '#ffd93d'
-        elif status == 'probable':
-            name_color = '#6bcb77'
-        elif status == 'doubtful':
-            name_color = '#ff8c00'
+        name_color = self._player_name_color(status)
 
         name_label = tk.Label(row, text=name, font=('Arial', 10),
                              fg=name_color, bg='#1a1a2e', anchor='w', cursor='hand2')
@@ -819,13 +1059,57 @@ class LineupsGUI:
         self._click_handlers.append(name_label)
         print(f"[BIND OK] {name} - handlers count: {len(self._click_handlers)}")
 
+        row_view = {
+            'frame': row,
+            'pos_label': pos_label,
+            'name_label': name_label,
+            'status_label': None,
+            'state': (name, position, status),
+        }
+
         # Статус (если не active)
-        if status != 'active':
-            status_text = status.upper()
-            status_color = '#ff6b6b' if status == 'out' else '#ffd93d'
-            status_label = tk.Label(row, text=status_text, font=('Arial', 8, 'bold'),
-                                   fg=status_color, bg='#1a1a2e')
-            status_label.pack(side='right', padx=5)
+        self._set_row_status(row_view, status)
+        return row_view
+
+    def _set_row_status(self, row_view, status):
+        """Метка статуса справа: создаётся, меняется или убирается."""
+        label = row_view['status_label']
+        if status == 'active':
+            if label is not None:
+                label.destroy()
+                row_view['status_label'] = None
+            return
+
+        status_text = status.upper()
+        status_color = '#ff6b6b' if status == 'out' else '#ffd93d'
+        if label is None:
+            row_view['status_label'] = tk.Label(row_view['frame'], text=status_text, font=('Arial', 8, 'bold'),
+                                                fg=status_color, bg='#1a1a2e')
+            row_view['status_label'].pack(side='right', padx=5)
+        else:
+            label.config(text=status_text, fg=status_color)
+
+    def _patch_player_row(self, row_view, player, colors):
+        """Правка строки игрока, если изменились имя, позиция или статус."""
+        name = player.get('name', 'Unknown')
+        position = player.get('position', '?')
+        status = player.get('status', 'active')
+        name_label = row_view['name_label']
+        name_label.player_data = player.copy()  # Свежие данные для клика (заметка о травме и т.п.)
+
+        old_name, old_position, old_status = row_view['state']
+        if (name, position, status) == row_view['state']:
+            return
+
+        if position != old_position:
+            row_view['pos_label'].config(text=position)
+        if name != old_name or status != old_status:
+            name_color = self._player_name_color(status)
+            name_label.config(text=name, fg=name_color)
+            name_label.original_color = name_color
+        if status != old_status:
+            self._set_row_status(row_view, status)
+        row_view['state'] = (name, position, status)
 
     def switch_date(self, date: str):
         """Переключение между Today и Tomorrow."""
@@ -834,6 +1118,10 @@ class LineupsGUI:
 
         self.selected_date = date
 
+        # Задачи для прежней даты (загрузка, предзагрузка) больше не нужны
+        self._date_token.cancel('date switch')
+        self._date_token = CancelToken()
+
         # Обновляем стили кнопок
         if date == "today":
             self.today_btn.config(bg='#e94560')
@@ -870,13 +1158,18 @@ class LineupsGUI:
         if not result:
             return
 
-        # Запускаем авторизацию в отдельном потоке
+        if self._login_thread is not None and self._login_thread.is_alive():
+            return  # Браузер авторизации уже открыт
+
+        # Запускаем авторизацию в отдельном потоке, не в пуле: ожидание закрытия
+        # браузера (до 5 минут) заняло бы поток для кликов пользователя
         def do_login():
             success = run_login()
-            self.root.after(0, lambda: self._on_login_complete(success))
+            self.ui.post(lambda: self._on_login_complete(success))
 
         self.status_label.config(text="Авторизация на RotoWire...", fg='#ffd93d')
-        threading.Thread(target=do_login, daemon=True).start()
+        self._login_thread = threading.Thread(target=do_login, name='rotowire-login', daemon=True)
+        self._login_thread.start()
 
     def _on_login_complete(self, success: bool):
         """Callback после завершения авторизации."""
@@ -891,23 +1184,41 @@ class LineupsGUI:
         """Обновление данных (принудительно, игнорируя кэш)."""
         # Помечаем кэш как устаревший, чтобы загрузить свежие данные
         self.cache_is_stale = True
-        # Очищаем кэш статистики команд (чтобы загрузить свежие данные при клике на игрока)
-        self.team_stats_cache = {}
-        print("[INFO] Team stats cache cleared")
+        # Статистику команд не сбрасываем - при следующем обращении сверимся с логом лиги,
+        # и перезагрузятся только команды, сыгравшие новую игру
+        self.schedule_checked_at = None
+        print("[INFO] Schedule check forced")
         self.load_data()
 
-    def load_cache(self):
-        """Загрузка кэша составов из файла с проверкой свежести."""
+    def _read_lineups_cache(self) -> dict:
+        """
+        Чтение кэша составов с проверкой свежести.
+
+        Состояние окна не меняет - можно вызывать из фонового потока;
+        применяется в UI потоке через _apply_lineups_cache.
+
+        Returns:
+            {'lineups', 'changes_log', 'latency', 'games' (None - кэш устарел),
+             'slate_date', 'stale', 'slate_passed'}
+        """
+        cache = {'lineups': {}, 'changes_log': [], 'latency': None, 'games': None,
+                 'slate_date': self.slate_date, 'stale': True, 'slate_passed': False}
         try:
             if os.path.exists(LINEUPS_CACHE_FILE):
                 with open(LINEUPS_CACHE_FILE, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.previous_lineups = data.get('lineups', {})
-                    self.changes_log = data.get('changes_log', [])
+                    cache['lineups'] = data.get('lineups', {})
+                    cache['changes_log'] = data.get('changes_log', [])
+                    cache['latency'] = data.get('latency')
                     cached_games = data.get('games', [])
                     last_update_str = data.get('last_update', '')
+                    slate_date = cache['slate_date'] = data.get('slate_date', '')
+
+                    print(f"Загружен кэш: {len(cache['lineups'])} игр")
 
-                    print(f"Загружен кэш: {len(self.previous_lineups)} игр")
+                    # Слейт из кэша уже прошёл - его игры сыграны, сверяемся с логом лиги сразу
+                    if slate_date and slate_date < datetime.now().strftime('%Y-%m-%d'):
+                        cache['slate_passed'] = True
 
                     # Проверяем возраст кэша
                     if last_update_str:
@@ -917,46 +1228,131 @@ class LineupsGUI:
                             print(f"Возраст кэша: {hours_passed:.1f} ч (максимум: {LINEUPS_CACHE_MAX_AGE_HOURS} ч)")
 
                             if hours_passed > LINEUPS_CACHE_MAX_AGE_HOURS:
-                                self.cache_is_stale = True
+                                record_miss('lineups', invalidated=True)
                                 print(f"Кэш устарел! Последнее обновление: {last_update_str}")
                             else:
                                 # Кэш свежий - используем сохранённые составы
-                                self.games = cached_games
-                                self.cache_is_stale = False
+                                cache['games'] = cached_games
+                                cache['stale'] = False
+                                record_hit('lineups', hours_passed * 3600)
                                 print(f"Кэш актуален. Последнее обновление: {last_update_str}")
-                                print(f"Загружено {len(self.games)} игр из кэша")
+                                print(f"Загружено {len(cached_games)} игр из кэша")
                         except ValueError as ve:
                             print(f"Ошибка парсинга даты кэша: {ve}")
-                            self.cache_is_stale = True
                     else:
                         # Нет информации о времени - считаем устаревшим
-                        self.cache_is_stale = True
                         print("Кэш без метки времени - считаем устаревшим")
             else:
                 # Файла нет - кэш пуст, будет загружен свежий
                 print("Файл кэша не найден - будет создан новый")
-                self.cache_is_stale = True
+                record_miss('lineups')
         except Exception as e:
             print(f"Ошибка загрузки кэша: {e}")
-            self.previous_lineups = {}
-            self.changes_log = []
-            self.cache_is_stale = True
+            cache.update({'lineups': {}, 'changes_log': [], 'games': None, 'stale': True})
+        return cache
+
+    def _apply_lineups_cache(self, cache):
+        """Применение прочитанного кэша составов (только UI поток)."""
+        self.previous_lineups = cache['lineups']
+        self._lineup_fingerprints = None
+        self.changes_log = cache['changes_log']
+        load_latency_samples(cache['latency'])
+        self.slate_date = cache['slate_date']
+        self._slate_games = set(cache['lineups'])
+        if cache['slate_passed']:
+            self.schedule_checked_at = None
+        if cache['games'] is not None:
+            self.games = cache['games']
+        self.cache_is_stale = cache['stale']
+
+    def _update_slate_date(self):
+        """
+        Дата слейта - из фида, а не по часам.
+
+        nba_live сообщает дату слейта (game_date). Без неё дата берётся
+        текущая, но только когда фид перешёл на новый набор игр (ни одной
+        игры прежнего слейта) - вечер, который идёт после полуночи, остаётся
+        одним слейтом для истории, прогнозов и сверки с логом лиги.
+        """
+        keys = set(self.games_to_dict(self.games))
+        if not keys:
+            return
+        feed_date = next((game['game_date'] for game in self.games if game.get('game_date')), None)
+        if feed_date:
+            slate_date = feed_date
+        elif not self.slate_date or not keys & self._slate_games:
+            slate_date = datetime.now().strftime('%Y-%m-%d')
+        else:
+            slate_date = self.slate_date
+        self._slate_games = keys
+
+        if slate_date != self.slate_date:
+            if self.slate_date:
+                # Фид составов перешёл на новый слейт - прошлые игры завершены
+                self.schedule_checked_at = None
+                print(f"Новый слейт: {self.slate_date} -> {slate_date}")
+            self.slate_date = slate_date
 
     def save_cache(self):
-        """Сохранение кэша составов в файл."""
+        """
+        Сохранение кэша составов в файл.
+
+        Здесь - только состояние окна и копия данных; запись файлов и SQLite -
+        в подписчике 'persist' (_persist_slate), в его потоке.
+        """
+        if self.selected_date == "today":
+            self._update_slate_date()
+
+        # Копия: UI поток продолжает менять составы и лог, пока идёт запись
+        games, lineups = copy.deepcopy((self.games, self.previous_lineups))
+        self.event_bus.publish(SLATE_PERSIST_TOPIC, {
+            'games': games,
+            'lineups': lineups,
+            'changes_log': list(self.changes_log[-100:]),  # Храним последние 100 изменений
+            'slate_date': self.slate_date,
+            'selected_date': self.selected_date,
+            'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+    def _persist_slate(self, state):
+        """Запись кэша составов, истории составов, справочника имён и снимка слейта (поток 'persist')."""
+        games = state['games']
         try:
             data = {
-                'lineups': self.previous_lineups,
-                'games': self.games,  # Сохраняем полные данные игр
-                'changes_log': self.changes_log[-100:],  # Храним последние 100 изменений
-                'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'lineups': state['lineups'],
+                'games': games,  # Сохраняем полные данные игр
+                'changes_log': state['changes_log'],
+                'latency': export_latency_samples(),  # Замеры задержки обнаружения
+                'last_update': state['saved_at'],
+                'slate_date': state['slate_date'],
             }
-            with open(LINEUPS_CACHE_FILE, 'w', encoding='utf-8') as f:
+            tmp_file = LINEUPS_CACHE_FILE + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
-            print(f"Кэш сохранён: {len(self.games)} игр")
+            os.replace(tmp_file, LINEUPS_CACHE_FILE)
+            print(f"Кэш сохранён: {len(games)} игр")
+            set_cache_file_size('lineups', LINEUPS_CACHE_FILE, len(games))
         except Exception as e:
             print(f"Ошибка сохранения кэша: {e}")
 
+        # История составов за день (пишутся только изменения)
+        if state['selected_date'] == "today" and games:
+            try:
+                record_snapshot(games, slate_date=state['slate_date'])
+            except Exception as e:
+                print(f"Ошибка записи истории составов: {e}")
+
+        # Новые написания имён RotoWire - в справочник имён (только если составы изменились)
+        fingerprints = fingerprint_lineups(self.games_to_dict(games))
+        if fingerprints != self._learned_fingerprints:
+            try:
+                learn_from_games(games)
+                self._learned_fingerprints = fingerprints
+            except Exception as e:
+                print(f"Ошибка обновления справочника имён: {e}")
+
+        self.save_slate_snapshot(state)
+
     def load_historical_cache(self):
         """Загрузка кэша исторических данных из файла."""
         try:
@@ -966,6 +1362,7 @@ class LineupsGUI:
                     self.historical_cache = data.get('teams', {})
                     last_update = data.get('last_update', '')
                     print(f"Загружен исторический кэш: {len(self.historical_cache)} команд, обновлен: {last_update}")
+                    set_cache_file_size('historical', HISTORICAL_CACHE_FILE, len(self.historical_cache))
         except Exception as e:
             print(f"Ошибка загрузки исторического кэша: {e}")
             self.historical_cache = {}
@@ -980,26 +1377,32 @@ class LineupsGUI:
             with open(HISTORICAL_CACHE_FILE, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             print(f"Исторический кэш сохранен: {len(self.historical_cache)} команд")
+            set_cache_file_size('historical', HISTORICAL_CACHE_FILE, len(self.historical_cache))
         except Exception as e:
             print(f"Ошибка сохранения исторического кэша: {e}")
 
     def is_historical_cache_valid(self, team_abbrev):
-        """Проверка актуальности кэша для команды (TTL = 12 часов)."""
+        """Проверка актуальности кэша для команды (по расписанию, иначе TTL = 12 часов)."""
         if team_abbrev not in self.historical_cache:
+            record_miss('historical')
             return False
 
         cached_data = self.historical_cache[team_abbrev]
-        cached_time_str = cached_data.get('cached_at', '')
+        cached_game_date = normalize_game_date(cached_data.get('date'))
+        is_valid = self._is_cache_entry_current(
+            team_abbrev, cached_data, cached_game_date, HISTORICAL_CACHE_TTL_HOURS
+        )
+        if is_valid:
+            record_hit('historical', age_since(cached_data.get('cached_at')))
+        else:
+            record_miss('historical', invalidated=True)
+        return is_valid
 
-        if not cached_time_str:
-            return False
-
-        try:
-            cached_time = datetime.strptime(cached_time_str, '%Y-%m-%d %H:%M:%S')
-            hours_passed = (datetime.now() - cached_time).total_seconds() / 3600
-            return hours_passed < HISTORICAL_CACHE_TTL_HOURS
-        except:
-            return False
+    def _store_historical(self, team_abbrev, data):
+        """Сохранение последней игры команды в исторический кэш с метками."""
+        data['cached_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data['expected_game_date'] = self.team_last_game_dates.get(team_abbrev, '')
+        self.historical_cache[team_abbrev] = data
 
     def load_team_stats_cache(self):
         """Загрузка кэша статистики последних 3 игр."""
@@ -1010,6 +1413,18 @@ class LineupsGUI:
                     self.team_stats_cache = data.get('teams', {})
                     last_update = data.get('last_update', '')
                     print(f"Загружен кэш статистики: {len(self.team_stats_cache)} команд, обновлен: {last_update}")
+                    set_cache_file_size('team_stats', TEAM_STATS_CACHE_FILE, len(self.team_stats_cache))
+
+                    schedule = data.get('schedule', {})
+                    self.team_last_game_dates = schedule.get('last_game_dates', {})
+                    checked_at = schedule.get('checked_at', '')
+                    # Если слейт из кэша составов уже прошёл - сверка нужна сразу
+                    slate_passed = self.slate_date and self.slate_date < datetime.now().strftime('%Y-%m-%d')
+                    if checked_at and not slate_passed:
+                        try:
+                            self.schedule_checked_at = datetime.strptime(checked_at, '%Y-%m-%d %H:%M:%S')
+                        except ValueError:
+                            self.schedule_checked_at = None
         except Exception as e:
             print(f"Ошибка загрузки кэша статистики: {e}")
             self.team_stats_cache = {}
@@ -1017,33 +1432,174 @@ class LineupsGUI:
     def save_team_stats_cache(self):
         """Сохранение кэша статистики последних 3 игр."""
         try:
+            checked_at = self.schedule_checked_at
             data = {
                 'teams': self.team_stats_cache,
-                'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'schedule': {
+                    'last_game_dates': self.team_last_game_dates,
+                    'checked_at': checked_at.strftime('%Y-%m-%d %H:%M:%S') if checked_at else '',
+                },
             }
             with open(TEAM_STATS_CACHE_FILE, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             print(f"Кэш статистики сохранен: {len(self.team_stats_cache)} команд")
+            set_cache_file_size('team_stats', TEAM_STATS_CACHE_FILE, len(self.team_stats_cache))
         except Exception as e:
             print(f"Ошибка сохранения кэша статистики: {e}")
 
-    def is_team_stats_cache_valid(self, team_abbrev):
-        """Проверка актуальности кэша статистики команды (TTL = 24 часа)."""
+    def is_team_stats_cache_valid(self, team_abbrev, record=True):
+        """
+        Проверка актуальности кэша статистики команды (по расписанию, иначе TTL = 4 часа).
+
+        Args:
+            record: Учесть в метриках кэша (False - повторная проверка того же обращения)
+        """
         if team_abbrev not in self.team_stats_cache:
+            if record:
+                record_miss('team_stats')
             return False
 
         cached_data = self.team_stats_cache[team_abbrev]
-        cached_time_str = cached_data.get('cached_at', '')
+        cached_game_date = cached_data.get('last_game_date')
+        if cached_game_date is None:
+            # Старые записи кэша - вычисляем дату по списку игр
+            dates = [normalize_game_date(g.get('date')) for g in cached_data.get('games', [])]
+            cached_game_date = max((d for d in dates if d), default='')
+            cached_data['last_game_date'] = cached_game_date
+
+        is_valid = self._is_cache_entry_current(
+            team_abbrev, cached_data, cached_game_date, TEAM_STATS_CACHE_TTL_HOURS
+        )
+        if record:
+            if is_valid:
+                record_hit('team_stats', age_since(cached_data.get('cached_at')))
+            else:
+                record_miss('team_stats', invalidated=True)
+        return is_valid
 
+    def _is_cache_entry_current(self, team_abbrev, cached_data, cached_game_date, ttl_hours):
+        """
+        Общая проверка записи кэша команды.
+
+        Запись актуальна, пока команда не сыграла игру новее той, что в кэше.
+        TTL используется только если расписание команды неизвестно.
+        """
+        cached_time_str = cached_data.get('cached_at', '')
         if not cached_time_str:
             return False
 
-        try:
-            cached_time = datetime.strptime(cached_time_str, '%Y-%m-%d %H:%M:%S')
-            hours_passed = (datetime.now() - cached_time).total_seconds() / 3600
-            return hours_passed < TEAM_STATS_CACHE_TTL_HOURS
-        except:
-            return False
+        try:
+            cached_time = datetime.strptime(cached_time_str, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return False
+        minutes_passed = (datetime.now() - cached_time).total_seconds() / 60
+
+        known_game_date = self.team_last_game_dates.get(team_abbrev)
+        if known_game_date and cached_game_date:
+            if known_game_date <= cached_game_date:
+                return True
+            # Игра уже сыграна, но при прошлой загрузке её статистики ещё не было -
+            # не долбим API, а ждём INCOMPLETE_STATS_RETRY_MINUTES
+            if cached_data.get('expected_game_date') == known_game_date:
+                return minutes_passed < INCOMPLETE_STATS_RETRY_MINUTES
+            return False
+
+        return minutes_passed < ttl_hours * 60
+
+    def _store_team_stats(self, team_abbrev, data):
+        """Сохранение статистики команды в кэш с метками для инвалидации."""
+        data['cached_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data.setdefault('last_game_date', '')
+        data['expected_game_date'] = self.team_last_game_dates.get(team_abbrev, '')
+        self.team_stats_cache[team_abbrev] = data
+        self._get_team_stat_matrix(team_abbrev, data.get('games', []))
+        try:
+            learn_from_team_games(data.get('games', []))  # Полные имена + personId из boxscore
+        except Exception as e:
+            print(f"Ошибка обновления справочника имён: {e}")
+
+    def _get_team_stat_matrix(self, team_abbrev, team_games):
+        """
+        TeamStatMatrix (с PlayerIndex) по играм команды - строится один раз на загрузку статистики.
+
+        Перестраивается, только когда список игр команды заменён новым.
+        """
+        cached = self._team_stat_matrices.get(team_abbrev)
+        if cached is not None and cached[0] is team_games:
+            return cached[1]
+        matrix = TeamStatMatrix(team_games)
+        self._team_stat_matrices[team_abbrev] = (team_games, matrix)
+        return matrix
+
+    def _get_team_analytics(self, team_abbrev, data):
+        """TeamAnalytics команды (мемоизация по команде и cached_at в team_analytics)."""
+        if not data:
+            return None
+        index = self._get_team_stat_matrix(team_abbrev, data.get('games', [])).index
+        return get_team_analytics(team_abbrev, data, index=index)
+
+    def _load_team_stats(self, team_abbrev, record=True):
+        """
+        Статистика команды из кэша или с NBA API (вызывается из фоновых потоков).
+
+        Одновременные загрузки одной команды (предзагрузка, окно команды,
+        клик по игроку) делят один запрос: второй вызов ждёт первый и берёт
+        результат из кэша.
+
+        Args:
+            record: Учесть проверку кэша в метриках (False - вызывающий уже учёл)
+
+        Returns:
+            (data или None, источник: 'cache' / 'api' / 'shared')
+        """
+        with self._team_stats_lock:
+            event = self._team_stats_inflight.get(team_abbrev)
+            owner = event is None
+            if owner:
+                event = self._team_stats_inflight[team_abbrev] = threading.Event()
+
+        if not owner:
+            print(f"Статистика {team_abbrev}: ждём уже идущую загрузку")
+            event.wait()
+            return self.team_stats_cache.get(team_abbrev), 'shared'
+
+        try:
+            if self.is_team_stats_cache_valid(team_abbrev, record=record):
+                return self.team_stats_cache[team_abbrev], 'cache'
+            data = get_team_last_n_games_stats(team_abbrev, n_games=10, season='2025-26')
+            if data:
+                self._store_team_stats(team_abbrev, data)
+            return data, 'api'
+        finally:
+            with self._team_stats_lock:
+                del self._team_stats_inflight[team_abbrev]
+            event.set()
+
+    def refresh_schedule(self, force=False):
+        """
+        Сверка с логом игр лиги: дата последней сыгранной игры каждой команды.
+
+        Вызывается из фоновых потоков. Запрос не чаще чем раз в
+        SCHEDULE_CHECK_INTERVAL_MINUTES, либо сразу после смены слейта.
+        """
+        with self._schedule_lock:
+            if not force and self.schedule_checked_at:
+                minutes_passed = (datetime.now() - self.schedule_checked_at).total_seconds() / 60
+                if minutes_passed < SCHEDULE_CHECK_INTERVAL_MINUTES:
+                    return
+
+            dates = get_league_last_game_dates('2025-26')
+            self.schedule_checked_at = datetime.now()
+
+            changed = []
+            for team, game_date in dates.items():
+                if game_date > self.team_last_game_dates.get(team, ''):
+                    changed.append(team)
+                    self.team_last_game_dates[team] = game_date
+
+            if changed:
+                print(f"Расписание: новые игры у {len(changed)} команд ({', '.join(sorted(changed))})")
 
     def get_game_key(self, game):
         """Создание уникального ключа игры."""
@@ -1053,54 +1609,26 @@ class LineupsGUI:
 
     def get_starters(self, lineup):
         """Извлечение стартовой пятёрки из состава."""
-        starters = {}
-        for player in lineup:
-            pos = player.get('position', '')
-            status = player.get('status', 'active')
-            # Только активные игроки в стартовой пятёрке
-            if pos in POSITIONS_ORDER and pos not in starters and status != 'out':
-                starters[pos] = player.get('name', 'Unknown')
-        return starters
+        return get_starters(lineup)
 
     def compare_lineups(self, old_lineups, new_lineups):
-        """Сравнение старых и новых составов. Возвращает список изменений."""
-        changes = []
-        timestamp = datetime.now().strftime('%H:%M:%S')
-
-        # Проверяем что new_lineups это словарь
-        if isinstance(new_lineups, dict):
-            # Итерируем по элементам словаря
-            for game_key, game in new_lineups.items():
-                if game_key not in old_lineups:
-                    continue  # Новая игра, не сравниваем
-
-                old_game = old_lineups[game_key]
-
-                # Проверяем что old_game это словарь, а не строка
-                if not isinstance(old_game, dict):
-                    continue
+        """
+        Сравнение старых и новых составов. Возвращает список изменений.
 
-                # Сравниваем away team и home team
-                for team_type in ['away_team', 'home_team']:
-                    team_abbrev = game.get(team_type, {}).get('abbrev', '???')
-                    old_starters = self.get_starters(old_game.get(team_type, {}).get('lineup', []))
-                    new_starters = self.get_starters(game.get(team_type, {}).get('lineup', []))
-
-                    for pos in POSITIONS_ORDER:
-                        old_player = old_starters.get(pos, '')
-                        new_player = new_starters.get(pos, '')
-
-                        if old_player and new_player and old_player != new_player:
-                            change = {
-                                'time': timestamp,
-                                'game': game_key,
-                                'team': team_abbrev,
-                                'position': pos,
-                                'old_player': old_player,
-                                'new_player': new_player
-                            }
-                            changes.append(change)
+        Сравниваются только команды, у которых изменился отпечаток состава.
+        Типы событий: замена стартера, смена статуса, игрок добавлен/убран,
+        смена позиции, заметка о травме (см. lineup_diff).
+        """
+        if not isinstance(new_lineups, dict):
+            return []
 
+        # Отпечатки берём из кэша, только если они посчитаны именно для old_lineups
+        cached = self._lineup_fingerprints
+        old_fingerprints = cached[1] if cached and cached[0] is old_lineups else None
+        changes, new_fingerprints = diff_lineups(old_lineups, new_lineups, old_fingerprints)
+        if old_lineups is self.previous_lineups:
+            # Обычный опрос: new_lineups станет previous_lineups
+            self._lineup_fingerprints = (new_lineups, new_fingerprints)
         return changes
 
     def games_to_dict(self, games):
@@ -1115,8 +1643,13 @@ class LineupsGUI:
             }
         return result
 
-    def check_for_changes(self):
-        """Проверка изменений в составах."""
+    def check_for_changes(self, trace=None):
+        """
+        Проверка изменений в составах.
+
+        Args:
+            trace: Метки времени опроса (latency.py) - прикрепляются к событиям
+        """
         if not self.games:
             return []
 
@@ -1124,17 +1657,20 @@ class LineupsGUI:
         changes = self.compare_lineups(self.previous_lineups, current_lineups)
 
         if changes:
+            if trace is not None:
+                mark(trace, 'diff_done')
+                record_trace(trace)
+                snapshot = dict(trace)
+                self._change_traces.append((snapshot, trace))
+                for change in changes:
+                    change['latency'] = snapshot
+                print(f"[LATENCY] {trace_summary(trace)}")
+
             # Добавляем изменения в лог
             self.changes_log.extend(changes)
 
-            # Показываем уведомление
-            self.show_notification(changes)
-
-            # Обновляем UI - подсвечиваем изменения
-            self.highlight_changes(changes)
-
-            # Запускаем AI анализ при изменениях
-            self.auto_ai_analysis_on_change(changes)
+            # Уведомление, подсветка, звук, AI и журнал - подписчики шины
+            self.event_bus.publish(LINEUP_CHANGES_TOPIC, changes)
 
         # Обновляем кэш
         self.previous_lineups = current_lineups
@@ -1147,7 +1683,7 @@ class LineupsGUI:
         try:
             msg_lines = []
             for ch in changes[:5]:  # Максимум 5 изменений в уведомлении
-                msg_lines.append(f"{ch['team']} {ch['position']}: {ch['old_player']} -> {ch['new_player']}")
+                msg_lines.append(describe_change(ch))
 
             msg = "\n".join(msg_lines)
             if len(changes) > 5:
@@ -1159,13 +1695,27 @@ class LineupsGUI:
                 app_name="NBA Lineups",
                 timeout=10
             )
+            self._mark_changes_latency(changes, 'notified')
         except Exception as e:
             print(f"Ошибка уведомления: {e}")
             # Fallback - показываем messagebox
-            self.root.after(0, lambda: messagebox.showinfo(
+            self.ui.post(lambda: messagebox.showinfo(
                 "Lineup Changed!",
                 f"{len(changes)} изменений в составах!\n\nНажмите 'Changes Log' для деталей."
             ))
+            self.ui.post(lambda: self._mark_changes_latency(changes, 'notified'))
+
+    def _change_trace(self, changes):
+        """Живой trace опроса, в котором найдены изменения (None - trace нет)."""
+        snapshot = changes[0].get('latency') if changes else None
+        for traced, trace in self._change_traces:
+            if traced is snapshot:
+                return trace
+        return None
+
+    def _mark_changes_latency(self, changes, stage):
+        """Отметка этапа в trace опроса (в выборки задержек, события не меняются)."""
+        mark(self._change_trace(changes), stage)
 
     def highlight_changes(self, changes):
         """Подсветка изменённых команд в UI."""
@@ -1175,19 +1725,27 @@ class LineupsGUI:
             fg='#e94560'
         )
 
-        # Звуковой сигнал
-        try:
-            import winsound
-            winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
-        except:
-            self.root.bell()
-
         # Мигание заголовка окна
         self.flash_window(5)
 
         # Показываем всплывающее окно с изменениями
         self.show_changes_popup(changes)
 
+    def _play_change_sound(self, changes):
+        """Звуковой сигнал при изменениях."""
+        try:
+            import winsound
+            winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
+        except:
+            self.ui.post(self.root.bell)
+
+    def _append_changes_to_file(self, changes):
+        """Дописывание изменений в журнал (по строке JSON на событие)."""
+        date_str = datetime.now().strftime('%Y-%m-%d')
+        with open(CHANGES_LOG_FILE, 'a', encoding='utf-8') as f:
+            for change in changes:
+                f.write(json.dumps(dict(change, date=date_str), ensure_ascii=False) + "\n")
+
     def flash_window(self, times):
         """Мигание окна для привлечения внимания."""
         if times <= 0:
@@ -1224,7 +1782,7 @@ class LineupsGUI:
         changes_frame.pack(fill='both', expand=True, padx=15, pady=15)
 
         for i, ch in enumerate(changes[:10]):  # Максимум 10 изменений
-            line = f"{ch['team']} {ch['position']}: {ch['old_player']} -> {ch['new_player']}"
+            line = describe_change(ch)
             lbl = tk.Label(changes_frame, text=line,
                           font=('Consolas', 10), fg='white', bg='#1a1a2e',
                           anchor='w')
@@ -1259,35 +1817,43 @@ class LineupsGUI:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Автопроверка...")
         self.status_label.config(text="Checking...", fg='#ffd93d')
 
-        # Загружаем данные в фоне
-        thread = threading.Thread(target=self._auto_fetch_and_check, daemon=True)
-        thread.start()
+        # Загружаем данные в фоне. Token в пул не передаётся: задача всегда
+        # выполняется и планирует следующую проверку
+        self.pool.submit(self._auto_fetch_and_check, self._date_token,
+                         priority=PRIORITY_DETECTION, key='auto_check')
 
-    def _auto_fetch_and_check(self):
-        """Фоновая загрузка и проверка."""
-        try:
-            soup = fetch_page(ROTOWIRE_URL)
-            new_games = parse_lineups(soup)
+    def _auto_fetch_and_check(self, token=None):
+        """Фоновая загрузка и проверка (результаты для прежней даты отбрасываются)."""
+        updated = []
 
+        def on_update(new_games, source_name, trace):
+            # Первый источник, сообщивший новый состав, сразу запускает проверку -
+            # не ждём остальные
+            if token is not None and token.cancelled:
+                return
             if new_games:
-                old_games = self.games
+                updated.append(source_name)
                 self.games = new_games
+                self.ui.post(lambda: self._check_and_update(trace))
 
-                # Проверяем изменения
-                self.root.after(0, self._check_and_update)
+        try:
+            self.lineup_sources.fetch(self.selected_date, on_update=on_update)
+            if not updated:
+                # Ни один источник ничего нового не принёс - только обновляем статус
+                self.ui.post(self._check_and_update)
 
         except Exception as e:
             print(f"Ошибка автопроверки: {e}")
-            self.root.after(0, lambda: self.status_label.config(
+            self.ui.post(lambda: self.status_label.config(
                 text=f"Error: {e}", fg='#ff6b6b'
-            ))
+            ), key='status')
 
         # Планируем следующую проверку
-        self.root.after(0, self.schedule_auto_check)
+        self.ui.post(self.schedule_auto_check)
 
-    def _check_and_update(self):
+    def _check_and_update(self, trace=None):
         """Проверка изменений и обновление UI."""
-        changes = self.check_for_changes()
+        changes = self.check_for_changes(trace)
 
         if changes:
             # Перерисовываем UI
@@ -1339,12 +1905,13 @@ class LineupsGUI:
             log_text.insert('end', "No changes detected yet.\n\n")
             log_text.insert('end', "The system will notify you when:\n")
             log_text.insert('end', "- A starter is replaced by another player\n")
+            log_text.insert('end', "- A player's status changes (e.g. questionable -> out)\n")
+            log_text.insert('end', "- A player is added to or removed from the lineup\n")
             log_text.insert('end', "- A player moves to a different position\n")
         else:
             # Показываем изменения от новых к старым
             for change in reversed(self.changes_log[-50:]):
-                line = f"[{change['time']}] {change['game']} | {change['team']} {change['position']}: "
-                line += f"{change['old_player']} -> {change['new_player']}\n"
+                line = f"[{change['time']}] {change['game']} | {describe_change(change)}\n"
                 log_text.insert('end', line)
 
         log_text.config(state='disabled')
@@ -1356,6 +1923,111 @@ class LineupsGUI:
                              font=('Arial', 10, 'bold'), relief='flat')
         clear_btn.pack(pady=10)
 
+    def show_ui_diagnostics(self):
+        """Окно диагностики UI: lag heartbeat, гистограмма колбэков, зависания со стеком."""
+        diag_window = tk.Toplevel(self.root)
+        diag_window.title("UI Diagnostics")
+        diag_window.geometry("900x680")
+        diag_window.configure(bg='#1a1a2e')
+
+        header = tk.Label(diag_window, text="Event Loop Stalls & Callback Durations",
+                         font=('Arial', 14, 'bold'), fg='#e94560', bg='#1a1a2e')
+        header.pack(pady=10)
+
+        diag_text = tk.Text(diag_window, bg='#16213e', fg='white',
+                            font=('Consolas', 10), height=34, wrap='none')
+        diag_text.pack(fill='both', expand=True, padx=10, pady=5)
+
+        def refresh():
+            if not diag_window.winfo_exists():
+                return
+            diag_text.config(state='normal')
+            diag_text.delete('1.0', 'end')
+            diag_text.insert('end', self.watchdog.format_report())
+            diag_text.config(state='disabled')
+
+        def auto_refresh():
+            if diag_window.winfo_exists():
+                refresh()
+                diag_window.after(2000, auto_refresh)
+
+        def save_json():
+            try:
+                path = self.watchdog.dump(UI_WATCHDOG_FILE)
+                self.status_label.config(text=f"UI diagnostics saved: {path}", fg='#6bcb77')
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить диагностику: {e}")
+
+        def reset():
+            self.watchdog.reset()
+            refresh()
+
+        buttons = tk.Frame(diag_window, bg='#1a1a2e')
+        buttons.pack(pady=10)
+        for text, command, color in (("Refresh", refresh, '#0f3460'),
+                                     ("Save JSON", save_json, '#6bcb77'),
+                                     ("Reset", reset, '#e94560')):
+            tk.Button(buttons, text=text, command=command,
+                      bg=color, fg='white', font=('Arial', 10, 'bold'),
+                      relief='flat', padx=10).pack(side='left', padx=5)
+
+        auto_refresh()
+
+    def show_cache_metrics(self):
+        """Окно диагностики кэшей: попадания, промахи, свежесть, размер."""
+        metrics_window = tk.Toplevel(self.root)
+        metrics_window.title("Cache Diagnostics")
+        metrics_window.geometry("760x640")
+        metrics_window.configure(bg='#1a1a2e')
+
+        header = tk.Label(metrics_window, text="Cache Hit/Miss, Freshness & Latency",
+                         font=('Arial', 14, 'bold'), fg='#e94560', bg='#1a1a2e')
+        header.pack(pady=10)
+
+        metrics_text = tk.Text(metrics_window, bg='#16213e', fg='white',
+                               font=('Consolas', 10), height=32)
+        metrics_text.pack(fill='both', expand=True, padx=10, pady=5)
+
+        def refresh():
+            if not metrics_window.winfo_exists():
+                return
+            metrics_text.config(state='normal')
+            metrics_text.delete('1.0', 'end')
+            metrics_text.insert('end', format_metrics_report())
+            metrics_text.insert('end', "\n\n" + format_latency_report())
+            metrics_text.insert('end', "\n\n" + self.ui.get_stats_report())
+            metrics_text.insert('end', "\n\n" + self.pool.get_status_report())
+            metrics_text.insert('end', "\n\n" + get_resolver().get_stats_report())
+            metrics_text.insert('end', "\n\n" + get_prompt_stats_report())
+            metrics_text.config(state='disabled')
+
+        def auto_refresh():
+            if metrics_window.winfo_exists():
+                refresh()
+                metrics_window.after(2000, auto_refresh)
+
+        def save_json():
+            try:
+                path = dump_metrics(CACHE_METRICS_FILE)
+                self.status_label.config(text=f"Cache metrics saved: {path}", fg='#6bcb77')
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить метрики: {e}")
+
+        def reset():
+            reset_metrics()
+            refresh()
+
+        buttons = tk.Frame(metrics_window, bg='#1a1a2e')
+        buttons.pack(pady=10)
+        for text, command, color in (("Refresh", refresh, '#0f3460'),
+                                     ("Save JSON", save_json, '#6bcb77'),
+                                     ("Reset", reset, '#e94560')):
+            tk.Button(buttons, text=text, command=command,
+                      bg=color, fg='white', font=('Arial', 10, 'bold'),
+                      relief='flat', padx=10).pack(side='left', padx=5)
+
+        auto_refresh()
+
     def clear_changes_log(self, text_widget):
         """Очистка лога изменений."""
         self.changes_log = []
@@ -1402,6 +2074,9 @@ class LineupsGUI:
 
         # Создаём фейковое изменение
         change = {
+            'type': 'starter_swap',
+            'severity': 'high',
+            'simulated': True,  # AI анализ для тестовых изменений не запускается
             'time': datetime.now().strftime('%H:%M:%S'),
             'game': self.get_game_key(game),
             'team': team.get('abbrev', '???'),
@@ -1414,11 +2089,8 @@ class LineupsGUI:
         self.changes_log.append(change)
         self.save_cache()
 
-        # Показываем уведомление
-        self.show_notification([change])
-
-        # Обновляем статус
-        self.highlight_changes([change])
+        # Прогоняем через шину, как настоящее изменение
+        self.event_bus.publish(LINEUP_CHANGES_TOPIC, [change])
 
         print(f"ТЕСТ: {change['team']} {position}: {old_name} -> {new_name}")
 
@@ -1433,8 +2105,7 @@ class LineupsGUI:
         self.compare_btn.config(state='disabled')
 
         # Запускаем в фоне
-        thread = threading.Thread(target=self._fetch_and_compare, daemon=True)
-        thread.start()
+        self.pool.submit(self._fetch_and_compare, priority=PRIORITY_INTERACTIVE, key='compare')
 
     def _fetch_and_compare(self):
         """Фоновая загрузка и сравнение с использованием кэша."""
@@ -1447,6 +2118,9 @@ class LineupsGUI:
 
             teams_to_check.discard(None)
 
+            # Сверяемся с логом лиги - кто сыграл новую игру
+            self.refresh_schedule()
+
             # Получаем данные о последних играх (с использованием кэша)
             historical_data = {}
             teams_from_cache = 0
@@ -1464,10 +2138,9 @@ class LineupsGUI:
                     print(f"  {team}: загрузка...")
                     data = get_team_last_game_starters_nba_api(team, '2025-26')
                     if data:
-                        # Добавляем время кэширования
-                        data['cached_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        # Добавляем время кэширования и ожидаемую дату игры
+                        self._store_historical(team, data)
                         historical_data[team] = data
-                        self.historical_cache[team] = data
                         teams_fetched += 1
 
             # Сохраняем обновленный кэш
@@ -1477,15 +2150,15 @@ class LineupsGUI:
             print(f"Итого: {teams_from_cache} из кэша, {teams_fetched} загружено")
 
             # Сравниваем и показываем результат
-            self.root.after(0, lambda: self._show_comparison_results(historical_data))
+            self.ui.post(lambda: self._show_comparison_results(historical_data))
 
         except Exception as e:
             print(f"Ошибка сравнения: {e}")
-            self.root.after(0, lambda: self.status_label.config(
+            self.ui.post(lambda: self.status_label.config(
                 text=f"Error: {e}", fg='#ff6b6b'
-            ))
+            ), key='status')
 
-        self.root.after(0, lambda: self.compare_btn.config(state='normal'))
+        self.ui.post(lambda: self.compare_btn.config(state='normal'))
 
     def _show_comparison_results(self, historical_data):
         """Показ результатов сравнения."""
@@ -1595,52 +2268,46 @@ class LineupsGUI:
         # Показываем статус
         self.status_label.config(text=f"Loading {team_abbrev} stats...", fg='#ffd93d')
 
-        # Запускаем в фоне
-        thread = threading.Thread(
-            target=self._fetch_team_stats,
-            args=(team_abbrev, opponent_abbrev, is_home),
-            daemon=True
-        )
-        thread.start()
+        # Запускаем в фоне (повторный клик по той же команде не дублирует загрузку)
+        self.pool.submit(self._fetch_team_stats, team_abbrev, opponent_abbrev, is_home,
+                         priority=PRIORITY_INTERACTIVE, key=f"team_stats:{team_abbrev}")
 
     def _fetch_team_stats(self, team_abbrev, opponent_abbrev=None, is_home=None):
         """Фоновая загрузка статистики команды с кэшированием."""
         try:
-            # Проверяем кэш
-            if self.is_team_stats_cache_valid(team_abbrev):
+            # Сверяемся с логом лиги; кэш или API (или уже идущая предзагрузка этой команды)
+            self.refresh_schedule()
+            data, source = self._load_team_stats(team_abbrev)
+            if data and source == 'cache':
                 print(f"Статистика {team_abbrev}: из кэша")
-                data = self.team_stats_cache[team_abbrev]
-                self.root.after(0, lambda: self._show_team_stats_window(data, opponent_abbrev, is_home))
-                self.root.after(0, lambda: self.status_label.config(
+                # Аналитика и раскладка таблицы - здесь, не в UI потоке
+                view = build_team_stats_view(data, self._get_team_analytics(team_abbrev, data))
+                self.ui.post(lambda: self._show_team_stats_window(data, opponent_abbrev, is_home, view))
+                self.ui.post(lambda: self.status_label.config(
                     text=f"{len(self.games)} games today (cached)", fg='#a0a0a0'
-                ))
+                ), key='status')
                 return
 
-            # Загружаем с API
-            print(f"Загрузка статистики {team_abbrev} с API...")
-            data = get_team_last_n_games_stats(team_abbrev, n_games=10, season='2025-26')
-
             if data:
-                # Добавляем метку времени и сохраняем в кэш
-                data['cached_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                self.team_stats_cache[team_abbrev] = data
-                self.save_team_stats_cache()
+                if source == 'api':
+                    self.save_team_stats_cache()
 
-                self.root.after(0, lambda: self._show_team_stats_window(data, opponent_abbrev, is_home))
+                view = build_team_stats_view(data, self._get_team_analytics(team_abbrev, data))
+                self.ui.post(lambda: self._show_team_stats_window(data, opponent_abbrev, is_home, view))
             else:
-                self.root.after(0, lambda: self.status_label.config(
+                self.ui.post(lambda: self.status_label.config(
                     text=f"No data for {team_abbrev}", fg='#ff6b6b'
-                ))
+                ), key='status')
 
         except Exception as e:
             print(f"Ошибка загрузки статистики: {e}")
-            self.root.after(0, lambda: self.status_label.config(
+            self.ui.post(lambda: self.status_label.config(
                 text=f"Error: {e}", fg='#ff6b6b'
-            ))
+            ), key='status')
 
-        self.root.after(0, lambda: self.status_label.config(
+        self.ui.post(lambda: self.status_label.config(
             text=f"{len(self.games)} games today", fg='#a0a0a0'
-        ))
+        ), key='status')
 
     def preload_all_teams_stats(self):
         """Предзагрузка статистики всех команд сегодняшних игр в фоне."""
@@ -1663,44 +2330,142 @@ class LineupsGUI:
         print(f"Предзагрузка статистики для {len(teams_to_preload)} команд...")
         self.status_label.config(text=f"Preloading stats for {len(teams_to_preload)} teams...", fg='#ffd93d')
 
-        # Запускаем в фоновом потоке
-        thread = threading.Thread(
-            target=self._preload_teams_stats_thread,
-            args=(list(teams_to_preload),),
-            daemon=True
-        )
-        thread.start()
+        # Запускаем в пуле с низким приоритетом (клики пользователя важнее)
+        self.pool.submit(self._preload_teams_stats_thread, list(teams_to_preload), self._date_token,
+                         priority=PRIORITY_PRELOAD, key='preload', token=self._date_token)
+
+    def _projection_slate(self) -> str:
+        """Дата слейта для таблицы прогнозов (YYYY-MM-DD) - от даты слейта в кэше составов."""
+        day = datetime.strptime(self.slate_date, '%Y-%m-%d') if self.slate_date else datetime.now()
+        if self.selected_date == "tomorrow":
+            day += timedelta(days=1)
+        return day.strftime('%Y-%m-%d')
+
+    def start_projection_batch(self):
+        """Пакетные AI-прогнозы для всех ожидаемых стартеров слейта (в фоне)."""
+        if not self.ai_enabled:
+            messagebox.showwarning("AI недоступен",
+                                   "AI анализ недоступен.\n\nСоздайте файл .env с вашим OpenAI API ключом:\nOPENAI_API_KEY=sk-...")
+            return
+
+        if not self.games:
+            messagebox.showwarning("Нет данных", "Сначала загрузите данные об играх!")
+            return
+
+        if not messagebox.askyesno("AI Batch",
+                                   f"Посчитать AI-прогнозы для всех стартеров ({len(self.games)} игр)?\n\n"
+                                   "Готовые прогнозы открываются по клику на игрока мгновенно."):
+            return
+
+        self.status_label.config(text="AI batch: preparing...", fg='#ffd93d')
+        self.pool.submit(self._projection_batch_thread, self._date_token,
+                         priority=PRIORITY_PRELOAD, key='projection_batch', token=self._date_token)
+
+    def _projection_batch_thread(self, token=None):
+        """Сборка задач по стартерам и пакетный прогон (прерывается при смене даты)."""
+        slate = self._projection_slate()
+        jobs = self._build_projection_jobs(slate, token)
+        if token is not None and token.cancelled:
+            return
+        if not jobs:
+            print("[BATCH] Все прогнозы слейта уже посчитаны")
+            self.ui.post(lambda: self.status_label.config(
+                text="AI batch: all projections ready", fg='#6bcb77'), key='status')
+            return
+
+        def on_progress(done, total, player_name, status):
+            self.ui.post(lambda: self.status_label.config(
+                text=f"AI batch: {done}/{total} ({player_name})", fg='#ffd93d'), key='status')
+
+        stats = run_projection_batch(slate, jobs, on_progress=on_progress, token=token)
+        self.ui.post(lambda: self.status_label.config(
+            text=f"AI batch: {stats['done']} done, {stats['failed']} failed ({stats['elapsed_s']}s)",
+            fg='#6bcb77' if not stats['failed'] else '#ffd93d'), key='status')
+
+    def _build_projection_jobs(self, slate, token=None) -> list:
+        """
+        Аргументы build_player_projection_messages для каждого стартера слейта.
+
+        Статистика команд - через _load_team_stats (кэш или общий запрос
+        с предзагрузкой). Игроки с актуальным прогнозом пропускаются.
+        """
+        jobs = []
+        for game in self.games:
+            away_team = game.get('away_team', {})
+            home_team = game.get('home_team', {})
+            for team, opponent, is_home in ((away_team, home_team, False), (home_team, away_team, True)):
+                if token is not None and token.cancelled:
+                    return []
+                team_abbrev = team.get('abbrev')
+                if not team_abbrev:
+                    continue
+                data, _ = self._load_team_stats(team_abbrev)
+                team_games = (data or {}).get('games', [])
+                if not team_games:
+                    print(f"[BATCH] {team_abbrev}: нет статистики, пропускаем")
+                    continue
+
+                lineup = team.get('lineup', [])
+                matrix = self._get_team_stat_matrix(team_abbrev, team_games)
+                averages, games_played = matrix.averages(n=5)
+                team_injuries = [self._get_player_avg_stats(p.get('name'), matrix, averages, games_played)
+                                 for p in lineup if p.get('status') in ['out', 'doubtful']]
+                opponent_abbrev = opponent.get('abbrev')
+                analytics = self._get_team_analytics(team_abbrev, data)
+
+                for p in lineup:
+                    if p.get('position') not in POSITIONS_ORDER or p.get('status', 'active') == 'out':
+                        continue
+                    player_name = p.get('name')
+                    if get_projection(slate, player_name, team_injuries):
+                        continue
+                    jobs.append({
+                        'player_name': player_name,
+                        'player_position': p.get('position'),
+                        'team_abbrev': team_abbrev,
+                        'player_stats': matrix.player_games(player_name),
+                        'opponent_abbrev': opponent_abbrev or "N/A",
+                        'opponent_stats': self.team_stats_cache.get(opponent_abbrev) if opponent_abbrev else None,
+                        'is_home': is_home,
+                        'team_injuries': team_injuries,
+                        'team_games': team_games,
+                        'player_index': matrix.index,
+                        'team_analytics': analytics,
+                    })
+        return jobs
 
-    def _preload_teams_stats_thread(self, teams):
-        """Фоновая загрузка статистики команд."""
+    def _preload_teams_stats_thread(self, teams, token=None):
+        """Фоновая загрузка статистики команд (прерывается при смене даты)."""
         loaded = 0
         cached = 0
         total = len(teams)
 
+        # Один запрос к логу лиги вместо TTL: перезагрузятся только команды с новой игрой
+        try:
+            self.refresh_schedule()
+        except Exception as e:
+            print(f"Ошибка проверки расписания: {e}")
+
         for team_abbrev in teams:
+            if token is not None and token.cancelled:
+                print(f"Предзагрузка прервана: {token.reason}")
+                break
             try:
-                # Проверяем кэш
-                is_valid = self.is_team_stats_cache_valid(team_abbrev)
-                if is_valid:
+                # Кэш или API - одна проверка кэша (и одна запись в метрики) на команду
+                data, source = self._load_team_stats(team_abbrev)
+                if source == 'cache':
                     cached += 1
                     # Получаем время кэша для отладки
-                    cached_time = self.team_stats_cache.get(team_abbrev, {}).get('cached_at', 'unknown')
+                    cached_time = data.get('cached_at', 'unknown')
                     print(f"  {team_abbrev}: из кэша ({cached + loaded}/{total}) [кэширован: {cached_time}]")
-                else:
-                    # Загружаем с API
-                    in_cache = team_abbrev in self.team_stats_cache
-                    print(f"  {team_abbrev}: загрузка... ({cached + loaded}/{total}) [в кэше: {in_cache}]")
-                    data = get_team_last_n_games_stats(team_abbrev, n_games=10, season='2025-26')
-
-                    if data:
-                        data['cached_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        self.team_stats_cache[team_abbrev] = data
-                        loaded += 1
+                elif data:
+                    loaded += 1
+                    print(f"  {team_abbrev}: загружено ({cached + loaded}/{total}) [{source}]")
 
                 # Обновляем статус в UI
-                self.root.after(0, lambda c=cached, l=loaded, t=total: self.status_label.config(
+                self.ui.post(lambda c=cached, l=loaded, t=total: self.status_label.config(
                     text=f"Preloading stats... {c + l}/{t}", fg='#ffd93d'
-                ))
+                ), key='status')
 
             except Exception as e:
                 print(f"  {team_abbrev}: ошибка - {e}")
@@ -1710,14 +2475,19 @@ class LineupsGUI:
             self.save_team_stats_cache()
 
         # Финальный статус
-        self.root.after(0, lambda: self.status_label.config(
+        self.ui.post(lambda: self.status_label.config(
             text=f"{len(self.games)} games today | Stats preloaded ({cached} cached, {loaded} loaded)",
             fg='#6bcb77'
-        ))
+        ), key='status')
         print(f"Предзагрузка завершена: {cached} из кэша, {loaded} загружено")
 
-    def _show_team_stats_window(self, data, opponent_abbrev=None, is_home=None):
-        """Показ окна со статистикой команды."""
+    def _show_team_stats_window(self, data, opponent_abbrev=None, is_home=None, view=None):
+        """
+        Показ окна со статистикой команды.
+
+        Таблица рисуется на одном Canvas (TeamStatsCanvas); view - модель
+        отображения, посчитанная в фоновом потоке (build_team_stats_view).
+        """
         team_abbrev = data['team']
         team_name = data.get('team_name', team_abbrev)
         games = data.get('games', [])
@@ -1730,6 +2500,10 @@ class LineupsGUI:
         stats_window.geometry("1300x750")
         stats_window.configure(bg='#1a1a2e')
 
+        # Закрытие окна отменяет AI анализ команды
+        window_token = CancelToken()
+        stats_window.bind('<Destroy>', lambda e: window_token.cancel('window closed') if e.widget is stats_window else None)
+
         # Заголовок
         header_frame = tk.Frame(stats_window, bg=colors['primary'])
         header_frame.pack(fill='x')
@@ -1763,104 +2537,20 @@ class LineupsGUI:
         right_panel.pack(side='right', fill='both', expand=True, padx=(10, 0))
         right_panel.pack_propagate(False)
 
-        # Контейнер для скролла статистики
-        container = tk.Frame(left_panel, bg='#1a1a2e')
-        container.pack(fill='both', expand=True)
-
-        canvas = tk.Canvas(container, bg='#1a1a2e', highlightthickness=0)
-        scrollbar = ttk.Scrollbar(container, orient='vertical', command=canvas.yview)
-
-        scrollable_frame = tk.Frame(canvas, bg='#1a1a2e')
-        scrollable_frame.bind("<Configure>",
-                             lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor='nw')
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        scrollbar.pack(side='right', fill='y')
-        canvas.pack(side='left', fill='both', expand=True)
-
-        # Для каждой игры создаём блок
-        for i, game in enumerate(games):
-            game_frame = tk.Frame(scrollable_frame, bg='#16213e')
-            game_frame.pack(fill='x', padx=5, pady=8)
-
-            # Заголовок игры
-            result_color = '#6bcb77' if game['result'] == 'W' else '#ff6b6b'
-            game_header = tk.Frame(game_frame, bg='#0f3460')
-            game_header.pack(fill='x')
-
-            game_info = tk.Label(game_header,
-                                text=f"Game {i+1}: {game['matchup']} | {game['date']}",
-                                font=('Arial', 11, 'bold'),
-                                fg='white', bg='#0f3460')
-            game_info.pack(side='left', padx=10, pady=8)
-
-            result_label = tk.Label(game_header,
-                                   text=game['result'],
-                                   font=('Arial', 14, 'bold'),
-                                   fg=result_color, bg='#0f3460')
-            result_label.pack(side='right', padx=15, pady=8)
-
-            # Таблица со статистикой
-            stats_frame = tk.Frame(game_frame, bg='#1a1a2e')
-            stats_frame.pack(fill='x', padx=5, pady=5)
-
-            # Заголовок таблицы
-            headers = ['POS', 'PLAYER', 'MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK']
-            header_row = tk.Frame(stats_frame, bg='#0f3460')
-            header_row.pack(fill='x')
-
-            col_widths = [4, 20, 6, 5, 5, 5, 5, 5]
-            for j, (h, w) in enumerate(zip(headers, col_widths)):
-                lbl = tk.Label(header_row, text=h, font=('Arial', 9, 'bold'),
-                              fg='#a0a0a0', bg='#0f3460', width=w, anchor='center')
-                lbl.pack(side='left', padx=1)
-
-            # Строки с игроками
-            for starter in game['starters']:
-                player_row = tk.Frame(stats_frame, bg='#16213e')
-                player_row.pack(fill='x')
-
-                # Позиция
-                pos_lbl = tk.Label(player_row, text=starter['position'], font=('Consolas', 10),
-                                  fg='white', bg='#16213e', width=col_widths[0], anchor='center')
-                pos_lbl.pack(side='left', padx=1)
-
-                # Имя игрока (кликабельное)
-                player_name = starter['name']
-                player_position = starter['position']
-                name_lbl = tk.Label(player_row, text=player_name[:18], font=('Consolas', 10, 'underline'),
-                                   fg='#9b59b6', bg='#16213e', width=col_widths[1], anchor='w', cursor='hand2')
-                name_lbl.pack(side='left', padx=1)
-
-                # Привязываем клик к имени
-                name_lbl.bind('<Button-1>', lambda e, pn=player_name, pp=player_position, ta=team_abbrev, g=games, oa=opponent_abbrev, ih=is_home:
-                             self._on_player_click(pn, pp, ta, g, oa, ih))
-                name_lbl.bind('<Enter>', lambda e, lbl=name_lbl: lbl.config(fg='#c39bd3'))
-                name_lbl.bind('<Leave>', lambda e, lbl=name_lbl: lbl.config(fg='#9b59b6'))
-
-                # Остальные статы
-                mins = starter['min'] if starter['min'] else '-'
-                pts_color = '#ffd93d' if starter['pts'] >= 20 else 'white'
-                reb_color = '#6bcb77' if starter['reb'] >= 10 else 'white'
-                ast_color = '#4fc3f7' if starter['ast'] >= 8 else 'white'
-
-                stat_values = [mins, str(starter['pts']), str(starter['reb']), str(starter['ast']),
-                              str(starter['stl']), str(starter['blk'])]
-                stat_colors = ['#a0a0a0', pts_color, reb_color, ast_color, 'white', 'white']
-                stat_widths = col_widths[2:]
-
-                for val, w, col in zip(stat_values, stat_widths, stat_colors):
-                    lbl = tk.Label(player_row, text=val, font=('Consolas', 10),
-                                  fg=col, bg='#16213e', width=w, anchor='center')
-                    lbl.pack(side='left', padx=1)
+        # Таблица статистики по играм: один Canvas, клик по имени - AI-прогноз
+        if view is None:
+            view = build_team_stats_view(data, self._get_team_analytics(team_abbrev, data))
+        stats_table = TeamStatsCanvas(
+            left_panel, view,
+            on_player_click=lambda pn, pp: self._on_player_click(pn, pp, team_abbrev, games, opponent_abbrev, is_home)
+        )
+        stats_table.pack(fill='both', expand=True)
 
         # Получаем текущий состав команды на сегодня (кто играет, кто травмирован)
         current_lineup = self._get_team_current_lineup(team_abbrev)
 
         # Добавляем AI анализ команды в правую панель
-        self._add_team_ai_analysis(right_panel, team_abbrev, games, opponent_abbrev, colors, current_lineup)
+        self._add_team_ai_analysis(right_panel, team_abbrev, games, opponent_abbrev, colors, current_lineup, window_token)
 
         # Кнопка закрытия
         close_btn = tk.Button(stats_window, text="Close",
@@ -1906,7 +2596,7 @@ class LineupsGUI:
 
         return lineup
 
-    def _add_team_ai_analysis(self, panel, team_abbrev, games, opponent_abbrev, colors, current_lineup=None):
+    def _add_team_ai_analysis(self, panel, team_abbrev, games, opponent_abbrev, colors, current_lineup=None, token=None):
         """Добавляет AI анализ команды в правую панель."""
         # Заголовок панели
         ai_header = tk.Label(panel, text="🤖 Team AI Analysis",
@@ -1940,21 +2630,21 @@ class LineupsGUI:
         loading_label.pack(pady=50)
 
         # Запускаем AI анализ в фоне
-        thread = threading.Thread(
-            target=self._run_team_ai_analysis_thread,
-            args=(scrollable, loading_label, team_abbrev, games, opponent_abbrev, current_lineup),
-            daemon=True
-        )
-        thread.start()
+        self.pool.submit(self._run_team_ai_analysis_thread, scrollable, loading_label, team_abbrev,
+                         games, opponent_abbrev, current_lineup, token,
+                         priority=PRIORITY_INTERACTIVE, key=f"team_ai:{team_abbrev}", token=token)
 
-    def _run_team_ai_analysis_thread(self, container, loading_label, team_abbrev, games, opponent_abbrev, current_lineup=None):
+    def _run_team_ai_analysis_thread(self, container, loading_label, team_abbrev, games, opponent_abbrev,
+                                     current_lineup=None, token=None):
         """Фоновый AI анализ команды."""
+        # Потоковый режим: текст заменяет индикатор загрузки с первым фрагментом
+        stream_view = {}
         try:
             print(f"[DEBUG TEAM] Начало анализа команды {team_abbrev}")
 
             if not self.ai_enabled:
                 print(f"[DEBUG TEAM] AI не включен")
-                self.root.after(0, lambda: loading_label.config(
+                self.ui.post(lambda: loading_label.config(
                     text="AI анализ недоступен\n\nНастройте OPENAI_API_KEY в .env файле"))
                 return
 
@@ -1974,8 +2664,17 @@ class LineupsGUI:
             if not client:
                 raise Exception("AI клиент не инициализирован")
 
+            def on_text(text):
+                if not stream_view:
+                    if (token is not None and token.cancelled) or not container.winfo_exists():
+                        return
+                    stream_view['text'] = self._display_team_analysis(container, loading_label, "")
+                self._append_stream_text(stream_view['text'], text)
+
+            stream = TextStream(self.ui, on_text) if AI_STREAMING_ENABLED else None
+
             print(f"[DEBUG TEAM] Отправка запроса к OpenAI...")
-            response = client.chat.completions.create(
+            analysis_text = cached_chat_completion(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "Ты NBA аналитик. Анализируешь составы команд и прогнозируешь перераспределение игровой нагрузки. ВАЖНО: работай ТОЛЬКО с фактическими данными из промпта. НЕ делай предположений о возможных травмах или изменениях, если они не указаны явно."},
@@ -1983,15 +2682,18 @@ class LineupsGUI:
                 ],
                 max_tokens=400,
                 temperature=0.7,
-                timeout=30
+                timeout=30,
+                on_delta=stream.feed if stream else None
             )
 
-            analysis_text = response.choices[0].message.content
             print(f"[DEBUG TEAM] Получен ответ от AI, длина: {len(analysis_text)}")
+            if token is not None and token.cancelled:
+                print(f"[DEBUG TEAM] Окно закрыто - результат не показываем")
+                return
 
             # Обновляем UI
             print(f"[DEBUG TEAM] Обновление UI...")
-            self.root.after(0, lambda: self._display_team_analysis(container, loading_label, analysis_text))
+            self.ui.post(lambda: self._finish_team_analysis(container, loading_label, analysis_text, stream_view))
             print(f"[DEBUG TEAM] UI обновлен!")
 
         except Exception as e:
@@ -1999,7 +2701,7 @@ class LineupsGUI:
             import traceback
             traceback.print_exc()
             error_msg = str(e)[:100]
-            self.root.after(0, lambda: loading_label.config(
+            self.ui.post(lambda: self._append_stream_error(stream_view, error_msg) or loading_label.config(
                 text=f"Ошибка AI анализа:\n{error_msg}"))
 
     def _build_team_analysis_prompt(self, team_abbrev, games, opponent_abbrev, current_lineup=None):
@@ -2035,42 +2737,44 @@ class LineupsGUI:
         from news_scraper import get_news_by_team
         team_news = get_news_by_team(team_abbrev, limit=5)
 
-        # Формируем промпт
-        prompt = f"""Проанализируй текущий состав команды {team_abbrev} на основе последних 5 игр и актуальных новостей.
-
-СТАТИСТИКА ОСНОВНЫХ ИГРОКОВ (последние 5 игр, по средним очкам):
-"""
+        # Формируем разделы промпта
+        stats_text = ""
         for name, stats in sorted_players[:7]:
-            prompt += f"\n- {name}: {stats['avg_pts']:.1f} очков/игру"
+            stats_text += f"\n- {name}: {stats['avg_pts']:.1f} очков/игру"
 
         # Добавляем информацию о текущем составе (кто травмирован)
+        injuries_text = ""
         if current_lineup:
             if current_lineup['out']:
-                prompt += f"\n\n⚠️ ВЫБЫВШИЕ ИГРОКИ НА СЕГОДНЯ:"
+                injuries_text += f"\n\n⚠️ ВЫБЫВШИЕ ИГРОКИ НА СЕГОДНЯ:"
                 for player in current_lineup['out']:
                     # Проверяем, был ли этот игрок ключевым
                     is_key = any(player == name for name, _ in sorted_players[:3])
                     marker = " (КЛЮЧЕВОЙ ИГРОК!)" if is_key else ""
-                    prompt += f"\n- {player}{marker}"
+                    injuries_text += f"\n- {player}{marker}"
 
             if current_lineup['injured']:
-                prompt += f"\n\n🤕 ПОД ВОПРОСОМ:"
+                injuries_text += f"\n\n🤕 ПОД ВОПРОСОМ:"
                 for player in current_lineup['injured']:
-                    prompt += f"\n- {player}"
+                    injuries_text += f"\n- {player}"
 
-        # Добавляем новости
+        # Новости: 3 заголовка -> 1 (по бюджету)
         if team_news:
-            prompt += f"\n\nАКТУАЛЬНЫЕ НОВОСТИ О КОМАНДЕ (последние 3 дня):"
-            for news in team_news[:3]:
-                title = news.get('title', '')
-                prompt += f"\n• {title}"
+            news_variants = [
+                "\n\nАКТУАЛЬНЫЕ НОВОСТИ О КОМАНДЕ (последние 3 дня):"
+                + "".join(f"\n• {news.get('title', '')}" for news in team_news[:limit])
+                for limit in (3, 1)
+            ]
         else:
-            prompt += f"\n\nАКТУАЛЬНЫЕ НОВОСТИ: Актуальных новостей нет"
+            news_variants = ["\n\nАКТУАЛЬНЫЕ НОВОСТИ: Актуальных новостей нет"]
 
-        if opponent_abbrev:
-            prompt += f"\n\nСЛЕДУЮЩИЙ СОПЕРНИК: {opponent_abbrev}"
+        opponent_text = f"\n\nСЛЕДУЮЩИЙ СОПЕРНИК: {opponent_abbrev}" if opponent_abbrev else ""
+
+        def render(sections):
+            return f"""Проанализируй текущий состав команды {team_abbrev} на основе последних 5 игр и актуальных новостей.
 
-        prompt += f"""
+СТАТИСТИКА ОСНОВНЫХ ИГРОКОВ (последние 5 игр, по средним очкам):
+{sections.get('stats', '')}{sections.get('injuries', '')}{sections.get('news', '')}{opponent_text}
 
 ЗАДАЧА:
 1. **Анализ текущего состава**:
@@ -2095,10 +2799,15 @@ class LineupsGUI:
 
 Ответ на русском, структурированно, КОНКРЕТНО (с цифрами), максимум 350 слов."""
 
-        return prompt
+        builder = PromptBuilder("team_analysis", TEAM_ANALYSIS_PROMPT_BUDGET, "gpt-4o-mini")
+        builder.add_fixed(render({}))
+        builder.add('stats', stats_text, priority=0, required=True)
+        builder.add('injuries', injuries_text, priority=1, required=True)
+        builder.add('news', news_variants, priority=2, budget=TEAM_ANALYSIS_NEWS_BUDGET)
+        return render(builder.build())
 
     def _display_team_analysis(self, container, loading_label, analysis_text):
-        """Отображает результат AI анализа."""
+        """Отображает результат AI анализа. Returns: Text с анализом."""
         loading_label.destroy()
 
         text_widget = tk.Text(container, wrap='word', font=('Arial', 10),
@@ -2107,129 +2816,177 @@ class LineupsGUI:
         text_widget.pack(fill='both', expand=True)
         text_widget.insert('1.0', analysis_text)
         text_widget.config(state='disabled')
+        return text_widget
+
+    def _finish_team_analysis(self, container, loading_label, analysis_text, stream_view=None):
+        """Итог AI анализа команды: в окне, открытом потоком, - итоговый текст."""
+        if stream_view:
+            self._set_stream_text(stream_view['text'], analysis_text)
+            return
+        if container.winfo_exists():
+            self._display_team_analysis(container, loading_label, analysis_text)
+
+    def _get_player_index(self):
+        """
+        Индекс игроков текущего слейта: {имя: {'team_abbrev', 'opponent_abbrev', 'is_home', 'team'}}.
+
+        Перестраивается, только когда self.games заменён новым слейтом.
+        """
+        if self._player_index_games is not self.games:
+            index = {}
+            for game in self.games:
+                away_team = game.get('away_team', {})
+                home_team = game.get('home_team', {})
+                for team, opponent, is_home in ((away_team, home_team, False), (home_team, away_team, True)):
+                    for p in team.get('lineup', []):
+                        index.setdefault(p.get('name'), {
+                            'team_abbrev': team.get('abbrev'),
+                            'opponent_abbrev': opponent.get('abbrev'),
+                            'is_home': is_home,
+                            'team': team,
+                        })
+            self._player_index = index
+            self._player_index_games = self.games
+        return self._player_index
 
     def _handle_main_window_player_click(self, player):
-        """Обработка клика на игрока из главного окна."""
+        """
+        Обработка клика на игрока из главного окна.
+
+        UI поток не блокируется: если статистики команды нет в кэше, она
+        грузится в пуле (или берётся из уже идущей предзагрузки), а пока
+        показывается окно прогресса.
+        """
         # Извлекаем данные из player dict
         player_name = player.get('name', 'Unknown')
         player_position = player.get('position', '?')
 
-        # Находим команду игрока и соперника из текущих игр
-        team_abbrev = None
-        opponent_abbrev = None
-        is_home = None
-        team_injuries = []
+        # Команда игрока и соперник - из индекса слейта
+        entry = self._get_player_index().get(player_name)
+        if not entry or not entry['team_abbrev']:
+            messagebox.showerror("Ошибка", f"Не удалось найти команду для игрока {player_name}")
+            return
 
-        for game in self.games:
-            away_team = game.get('away_team', {})
-            home_team = game.get('home_team', {})
+        team_abbrev = entry['team_abbrev']
+        team_injuries = self._team_out_players(entry['team'])
 
-            # Проверяем гостевую команду
-            for p in away_team.get('lineup', []):
-                if p.get('name') == player_name:
-                    team_abbrev = away_team.get('abbrev')
-                    opponent_abbrev = home_team.get('abbrev')
-                    is_home = False
-                    # Извлекаем РЕАЛЬНО травмированных игроков (только OUT и DOUBTFUL)
-                    # PROBABLE и QUESTIONABLE - игрок скорее всего будет играть
-                    team_injuries = [
-                        pl.get('name') for pl in away_team.get('lineup', [])
-                        if pl.get('status') in ['out', 'doubtful']
-                    ]
-                    break
-
-            # Проверяем домашнюю команду
-            if not team_abbrev:
-                for p in home_team.get('lineup', []):
-                    if p.get('name') == player_name:
-                        team_abbrev = home_team.get('abbrev')
-                        opponent_abbrev = away_team.get('abbrev')
-                        is_home = True
-                        # Извлекаем РЕАЛЬНО травмированных игроков (только OUT и DOUBTFUL)
-                        team_injuries = [
-                            pl.get('name') for pl in home_team.get('lineup', [])
-                            if pl.get('status') in ['out', 'doubtful']
-                        ]
-                        break
+        # Статистика команды из кэша - сразу к анализу
+        team_data = self.team_stats_cache.get(team_abbrev, {})
+        if team_data.get('games') and self.is_team_stats_cache_valid(team_abbrev):
+            self._continue_player_click(player_name, player_position, entry, team_data.get('games', []), team_injuries)
+            return
 
-            if team_abbrev:
-                break
+        # Нет в кеше или команда сыграла новую игру - загружаем в фоне
+        progress_window, token = self._show_stats_progress(team_abbrev, player_name)
+        self.status_label.config(text=f"Loading {team_abbrev} stats...", fg='#ffd93d')
 
-        if not team_abbrev:
-            messagebox.showerror("Ошибка", f"Не удалось найти команду для игрока {player_name}")
+        def load():
+            # Промах кэша уже учтён проверкой выше
+            data, source = self._load_team_stats(team_abbrev, record=False)
+            if source == 'api' and data:
+                self.save_team_stats_cache()
+            self.ui.post(lambda: self._on_player_stats_loaded(
+                progress_window, token, player_name, player_position, entry, data, team_injuries))
+
+        self.pool.submit(load, priority=PRIORITY_INTERACTIVE, key=f"player_stats:{team_abbrev}:{player_name}",
+                         token=token)
+
+    @staticmethod
+    def _team_out_players(team):
+        """
+        РЕАЛЬНО травмированные игроки команды (только OUT и DOUBTFUL).
+
+        PROBABLE и QUESTIONABLE - игрок скорее всего будет играть.
+        """
+        return [pl.get('name') for pl in team.get('lineup', []) if pl.get('status') in ['out', 'doubtful']]
+
+    def _find_slate_team(self, team_abbrev):
+        """Команда в текущем слейте (dict из self.games) или None."""
+        for game in self.games:
+            for side in ('away_team', 'home_team'):
+                team = game.get(side, {})
+                if team.get('abbrev') == team_abbrev:
+                    return team
+        return None
+
+    def _show_stats_progress(self, team_abbrev, player_name):
+        """Немодальное окно прогресса загрузки статистики; закрытие отменяет продолжение."""
+        window = tk.Toplevel(self.root)
+        window.title("Loading stats")
+        window.geometry("360x110")
+        window.configure(bg='#1a1a2e')
+        window.resizable(False, False)
+        window.transient(self.root)
+
+        tk.Label(window, text=f"Загружаю статистику {team_abbrev} для {player_name}...",
+                 font=('Arial', 10), fg='#a0a0a0', bg='#1a1a2e').pack(pady=(20, 10))
+        progress = ttk.Progressbar(window, mode='indeterminate', length=300)
+        progress.pack()
+        progress.start(15)
+
+        token = CancelToken()
+        window.bind('<Destroy>', lambda e: token.cancel('window closed') if e.widget is window else None)
+        return window, token
+
+    def _on_player_stats_loaded(self, progress_window, token, player_name, player_position, entry, data, team_injuries):
+        """Статистика команды загружена (UI поток): закрываем прогресс и продолжаем анализ."""
+        if token.cancelled:
             return
+        progress_window.destroy()
+        self.status_label.config(text=f"{len(self.games)} games today", fg='#a0a0a0')
 
-        # Получаем статистику команды из кеша
-        team_data = self.team_stats_cache.get(team_abbrev, {})
-        team_games = team_data.get('games', [])
-
-        if not team_games:
-            # Если нет в кеше - загружаем
-            messagebox.showinfo("Загрузка данных",
-                              f"Загружаю статистику {team_abbrev}...\nПожалуйста, подождите.")
-            team_stats = get_team_last_n_games_stats(team_abbrev, n_games=10)
-            team_games = team_stats.get('games', [])
-            self.team_stats_cache[team_abbrev] = {'games': team_games}
-
-        # Собираем статистику для каждого OUT игрока (среднее за последние 5 игр где он играл)
-        injuries_with_stats = []
-        for injured_name in team_injuries:
-            injured_stats = self._get_player_avg_stats(injured_name, team_games, n_games=5)
-            injuries_with_stats.append(injured_stats)
+        team_abbrev = entry['team_abbrev']
+        if data:
+            team_games = data.get('games', [])
+        else:
+            # API недоступен - работаем со старыми данными
+            team_data = self.team_stats_cache.get(team_abbrev, {})
+            team_games = team_data.get('games', [])
+            if team_games:
+                record_stale('team_stats', age_since(team_data.get('cached_at')))
+
+        self._continue_player_click(player_name, player_position, entry, team_games, team_injuries)
+
+    def _continue_player_click(self, player_name, player_position, entry, team_games, team_injuries):
+        """AI-прогноз по игроку, когда статистика команды уже есть."""
+        # Средние всех игроков команды за последние 5 сыгранных игр - одна операция над матрицей
+        matrix = self._get_team_stat_matrix(entry['team_abbrev'], team_games)
+        averages, games_played = matrix.averages(n=5)
+        injuries_with_stats = [self._get_player_avg_stats(name, matrix, averages, games_played)
+                               for name in team_injuries]
 
         # Вызываем основную функцию анализа
-        self._on_player_click(player_name, player_position, team_abbrev, team_games, opponent_abbrev, is_home, injuries_with_stats)
+        self._on_player_click(player_name, player_position, entry['team_abbrev'], team_games,
+                              entry['opponent_abbrev'], entry['is_home'], injuries_with_stats)
 
-    def _get_player_avg_stats(self, player_name: str, team_games: list, n_games: int = 5) -> dict:
+    def _get_player_avg_stats(self, player_name: str, matrix: TeamStatMatrix, averages=None,
+                              games_played=None) -> dict:
         """
-        Получить среднюю статистику игрока за последние N игр где он играл.
+        Получить среднюю статистику игрока за последние 5 игр где он играл.
+
+        Args:
+            matrix: TeamStatMatrix команды
+            averages, games_played: Результат matrix.averages() (None - посчитать)
 
         Returns:
             dict: {name, avg_pts, avg_min, games_played}
         """
-        player_games = []
-
-        for game in team_games:
-            all_players = game.get('all_players', game.get('starters', []))
-            for player in all_players:
-                if names_match(player.get('name', ''), player_name):
-                    # Парсим минуты
-                    mins_raw = player.get('min', 0)
-                    if isinstance(mins_raw, str) and ':' in mins_raw:
-                        try:
-                            parts = mins_raw.split(':')
-                            mins = int(parts[0]) + int(parts[1]) / 60
-                        except:
-                            mins = 0
-                    else:
-                        mins = float(mins_raw) if mins_raw else 0
-
-                    player_games.append({
-                        'pts': player.get('pts', 0),
-                        'min': mins
-                    })
-                    break
-
-            # Достаточно N игр
-            if len(player_games) >= n_games:
-                break
-
-        if player_games:
-            avg_pts = sum(g['pts'] for g in player_games) / len(player_games)
-            avg_min = sum(g['min'] for g in player_games) / len(player_games)
-            return {
-                'name': player_name,
-                'avg_pts': round(avg_pts, 1),
-                'avg_min': round(avg_min, 1),
-                'games_played': len(player_games)
-            }
-        else:
+        if averages is None:
+            averages, games_played = matrix.averages(n=5)
+        row = matrix.row(player_name)
+        if row is None or not games_played[row]:
             return {
                 'name': player_name,
                 'avg_pts': 0,
                 'avg_min': 0,
                 'games_played': 0
             }
+        return {
+            'name': player_name,
+            'avg_pts': round(float(averages[row, STAT_INDEX['pts']]), 1),
+            'avg_min': round(float(averages[row, STAT_INDEX['min']]), 1),
+            'games_played': int(games_played[row])
+        }
 
     def _handle_player_label_click(self, event):
         """Обработчик клика на label игрока."""
@@ -2267,47 +3024,29 @@ class LineupsGUI:
             return
 
         # Вызов из окна статистики команды
-        player_name, player_position, team_abbrev, games, opponent_abbrev, is_home, team_injuries = args if len(args) == 7 else (*args, [])
+        player_name, player_position, team_abbrev, games, opponent_abbrev, is_home, team_injuries = args if len(args) == 7 else (*args, None)
 
-        # Собираем статистику игрока из всех игр
+        # Статистика игрока по всем играм из матрицы команды (стартеры + скамейка)
         # Если игрок не найден в игре - значит был травмирован
-        player_stats = []
-        for game_idx, game in enumerate(games, 1):
-            player_found = False
-            # Check all players (starters + bench) - use all_players field
-            all_players = game.get('all_players', game.get('starters', []))
-            for player in all_players:
-                # Compare by last name + first letter (handles "S. Gilgeous-Alexander" vs "Shai Gilgeous-Alexander")
-                if names_match(player['name'], player_name):
-                    player_stats.append({
-                        'matchup': game.get('matchup', 'N/A'),
-                        'date': game.get('date', ''),
-                        'pts': player.get('pts', 0),
-                        'reb': player.get('reb', 0),
-                        'ast': player.get('ast', 0),
-                        'stl': player.get('stl', 0),
-                        'blk': player.get('blk', 0),
-                        'min': player.get('min', 0),  # Передаём как есть (строка "MM:SS"), парсинг в ai_analyzer
-                        'is_starter': player.get('is_starter', True),
-                        'injured': False
-                    })
-                    player_found = True
-                    break
-
-            # Если игрок не найден в этой игре - был травмирован
-            if not player_found:
-                player_stats.append({
-                    'matchup': game.get('matchup', 'N/A'),
-                    'date': game.get('date', ''),
-                    'pts': 0,
-                    'reb': 0,
-                    'ast': 0,
-                    'stl': 0,
-                    'blk': 0,
-                    'min': 0,
-                    'is_starter': True,
-                    'injured': True  # Флаг травмы
-                })
+        matrix = self._get_team_stat_matrix(team_abbrev, games)
+        player_stats = matrix.player_games(player_name)
+
+        # Клик из таблицы статистики: OUT игроки - из текущего слейта, как в главном окне;
+        # команды в слейте нет - состав OUT неизвестен (None)
+        if team_injuries is None:
+            slate_team = self._find_slate_team(team_abbrev)
+            if slate_team is not None:
+                averages, games_played = matrix.averages(n=5)
+                team_injuries = [self._get_player_avg_stats(name, matrix, averages, games_played)
+                                 for name in self._team_out_players(slate_team)]
+
+        # Прогноз уже посчитан пакетным прогоном (и состав OUT не менялся) - показываем сразу
+        stored = get_projection(self._projection_slate(), player_name, team_injuries)
+        if stored:
+            print(f"[BATCH] Прогноз {player_name} из таблицы прогнозов ({stored['created_at']})")
+            self._show_player_projection_popup(player_name, player_position, team_abbrev, player_stats,
+                                               opponent_abbrev, stored['analysis'], stored['prompt'] or "")
+            return
 
         # Показываем окно загрузки
         self.player_loading_window = tk.Toplevel(self.root)
@@ -2318,6 +3057,11 @@ class LineupsGUI:
         self.player_loading_window.transient(self.root)
         self.player_loading_window.grab_set()
 
+        # Закрытие окна загрузки отменяет анализ
+        loading_window = self.player_loading_window
+        token = CancelToken()
+        loading_window.bind('<Destroy>', lambda e: token.cancel('window closed') if e.widget is loading_window else None)
+
         colors = TEAM_COLORS.get(team_abbrev, {'primary': '#9b59b6'})
 
         player_lbl = tk.Label(self.player_loading_window, text=player_name,
@@ -2340,12 +3084,9 @@ class LineupsGUI:
         opponent_stats = self.team_stats_cache.get(opponent_abbrev) if opponent_abbrev else None
 
         # Запускаем анализ в фоне
-        thread = threading.Thread(
-            target=self._run_player_analysis_thread,
-            args=(player_name, player_position, team_abbrev, player_stats, opponent_abbrev, opponent_stats, is_home, team_injuries, games),
-            daemon=True
-        )
-        thread.start()
+        self.pool.submit(self._run_player_analysis_thread, player_name, player_position, team_abbrev,
+                         player_stats, opponent_abbrev, opponent_stats, is_home, team_injuries, games, token,
+                         priority=PRIORITY_INTERACTIVE, key=f"player_ai:{team_abbrev}:{player_name}", token=token)
 
     def _animate_player_loading(self):
         """Анимация загрузки для анализа игрока."""
@@ -2356,8 +3097,23 @@ class LineupsGUI:
             self.root.after(400, self._animate_player_loading)
 
     def _run_player_analysis_thread(self, player_name, player_position, team_abbrev, player_stats,
-                                    opponent_abbrev, opponent_stats, is_home, team_injuries=None, team_games=None):
+                                    opponent_abbrev, opponent_stats, is_home, team_injuries=None, team_games=None,
+                                    token=None):
         """Фоновый AI анализ игрока."""
+        # Потоковый режим: окно прогноза открывается с первым фрагментом ответа
+        stream_view = {}
+
+        def on_text(text):
+            if not stream_view:
+                if token is not None and token.cancelled:
+                    return
+                self._detach_player_loading_cancel()
+                stream_view.update(self._show_player_projection_popup(
+                    player_name, player_position, team_abbrev, player_stats, opponent_abbrev, ""))
+            self._append_stream_text(stream_view['text'], text)
+
+        stream = TextStream(self.ui, on_text) if AI_STREAMING_ENABLED else None
+
         try:
             # team_injuries теперь содержит dict с статистикой {name, avg_pts, avg_min, games_played}
             injuries_with_stats = []
@@ -2383,32 +3139,122 @@ class LineupsGUI:
                 opponent_stats=opponent_stats,
                 is_home=is_home if is_home is not None else True,
                 team_injuries=injuries_with_stats,
-                team_games=team_games
+                team_games=team_games,
+                player_index=self._get_team_stat_matrix(team_abbrev, team_games).index if team_games else None,
+                team_analytics=self._get_team_analytics(team_abbrev, self.team_stats_cache.get(team_abbrev)),
+                on_delta=stream.feed if stream else None
             )
 
             # Распаковываем результат (analysis, prompt)
             analysis, ai_prompt = result if isinstance(result, tuple) else (result, "")
+            if token is not None and token.cancelled:
+                print(f"[DEBUG] Анализ {player_name} отменён: окно закрыто")
+                return
 
             # Отладка: проверяем что передаётся
             print(f"[DEBUG] AI prompt длина: {len(ai_prompt) if ai_prompt else 0} символов")
             print(f"[DEBUG] AI prompt пустой: {not bool(ai_prompt)}")
 
-            self.root.after(0, lambda: self._show_player_projection_popup(
-                player_name, player_position, team_abbrev, player_stats, opponent_abbrev, analysis, ai_prompt
+            # Сохраняем в таблицу прогнозов - повторный клик откроется мгновенно
+            # (без известного состава OUT не пишем - иначе затрём прогноз пакетного прогона)
+            if ai_prompt and team_injuries is not None:
+                try:
+                    save_projection(self._projection_slate(), {
+                        'player_name': player_name, 'player_position': player_position,
+                        'team_abbrev': team_abbrev, 'opponent_abbrev': opponent_abbrev,
+                        'team_injuries': injuries_with_stats,
+                    }, 'done', analysis, ai_prompt)
+                except Exception as e:
+                    print(f"[BATCH] Ошибка сохранения прогноза: {e}")
+
+            self.ui.post(lambda: self._finish_player_projection(
+                stream_view, player_name, player_position, team_abbrev, player_stats, opponent_abbrev,
+                analysis, ai_prompt
             ))
 
         except Exception as e:
             print(f"Ошибка AI анализа игрока: {e}")
-            self.root.after(0, lambda: self._close_player_loading())
+            error_msg = str(e)
+            self.ui.post(lambda: self._append_stream_error(stream_view, error_msg) or self._close_player_loading())
 
     def _close_player_loading(self):
         """Закрытие окна загрузки анализа игрока."""
         if hasattr(self, 'player_loading_window') and self.player_loading_window.winfo_exists():
             self.player_loading_window.destroy()
 
+    def _detach_player_loading_cancel(self):
+        """Ответ уже идёт в окно прогноза - закрытие окна загрузки больше не отменяет анализ."""
+        if hasattr(self, 'player_loading_window') and self.player_loading_window.winfo_exists():
+            self.player_loading_window.unbind('<Destroy>')
+
+    def _append_stream_text(self, text_widget, text):
+        """Дописать фрагмент потокового ответа AI в Text (окно могли закрыть)."""
+        if not text_widget.winfo_exists():
+            return
+        text_widget.config(state='normal')
+        text_widget.insert('end', text)
+        text_widget.config(state='disabled')
+        text_widget.see('end')
+
+    def _set_stream_text(self, text_widget, text):
+        """
+        Итоговый текст ответа: дописываем хвост к показанному потоком.
+
+        Текст, который не продолжает показанное (ошибка посреди потока),
+        дописывается после него - полученная часть ответа не теряется.
+        """
+        if not text_widget.winfo_exists():
+            return
+        shown = text_widget.get('1.0', 'end-1c')
+        text_widget.config(state='normal')
+        if text.startswith(shown):
+            text_widget.insert('end', text[len(shown):])
+        else:
+            text_widget.insert('end', f"\n\n{text}" if shown else text)
+        text_widget.config(state='disabled')
+        text_widget.see('end')
+
+    def _append_stream_error(self, stream_view, error_msg) -> bool:
+        """Ошибка после первого фрагмента - в открытое потоком окно. False - окна ещё нет."""
+        if not stream_view:
+            return False
+        self._set_stream_text(stream_view['text'], f"Ошибка AI анализа: {error_msg}")
+        return True
+
+    def _finish_player_projection(self, stream_view, player_name, player_position, team_abbrev, player_stats,
+                                  opponent_abbrev, analysis, ai_prompt):
+        """Итог анализа игрока: окно, открытое потоком, дополняется (сравнение с линиями, промпт)."""
+        if not stream_view:
+            self._show_player_projection_popup(player_name, player_position, team_abbrev, player_stats,
+                                               opponent_abbrev, analysis, ai_prompt)
+            return
+        if not stream_view['popup'].winfo_exists():
+            return
+        self._set_stream_text(stream_view['text'], analysis)
+        self.last_ai_prompt = ai_prompt
+        if ai_prompt:
+            self._add_prompt_button(stream_view['buttons'], ai_prompt, player_name, before=stream_view['close'])
+
+    def _add_prompt_button(self, buttons_frame, ai_prompt, player_name, before=None):
+        """Кнопка показа промпта в окне прогноза."""
+        show_prompt_btn = tk.Button(buttons_frame, text="Show AI Prompt",
+                                   command=lambda: self._show_ai_prompt_window(ai_prompt, player_name),
+                                   bg='#2c3e50', fg='white',
+                                   font=('Arial', 9),
+                                   relief='flat', padx=15, pady=6)
+        if before is not None:
+            show_prompt_btn.pack(side='left', padx=5, before=before)
+        else:
+            show_prompt_btn.pack(side='left', padx=5)
+
     def _show_player_projection_popup(self, player_name, player_position, team_abbrev, player_stats,
                                       opponent_abbrev, analysis, ai_prompt=""):
-        """Показ popup с прогнозом по игроку."""
+        """
+        Показ popup с прогнозом по игроку.
+
+        Returns:
+            {'popup', 'text', 'buttons', 'close'} - для дописывания потокового ответа
+        """
         self._close_player_loading()
 
         # Отладка
@@ -2479,12 +3325,7 @@ class LineupsGUI:
 
         # Кнопка показа промпта
         if ai_prompt:
-            show_prompt_btn = tk.Button(buttons_frame, text="Show AI Prompt",
-                                       command=lambda: self._show_ai_prompt_window(ai_prompt, player_name),
-                                       bg='#2c3e50', fg='white',
-                                       font=('Arial', 9),
-                                       relief='flat', padx=15, pady=6)
-            show_prompt_btn.pack(side='left', padx=5)
+            self._add_prompt_button(buttons_frame, ai_prompt, player_name)
 
         # Кнопка закрытия
         close_btn = tk.Button(buttons_frame, text="Close",
@@ -2494,6 +3335,8 @@ class LineupsGUI:
                              relief='flat', padx=30, pady=8)
         close_btn.pack(side='left', padx=5)
 
+        return {'popup': popup, 'text': text_widget, 'buttons': buttons_frame, 'close': close_btn}
+
     def _show_ai_prompt_window(self, prompt_text, player_name):
         """Показ окна с AI промптом для отладки."""
         prompt_window = tk.Toplevel(self.root)
@@ -2640,13 +3483,9 @@ class LineupsGUI:
 
         self.status_label.config(text=f"AI analyzing {team_abbrev}...", fg='#9b59b6')
 
-        # Запускаем в фоне
-        thread = threading.Thread(
-            target=self._run_ai_analysis_thread,
-            args=(team_abbrev,),
-            daemon=True
-        )
-        thread.start()
+        # Запускаем в фоне (если авто-анализ этой команды ещё в очереди - он повысится до interactive)
+        self.pool.submit(self._run_ai_analysis_thread, team_abbrev,
+                         priority=PRIORITY_INTERACTIVE, key=f"change_ai:{team_abbrev}")
 
     def _animate_loading(self):
         """Анимация точек загрузки."""
@@ -2656,17 +3495,23 @@ class LineupsGUI:
             self.loading_label.config(text=f"AI анализирует{dots}")
             self.root.after(400, self._animate_loading)
 
-    def _run_ai_analysis_thread(self, team_abbrev):
-        """Фоновый AI анализ."""
+    def _run_ai_analysis_thread(self, team_abbrev, trace=None):
+        """Фоновый AI анализ (trace - метки задержки, если анализ вызван изменением)."""
+        # Потоковый режим: окно анализа открывается с первым фрагментом ответа
+        stream_view = {}
         try:
             # Получаем данные о прошлой игре
+            self.refresh_schedule()
             historical = self.historical_cache.get(team_abbrev)
-            if not historical:
-                # Загружаем если нет в кэше
-                historical = get_team_last_game_starters_nba_api(team_abbrev, '2025-26')
-                if historical:
-                    historical['cached_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    self.historical_cache[team_abbrev] = historical
+            if not historical or not self.is_historical_cache_valid(team_abbrev):
+                # Загружаем если нет в кэше или команда сыграла новую игру
+                fresh = get_team_last_game_starters_nba_api(team_abbrev, '2025-26')
+                if fresh:
+                    historical = fresh
+                    self._store_historical(team_abbrev, historical)
+                elif historical:
+                    # API недоступен - сравниваем со старыми данными
+                    record_stale('historical', age_since(historical.get('cached_at')))
 
             # Получаем текущий состав
             current_starters = []
@@ -2693,35 +3538,54 @@ class LineupsGUI:
             # Получаем статистику команды
             team_stats = self.team_stats_cache.get(team_abbrev)
 
-            # Запускаем AI анализ
-            analysis = analyze_lineup_changes(team_abbrev, changes, team_stats)
+            def on_text(text):
+                if not stream_view:
+                    self._close_loading_window()
+                    stream_view['text'] = self._show_ai_analysis_popup(team_abbrev, changes, "", historical)
+                self._append_stream_text(stream_view['text'], text)
+
+            stream = TextStream(self.ui, on_text) if AI_STREAMING_ENABLED else None
+
+            # Запускаем AI анализ; в задержку ai_done идёт только ответ модели -
+            # ошибки не отмечаются, ответ из кэша помечается отдельно (ai_cached)
+            def on_complete(source):
+                mark(trace, 'ai_done' if source == 'api' else 'ai_cached')
+
+            analysis = analyze_lineup_changes(team_abbrev, changes, team_stats,
+                                              on_delta=stream.feed if stream else None,
+                                              on_complete=on_complete)
 
             # Закрываем окно загрузки и показываем результат
-            self.root.after(0, lambda: self._close_loading_and_show_result(team_abbrev, changes, analysis, historical))
+            self.ui.post(lambda: self._close_loading_and_show_result(team_abbrev, changes, analysis, historical,
+                                                                     stream_view))
 
         except Exception as e:
             print(f"Ошибка AI анализа: {e}")
-            self.root.after(0, lambda: self._close_loading_window())
-            self.root.after(0, lambda: self.status_label.config(
-                text=f"AI Error: {e}", fg='#ff6b6b'
-            ))
+            error_msg = str(e)
+            self.ui.post(lambda: self._append_stream_error(stream_view, error_msg) or self._close_loading_window())
+            self.ui.post(lambda: self.status_label.config(
+                text=f"AI Error: {error_msg}", fg='#ff6b6b'
+            ), key='status')
 
-        self.root.after(0, lambda: self.status_label.config(
+        self.ui.post(lambda: self.status_label.config(
             text=f"{len(self.games)} games today", fg='#a0a0a0'
-        ))
+        ), key='status')
 
     def _close_loading_window(self):
         """Закрытие окна загрузки."""
         if hasattr(self, 'loading_window') and self.loading_window.winfo_exists():
             self.loading_window.destroy()
 
-    def _close_loading_and_show_result(self, team_abbrev, changes, analysis, historical):
-        """Закрытие окна загрузки и показ результата."""
+    def _close_loading_and_show_result(self, team_abbrev, changes, analysis, historical, stream_view=None):
+        """Закрытие окна загрузки и показ результата (окно, открытое потоком, - итоговый текст)."""
+        if stream_view:
+            self._set_stream_text(stream_view['text'], analysis)
+            return
         self._close_loading_window()
         self._show_ai_analysis_popup(team_abbrev, changes, analysis, historical)
 
     def _show_ai_analysis_popup(self, team_abbrev, changes, analysis, historical):
-        """Показ popup окна с AI анализом."""
+        """Показ popup окна с AI анализом. Returns: Text с анализом."""
         colors = TEAM_COLORS.get(team_abbrev, {'primary': '#333333', 'secondary': '#666666'})
 
         popup = tk.Toplevel(self.root)
@@ -2800,25 +3664,25 @@ class LineupsGUI:
                              font=('Arial', 11, 'bold'),
                              relief='flat', padx=30, pady=8)
         close_btn.pack(pady=15)
+        return analysis_text
 
     def auto_ai_analysis_on_change(self, changes):
         """Автоматический AI анализ при обнаружении изменений в составе."""
         if not self.ai_enabled:
             return
 
-        # Группируем изменения по командам
+        # Группируем изменения по командам (правки заметок о травмах не анализируем)
         teams_changed = set()
         for change in changes:
-            teams_changed.add(change['team'])
+            if change.get('severity') != 'low' and not change.get('simulated'):
+                teams_changed.add(change['team'])
 
-        # Запускаем анализ для каждой команды с изменениями
+        # Запускаем анализ для каждой команды с изменениями - ниже проверки
+        # составов: долгие AI запросы не должны задерживать следующий опрос
+        trace = self._change_trace(changes)
         for team_abbrev in teams_changed:
-            thread = threading.Thread(
-                target=self._run_ai_analysis_thread,
-                args=(team_abbrev,),
-                daemon=True
-            )
-            thread.start()
+            self.pool.submit(self._run_ai_analysis_thread, team_abbrev, trace,
+                             priority=PRIORITY_PRELOAD, key=f"change_ai:{team_abbrev}")
 
     def show_news_window(self):
         """Показ окна с новостями NBA."""
@@ -2872,28 +3736,19 @@ class LineupsGUI:
                            relief='flat', padx=8, pady=3)
             btn.pack(side='left', padx=3)
 
-        # Скроллируемый фрейм для новостей
+        # Скроллируемый список новостей (виджеты только для видимых карточек)
         container = tk.Frame(news_window, bg='#1a1a2e')
         container.pack(fill='both', expand=True, padx=10, pady=10)
 
-        canvas = tk.Canvas(container, bg='#1a1a2e', highlightthickness=0)
-        scrollbar = ttk.Scrollbar(container, orient='vertical', command=canvas.yview)
-
-        self.news_scrollable_frame = tk.Frame(canvas, bg='#1a1a2e')
-        self.news_scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=self.news_scrollable_frame, anchor='nw')
-        canvas.configure(yscrollcommand=scrollbar.set)
+        self.news_list = VirtualList(container, self._create_news_card,
+                                     update_row=self._update_news_card,
+                                     key=self._news_key, estimated_height=110)
+        self.news_list.pack(fill='both', expand=True)
+        canvas = self.news_list.canvas
 
         # Mouse wheel
         canvas.bind_all("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1*(e.delta/120)), "units"))
 
-        scrollbar.pack(side='right', fill='y')
-        canvas.pack(side='left', fill='both', expand=True)
-
         self.news_canvas = canvas
 
         # Загружаем новости
@@ -2904,46 +3759,78 @@ class LineupsGUI:
         self.news_filter_var.set(team_abbrev)
         self._load_news_to_frame(team_abbrev)
 
-    def _load_news_to_frame(self, team_filter):
-        """Загрузка новостей в окно."""
-        # Очищаем фрейм
-        for widget in self.news_scrollable_frame.winfo_children():
-            widget.destroy()
+    def _load_news_to_frame(self, team_filter, keep_position=False):
+        """
+        Загрузка новостей в окно.
 
+        Args:
+            team_filter: Аббревиатура команды или "All"
+            keep_position: Сохранить прокрутку (обновление того же списка)
+        """
         # Получаем новости
         try:
             if team_filter == "All":
-                news_list = get_latest_news(30)
+                news_list = get_latest_news(NEWS_WINDOW_LIMIT)
             else:
-                news_list = get_news_by_team(team_filter, 30)
+                news_list = get_news_by_team(team_filter, NEWS_WINDOW_LIMIT)
         except Exception as e:
-            error_label = tk.Label(self.news_scrollable_frame,
-                                  text=f"Error loading news: {e}",
-                                  font=('Arial', 12), fg='#ff6b6b', bg='#1a1a2e')
-            error_label.pack(pady=20)
+            self.news_list.show_message(f"Error loading news: {e}", fg='#ff6b6b')
             return
 
         if not news_list:
-            no_news = tk.Label(self.news_scrollable_frame,
-                              text="No news found.\n\nClick 'Update News' to fetch latest news.",
-                              font=('Arial', 12), fg='#a0a0a0', bg='#1a1a2e')
-            no_news.pack(pady=50)
+            self.news_list.show_message("No news found.\n\nClick 'Update News' to fetch latest news.")
             return
 
         # Отображаем новости
-        for news in news_list:
-            self._create_news_card(news)
+        self.news_list.set_items(self._unique_news(news_list), keep_position=keep_position)
 
-    def _create_news_card(self, news):
+    def _create_news_card(self, parent, news):
         """Создание карточки новости."""
-        card = tk.Frame(self.news_scrollable_frame, bg='#16213e', cursor='hand2')
-        card.pack(fill='x', padx=5, pady=5)
+        card = tk.Frame(parent, bg='#16213e', cursor='hand2')
 
         # Левая часть: метаданные
-        meta_frame = tk.Frame(card, bg='#16213e')
-        meta_frame.pack(fill='x', padx=10, pady=8)
+        card.meta_frame = tk.Frame(card, bg='#16213e')
+        card.meta_frame.pack(fill='x', padx=10, pady=8)
 
         # Дата
+        card.date_label = tk.Label(card.meta_frame, font=('Arial', 9), fg='#888888', bg='#16213e')
+        card.date_label.pack(side='left')
+
+        # Команды (теги, максимум 3)
+        card.tags = [tk.Label(card.meta_frame, font=('Arial', 8, 'bold'), fg='white', padx=5, pady=1)
+                     for _ in range(3)]
+
+        # Автор
+        card.author_label = tk.Label(card.meta_frame, font=('Arial', 9), fg='#666666', bg='#16213e')
+
+        # Заголовок
+        card.title_label = tk.Label(card, font=('Arial', 12, 'bold'), fg='white', bg='#16213e',
+                                    wraplength=800, justify='left', anchor='w', cursor='hand2')
+        card.title_label.pack(fill='x', padx=10, pady=(0, 5))
+
+        # Краткое содержание
+        card.content_label = tk.Label(card, font=('Arial', 10), fg='#a0a0a0', bg='#16213e',
+                                      wraplength=800, justify='left', anchor='w')
+
+        # Клик открывает новость в браузере (url текущей новости карточки)
+        for widget in (card, card.title_label):
+            widget.bind('<Button-1>', lambda e, c=card: self._open_news_url(c))
+
+        # Подсветка при наведении
+        def set_bg(color):
+            for widget in (card, card.meta_frame, card.date_label, card.author_label,
+                           card.title_label, card.content_label):
+                widget.config(bg=color)
+
+        card.set_bg = set_bg
+        card.bind('<Enter>', lambda e: set_bg('#1e3a5f') if card.news_url else None)
+        card.bind('<Leave>', lambda e: set_bg('#16213e'))
+
+        self._update_news_card(card, news)
+        return card
+
+    def _update_news_card(self, card, news, same_key=False):
+        """Заполнение карточки окна новостей данными новости."""
         published = news.get('published_at', '')
         if published:
             try:
@@ -2953,83 +3840,38 @@ class LineupsGUI:
                 date_str = str(published)[:16]
         else:
             date_str = "N/A"
+        card.date_label.config(text=date_str)
 
-        date_label = tk.Label(meta_frame, text=date_str,
-                             font=('Arial', 9), fg='#888888', bg='#16213e')
-        date_label.pack(side='left')
-
-        # Команды (теги)
-        teams_str = news.get('teams', '')
-        if teams_str:
-            teams = teams_str.split(',')
-            for team in teams[:3]:  # Максимум 3 тега
-                team = team.strip()
-                color = TEAM_COLORS.get(team, {}).get('primary', '#555555')
-                team_tag = tk.Label(meta_frame, text=team,
-                                   font=('Arial', 8, 'bold'), fg='white', bg=color,
-                                   padx=5, pady=1)
-                team_tag.pack(side='left', padx=3)
+        teams = [team.strip() for team in news.get('teams', '').split(',') if team.strip()][:3]
+        for i, tag in enumerate(card.tags):
+            if i < len(teams):
+                tag.config(text=teams[i], bg=TEAM_COLORS.get(teams[i], {}).get('primary', '#555555'))
+                tag.pack(side='left', padx=3)
+            else:
+                tag.pack_forget()
 
-        # Автор
         author = news.get('author', '')
+        card.author_label.config(text=f"• {author}")
         if author:
-            author_label = tk.Label(meta_frame, text=f"• {author}",
-                                   font=('Arial', 9), fg='#666666', bg='#16213e')
-            author_label.pack(side='right')
+            card.author_label.pack(side='right')
+        else:
+            card.author_label.pack_forget()
 
-        # Заголовок
-        title = news.get('title', 'No title')
-        title_label = tk.Label(card, text=title,
-                              font=('Arial', 12, 'bold'), fg='white', bg='#16213e',
-                              wraplength=800, justify='left', anchor='w', cursor='hand2')
-        title_label.pack(fill='x', padx=10, pady=(0, 5))
+        card.title_label.config(text=news.get('title', 'No title'))
 
         # Краткое содержание (первые 200 символов)
         content = news.get('content', '')
         if content and len(content) > 200:
             content = content[:200] + "..."
-
+        card.content_label.config(text=content)
         if content:
-            content_label = tk.Label(card, text=content,
-                                    font=('Arial', 10), fg='#a0a0a0', bg='#16213e',
-                                    wraplength=800, justify='left', anchor='w')
-            content_label.pack(fill='x', padx=10, pady=(0, 8))
-
-        # Клик открывает новость в браузере
-        url = news.get('url', '')
-        if url:
-            for widget in [card, title_label]:
-                widget.bind('<Button-1>', lambda e, u=url: webbrowser.open(u))
-
-            # Подсветка при наведении
-            def on_enter(e):
-                card.config(bg='#1e3a5f')
-                meta_frame.config(bg='#1e3a5f')
-                for child in meta_frame.winfo_children():
-                    if 'tag' not in str(child):
-                        try:
-                            child.config(bg='#1e3a5f')
-                        except:
-                            pass
-                title_label.config(bg='#1e3a5f')
-                if content:
-                    content_label.config(bg='#1e3a5f')
-
-            def on_leave(e):
-                card.config(bg='#16213e')
-                meta_frame.config(bg='#16213e')
-                for child in meta_frame.winfo_children():
-                    if 'tag' not in str(child):
-                        try:
-                            child.config(bg='#16213e')
-                        except:
-                            pass
-                title_label.config(bg='#16213e')
-                if content:
-                    content_label.config(bg='#16213e')
+            card.content_label.pack(fill='x', padx=10, pady=(0, 8))
+        else:
+            card.content_label.pack_forget()
 
-            card.bind('<Enter>', on_enter)
-            card.bind('<Leave>', on_leave)
+        card.news_url = news.get('url', '')
+        card.set_bg('#16213e')
+        return True
 
     def _refresh_news_in_window(self, window):
         """Обновление новостей в окне."""
@@ -3045,20 +3887,19 @@ class LineupsGUI:
                 init_database()
                 scrape_news(days=3, max_pages=5)
                 # Обновляем отображение
-                self.root.after(0, lambda: self._on_news_updated(window, loading_label))
+                self.ui.post(lambda: self._on_news_updated(window, loading_label) if window.winfo_exists() else None)
             except Exception as e:
                 print(f"Error fetching news: {e}")
-                self.root.after(0, lambda: loading_label.config(text=f"Error: {e}", fg='#ff6b6b'))
+                self.ui.post(lambda: loading_label.config(text=f"Error: {e}", fg='#ff6b6b'))
 
-        thread = threading.Thread(target=fetch_news, daemon=True)
-        thread.start()
+        self.pool.submit(fetch_news, priority=PRIORITY_NEWS, key='news_window_refresh')
 
     def _on_news_updated(self, window, loading_label):
         """Callback после обновления новостей."""
         loading_label.destroy()
         current_filter = getattr(self, 'news_filter_var', None)
         filter_value = current_filter.get() if current_filter else "All"
-        self._load_news_to_frame(filter_value)
+        self._load_news_to_frame(filter_value, keep_position=True)
 
     def update_news_in_background(self):
         """Фоновое обновление новостей при старте приложения."""
@@ -3071,8 +3912,7 @@ class LineupsGUI:
             except Exception as e:
                 print(f"Ошибка фонового обновления новостей: {e}")
 
-        thread = threading.Thread(target=fetch, daemon=True)
-        thread.start()
+        self.pool.submit(fetch, priority=PRIORITY_NEWS, key='news_background')
 
 
 def main():
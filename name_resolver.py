@@ -0,0 +1,388 @@
+"""
+Name Resolver - единый справочник имён игроков для всех источников.
+
+Имена приходят в четырёх вариантах: сокращения RotoWire ("S. Gilgeous-Alexander"),
+полные имена nba_api, русские варианты player_mapping.PLAYER_NAMES (новости)
+и betting_odds.RUSSIAN_TO_ENGLISH_PLAYERS (коэффициенты). Вместо отдельной
+строковой логики в каждом модуле:
+
+- у каждого игрока канонический id: 'nba:<personId>', если он известен
+  из boxscore, иначе 'name:<нормализованное английское имя>';
+- псевдонимы (любой вариант написания -> id) запоминаются по мере
+  появления в составах, boxscore и коэффициентах и хранятся в SQLite;
+- поиск - обращение к dict в памяти; сокращение, которого ещё нет в
+  справочнике, разрешается по (фамилия, первая буква) один раз и
+  запоминается как псевдоним.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from player_index import AMBIGUOUS_SURNAMES, get_first_letter, get_first_name, get_last_name
+
+DB_FILE = Path(__file__).parent / "player_aliases.db"
+
+# Источники псевдонимов
+SOURCE_NBA_API = 'nba_api'
+SOURCE_ROTOWIRE = 'rotowire'
+SOURCE_NEWS_RU = 'news_ru'
+SOURCE_ODDS = 'odds'
+
+_NAME_SUFFIXES = (" jr.", " jr", " iii", " ii", " sr.", " sr")
+
+
+def alias_key(name: str) -> str:
+    """Ключ псевдонима: регистр, точки, суффиксы и лишние пробелы не важны."""
+    if not name:
+        return ""
+    key = f" {name.strip().lower().replace('ё', 'е')} "
+    for suffix in _NAME_SUFFIXES:
+        key = key.replace(f"{suffix} ", " ")
+    return " ".join(key.replace('.', ' ').split())
+
+
+def _is_abbreviated(name: str) -> bool:
+    """'S. Gilgeous-Alexander' - имя сокращено до буквы."""
+    return len(get_first_name(name)) <= 1 and len(name.split()) >= 2
+
+
+def _is_latin(name: str) -> bool:
+    return all(ord(ch) < 128 for ch in name)
+
+
+def init_db():
+    """Инициализация базы данных."""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS players (
+            player_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            nba_id INTEGER,
+            created_at TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_aliases (
+            alias_key TEXT PRIMARY KEY,
+            alias TEXT NOT NULL,
+            player_id TEXT NOT NULL,
+            source TEXT NOT NULL,
+            seen_at TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_aliases_player ON player_aliases(player_id)
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
+class NameResolver:
+    """Справочник игроков: псевдонимы в памяти + запись новых в SQLite."""
+
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file) if db_file else DB_FILE
+        self._lock = threading.RLock()
+        self._aliases = {}    # alias_key -> player_id
+        self._names = {}      # player_id -> каноническое (английское) имя
+        self._by_player = {}  # player_id -> [(псевдоним, источник)]
+        self._by_initial = {}  # (фамилия, первая буква) -> [player_id] - для сокращений
+        self._misses = set()  # Ключи, которые уже не удалось разрешить
+        self.stats = {'hits': 0, 'learned': 0, 'misses': 0}
+        self._load()
+
+    # ===== Загрузка и запись =====
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file)
+
+    def _load(self):
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT player_id, name FROM players')
+            for player_id, name in cursor.fetchall():
+                self._add_player(player_id, name)
+            cursor.execute('SELECT alias_key, alias, player_id, source FROM player_aliases')
+            for key, alias, player_id, source in cursor.fetchall():
+                if player_id in self._names and not self._stale_abbreviation(alias):
+                    self._add_alias(key, alias, player_id, source)
+            conn.close()
+            print(f"[NAMES] Загружено {len(self._names)} игроков, {len(self._aliases)} псевдонимов")
+        except sqlite3.Error as e:
+            print(f"[NAMES] Ошибка загрузки справочника имён: {e}")
+
+    def _write(self, players=(), aliases=(), nba_ids=()):
+        """Запись новых игроков/псевдонимов одной транзакцией."""
+        if not players and not aliases and not nba_ids:
+            return
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.executemany('INSERT OR IGNORE INTO players (player_id, name, nba_id, created_at) VALUES (?, ?, ?, ?)',
+                               [(player_id, name, nba_id, now) for player_id, name, nba_id in players])
+            cursor.executemany('UPDATE players SET name = ? WHERE player_id = ?',
+                               [(name, player_id) for player_id, name, _ in players])
+            cursor.executemany('UPDATE players SET nba_id = ? WHERE player_id = ? AND nba_id IS NULL',
+                               [(nba_id, player_id) for player_id, nba_id in nba_ids])
+            cursor.executemany('INSERT OR REPLACE INTO player_aliases (alias_key, alias, player_id, source, seen_at) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               [(key, alias, player_id, source, now) for key, alias, player_id, source in aliases])
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"[NAMES] Ошибка записи справочника имён: {e}")
+
+    # ===== Индексы в памяти =====
+
+    def _add_player(self, player_id, name):
+        old_name = self._names.get(player_id)
+        self._names[player_id] = name
+        if old_name is None or _is_abbreviated(old_name):
+            initial = (get_last_name(name), get_first_letter(name))
+            ids = self._by_initial.setdefault(initial, [])
+            if player_id not in ids:
+                ids.append(player_id)
+                if len(ids) == 2:
+                    self._forget_abbreviations(ids)
+            # Имена с этой фамилией и буквой, не найденные раньше, могут найтись теперь
+            self._misses = {key for key in self._misses
+                            if (get_last_name(key), get_first_letter(key)) != initial}
+
+    def _stale_abbreviation(self, alias):
+        """Сокращение, которое теперь подходит нескольким игрокам (J. Williams: Jalen и Jaylin)."""
+        if not _is_latin(alias) or not _is_abbreviated(alias):
+            return False
+        return len(self._by_initial.get((get_last_name(alias), get_first_letter(alias)), [])) > 1
+
+    def _forget_abbreviations(self, player_ids):
+        """Убрать из памяти сокращения, выведенные, пока игрок с такой фамилией и буквой был один."""
+        for player_id in player_ids:
+            kept = []
+            for alias, source in self._by_player.get(player_id, []):
+                if self._stale_abbreviation(alias):
+                    self._aliases.pop(alias_key(alias), None)
+                else:
+                    kept.append((alias, source))
+            self._by_player[player_id] = kept
+
+    def _add_alias(self, key, alias, player_id, source):
+        self._aliases[key] = player_id
+        self._by_player.setdefault(player_id, []).append((alias, source))
+        self._misses.discard(key)
+
+    def _match_initial(self, name):
+        """Игрок по (фамилия, первая буква) с правилами AMBIGUOUS_SURNAMES, как names_match."""
+        last = get_last_name(name)
+        candidates = self._by_initial.get((last, get_first_letter(name)), [])
+        if not candidates:
+            return None
+        first = get_first_name(name)
+        if last in AMBIGUOUS_SURNAMES:
+            for player_id in candidates:
+                known_first = get_first_name(self._names[player_id])
+                if len(first) > 1 and len(known_first) > 1:
+                    if first == known_first:
+                        return player_id
+                elif first.startswith(known_first) or known_first.startswith(first):
+                    return player_id
+            return None
+        # Полное имя, а в справочнике другое полное - это другой игрок
+        if len(first) > 1:
+            abbreviated = []
+            for player_id in candidates:
+                known_first = get_first_name(self._names[player_id])
+                if known_first == first:
+                    return player_id
+                if len(known_first) <= 1:
+                    abbreviated.append(player_id)
+            return abbreviated[0] if len(abbreviated) == 1 else None
+        # Сокращение: справочник общий для всей лиги - угадывать между несколькими игроками нельзя
+        return candidates[0] if len(candidates) == 1 else None
+
+    # ===== Поиск =====
+
+    def resolve(self, name):
+        """Id игрока по имени из любого источника или None."""
+        key = alias_key(name)
+        if not key:
+            return None
+        player_id = self._aliases.get(key)
+        if player_id is not None:
+            self.stats['hits'] += 1
+            return player_id
+        if key in self._misses:
+            self.stats['misses'] += 1
+            return None
+
+        with self._lock:
+            player_id = self._match_initial(name) if _is_latin(name) else None
+            if player_id is None:
+                self._misses.add(key)
+                self.stats['misses'] += 1
+                return None
+            # Запоминаем - в следующий раз прямое попадание
+            source = SOURCE_ROTOWIRE if _is_abbreviated(name) else SOURCE_NBA_API
+            self._add_alias(key, name, player_id, source)
+            self._write(aliases=[(key, name, player_id, source)])
+            self.stats['learned'] += 1
+            return player_id
+
+    def canonical_name(self, name, default=None):
+        """Английское имя игрока (как в nba_api) или default."""
+        player_id = self.resolve(name)
+        if player_id is None:
+            return default
+        return self._names[player_id]
+
+    def aliases(self, name, sources=None) -> list:
+        """Все известные написания игрока (опционально - только из источников sources)."""
+        player_id = self.resolve(name)
+        if player_id is None:
+            return []
+        return [alias for alias, alias_source in self._by_player.get(player_id, [])
+                if sources is None or alias_source in sources]
+
+    # ===== Обучение =====
+
+    def learn_many(self, entries, source):
+        """
+        Запомнить имена из источника (одна транзакция на пачку).
+
+        Args:
+            entries: Имена или (имя, nba personId / None, каноническое английское имя / None)
+            source: SOURCE_NBA_API / SOURCE_ROTOWIRE / SOURCE_NEWS_RU / SOURCE_ODDS
+
+        Returns:
+            Число новых псевдонимов
+        """
+        new_players, new_aliases, nba_ids = [], [], []
+        with self._lock:
+            for entry in entries:
+                name, nba_id, canonical = (entry, None, None) if isinstance(entry, str) else entry
+                key = alias_key(name)
+                if not key:
+                    continue
+                nba_key = f"nba:{nba_id}" if nba_id else None
+
+                player_id = self._aliases.get(key)
+                if player_id is None and nba_key and nba_key in self._names:
+                    player_id = nba_key
+                if player_id is None and canonical:
+                    # Русский вариант / написание букмекера - к английскому имени
+                    player_id = self._aliases.get(alias_key(canonical))
+                    if player_id is None:
+                        player_id = self._new_player(canonical, None, new_players, new_aliases, source)
+                if player_id is None and _is_latin(name):
+                    player_id = self._match_initial(name)
+                if player_id is None:
+                    if not _is_latin(name):
+                        continue  # Русское имя без английского - не к кому привязать
+                    if _is_abbreviated(name) and (get_last_name(name), get_first_letter(name)) in self._by_initial:
+                        continue  # Сокращение подходит нескольким игрокам - не угадываем
+                    player_id = self._new_player(name, nba_id, new_players, new_aliases, source)
+                    if nba_id:
+                        nba_ids.append((player_id, nba_id))
+                    continue
+
+                # Полное имя для игрока, известного только по сокращению
+                if _is_latin(name) and not _is_abbreviated(name) and _is_abbreviated(self._names[player_id]):
+                    self._add_player(player_id, name)
+                    new_players.append((player_id, name, nba_id))
+                if nba_id:
+                    nba_ids.append((player_id, nba_id))
+                    if nba_key not in self._aliases:
+                        self._add_alias(nba_key, nba_key, player_id, SOURCE_NBA_API)
+                        new_aliases.append((nba_key, nba_key, player_id, SOURCE_NBA_API))
+                if key not in self._aliases:
+                    self._add_alias(key, name, player_id, source)
+                    new_aliases.append((key, name, player_id, source))
+
+            self._write(new_players, new_aliases, nba_ids)
+            self.stats['learned'] += len(new_aliases)
+        if new_aliases:
+            print(f"[NAMES] {source}: +{len(new_aliases)} псевдонимов")
+        return len(new_aliases)
+
+    def _new_player(self, name, nba_id, new_players, new_aliases, source):
+        player_id = f"nba:{nba_id}" if nba_id else f"name:{alias_key(name)}"
+        self._add_player(player_id, name)
+        new_players.append((player_id, name, nba_id))
+        key = alias_key(name)
+        self._add_alias(key, name, player_id, source)
+        new_aliases.append((key, name, player_id, source))
+        if nba_id:
+            self._add_alias(player_id, player_id, player_id, SOURCE_NBA_API)
+            new_aliases.append((player_id, player_id, player_id, SOURCE_NBA_API))
+        return player_id
+
+    def get_stats(self) -> dict:
+        return dict(self.stats, players=len(self._names), aliases=len(self._aliases))
+
+    def get_stats_report(self) -> str:
+        stats = self.get_stats()
+        return (f"Player names: {stats['players']} players, {stats['aliases']} aliases, "
+                f"hits {stats['hits']}, learned {stats['learned']}, misses {stats['misses']}")
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> NameResolver:
+    """Общий справочник (создаётся при первом обращении, с начальными словарями)."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                init_db()
+                resolver = NameResolver()
+                _seed_static_maps(resolver)
+                _resolver = resolver
+    return _resolver
+
+
+def _seed_static_maps(resolver):
+    """Русские варианты из player_mapping и betting_odds как псевдонимы (импорт здесь - модули сами используют справочник)."""
+    try:
+        from player_mapping import PLAYER_NAMES
+        resolver.learn_many([(english, None, None) for english in PLAYER_NAMES], SOURCE_NBA_API)
+        resolver.learn_many([(russian, None, english)
+                             for english, variants in PLAYER_NAMES.items() for russian in variants
+                             if len(russian.split()) >= 2], SOURCE_NEWS_RU)
+    except ImportError:
+        pass
+    try:
+        from betting_odds import RUSSIAN_TO_ENGLISH_PLAYERS
+        resolver.learn_many([(russian, None, english) for russian, english in RUSSIAN_TO_ENGLISH_PLAYERS.items()],
+                            SOURCE_ODDS)
+    except ImportError:
+        pass
+
+
+def learn_from_games(games: list) -> int:
+    """Имена из слейта RotoWire (составы и травмы)."""
+    names = []
+    for game in games:
+        for team_type in ('away_team', 'home_team'):
+            team = game.get(team_type, {})
+            names.extend(p.get('name') for p in team.get('lineup', []) if p.get('name'))
+    return get_resolver().learn_many(names, SOURCE_ROTOWIRE)
+
+
+def learn_from_team_games(team_games: list) -> int:
+    """Имена и personId из boxscore (статистика команды)."""
+    entries = []
+    for game in team_games:
+        for player in game.get('all_players', game.get('starters', [])):
+            if player.get('name'):
+                entries.append((player['name'], player.get('player_id'), None))
+    return get_resolver().learn_many(entries, SOURCE_NBA_API)
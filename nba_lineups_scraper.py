@@ -9,9 +9,12 @@ import pandas as pd
 from datetime import datetime
 import json
 import re
+import time
+import threading
 import urllib3
 import os
 from dotenv import load_dotenv
+from cache_metrics import record_hit, record_miss, set_cache_file_size
 
 # Загружаем переменные окружения из .env
 load_dotenv()
@@ -47,19 +50,23 @@ HEADERS = {
 }
 
 
-def fetch_page(url: str) -> BeautifulSoup:
-    """Загрузка и парсинг страницы."""
+def fetch_page_with_meta(url: str) -> tuple:
+    """
+    Загрузка страницы вместе с метаданными ответа.
+
+    Returns:
+        (BeautifulSoup, meta) - meta: {'fetched_at', 'last_modified', 'date'}
+        (время ответа и HTTP-заголовки об обновлении страницы, если есть)
+    """
     try:
         # Добавляем timeout, verify=False и прокси если доступен
         response = requests.get(url, headers=HEADERS, timeout=30, verify=False, proxies=PROXIES)
         response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
     except requests.exceptions.SSLError as e:
         print(f"SSL Error при подключении к {url}: {e}")
         # Пробуем еще раз без проверки сертификата
         response = requests.get(url, headers=HEADERS, timeout=30, verify=False, proxies=PROXIES)
         response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
     except requests.exceptions.ConnectionError as e:
         print(f"Connection Error при подключении к {url}: {e}")
         raise Exception(f"Не удалось подключиться к {url}. Проверьте интернет-соединение или настройки прокси.")
@@ -67,6 +74,18 @@ def fetch_page(url: str) -> BeautifulSoup:
         print(f"Error при загрузке {url}: {e}")
         raise
 
+    meta = {
+        'fetched_at': time.time(),
+        'last_modified': response.headers.get('Last-Modified'),
+        'date': response.headers.get('Date'),
+    }
+    return BeautifulSoup(response.text, 'html.parser'), meta
+
+
+def fetch_page(url: str) -> BeautifulSoup:
+    """Загрузка и парсинг страницы."""
+    return fetch_page_with_meta(url)[0]
+
 
 def parse_lineups(soup: BeautifulSoup) -> list:
     """
@@ -371,6 +390,162 @@ def print_lineups(games: list):
 
 # ===== NBA API для исторических данных =====
 
+# Файл кэша boxscore завершённых игр (boxscore сыгранной игры не меняется)
+BOXSCORE_CACHE_FILE = "boxscore_cache.json"  # Сохраняем в текущую директорию
+
+# Колонки BoxScoreTraditionalV3, которые нужны для статистики
+BOXSCORE_COLUMNS = [
+    'personId', 'teamTricode', 'firstName', 'familyName', 'position', 'minutes',
+    'points', 'reboundsTotal', 'assists', 'steals', 'blocks',
+    'fieldGoalsMade', 'fieldGoalsAttempted',
+    'threePointersMade', 'threePointersAttempted', 'turnovers',
+]
+
+_boxscore_cache = None
+_boxscore_lock = threading.Lock()
+
+
+def normalize_game_date(value) -> str:
+    """
+    Приведение даты игры к формату 'YYYY-MM-DD'.
+
+    NBA API отдаёт даты в разных форматах: 'JAN 18, 2026' (TeamGameLog),
+    '2026-01-18' (LeagueGameLog), '2026-01-18T00:00:00'.
+    Возвращает пустую строку если дату распознать не удалось.
+    """
+    if not value:
+        return ''
+    text = str(value).strip().split('T')[0]
+    for fmt in ('%Y-%m-%d', '%b %d, %Y', '%B %d, %Y', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return ''
+
+
+def get_league_last_game_dates(season: str = '2025-26') -> dict:
+    """
+    Дата последней сыгранной игры для каждой команды лиги.
+
+    Один запрос LeagueGameLog вместо запроса по каждой команде.
+    В лог попадают только завершённые игры.
+
+    Returns:
+        dict {team_abbrev: 'YYYY-MM-DD'} или пустой dict при ошибке
+    """
+    try:
+        from nba_api.stats.endpoints import leaguegamelog
+
+        log = leaguegamelog.LeagueGameLog(season=season, player_or_team_abbreviation='T')
+        df = log.get_data_frames()[0]
+
+        result = {}
+        for _, row in df.iterrows():
+            abbrev = row['TEAM_ABBREVIATION']
+            game_date = normalize_game_date(row['GAME_DATE'])
+            if abbrev and game_date and game_date > result.get(abbrev, ''):
+                result[abbrev] = game_date
+
+        return result
+
+    except Exception as e:
+        print(f"Ошибка получения расписания лиги: {e}")
+        return {}
+
+
+def _load_boxscore_cache() -> dict:
+    """Загрузка кэша boxscore с диска (один раз за процесс)."""
+    global _boxscore_cache
+    if _boxscore_cache is None:
+        _boxscore_cache = {}
+        try:
+            if os.path.exists(BOXSCORE_CACHE_FILE):
+                with open(BOXSCORE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    _boxscore_cache = json.load(f).get('games', {})
+                print(f"Загружен кэш boxscore: {len(_boxscore_cache)} игр")
+                set_cache_file_size('boxscores', BOXSCORE_CACHE_FILE, len(_boxscore_cache))
+        except Exception as e:
+            print(f"Ошибка загрузки кэша boxscore: {e}")
+            _boxscore_cache = {}
+    return _boxscore_cache
+
+
+def _is_current_boxscore(rows) -> bool:
+    """Строки кэша в текущем формате (записи до добавления personId перезагружаются)."""
+    return rows is not None and (not rows or 'personId' in rows[0])
+
+
+def _save_boxscore_cache():
+    """Сохранение кэша boxscore на диск."""
+    try:
+        with open(BOXSCORE_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'games': _boxscore_cache}, f, ensure_ascii=False)
+        set_cache_file_size('boxscores', BOXSCORE_CACHE_FILE, len(_boxscore_cache))
+    except Exception as e:
+        print(f"Ошибка сохранения кэша boxscore: {e}")
+
+
+def _fetch_boxscore_rows(game_id: str) -> list:
+    """Загрузка boxscore игры с NBA API в виде списка строк-словарей."""
+    from nba_api.stats.endpoints import boxscoretraditionalv3
+    import time
+
+    # Используем V3 - работает для сезона 2025-26
+    time.sleep(1.0)
+    boxscore = boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=game_id)
+    player_df = boxscore.get_data_frames()[0]
+
+    rows = []
+    for _, row in player_df.iterrows():
+        item = {}
+        for col in BOXSCORE_COLUMNS:
+            if col not in row:
+                continue
+            value = row[col]
+            if pd.isna(value):
+                value = None
+            elif hasattr(value, 'item'):
+                # numpy-скаляры -> обычные числа Python (для JSON)
+                value = value.item()
+            item[col] = value
+        rows.append(item)
+    return rows
+
+
+def get_boxscore_rows(game_id: str) -> list:
+    """
+    Строки boxscore игры (все игроки обеих команд).
+
+    Завершённые игры берутся из кэша - их boxscore уже не изменится.
+    """
+    with _boxscore_lock:
+        cached = _load_boxscore_cache().get(str(game_id))
+    if _is_current_boxscore(cached):
+        # Boxscore завершённой игры не устаревает - возраст не важен
+        record_hit('boxscores')
+        return cached
+
+    record_miss('boxscores')
+    return _fetch_boxscore_rows(game_id)
+
+
+def _store_boxscore_rows(game_id: str, rows: list):
+    """Сохранение boxscore завершённой игры в кэш."""
+    with _boxscore_lock:
+        cache = _load_boxscore_cache()
+        if _is_current_boxscore(cache.get(str(game_id))):
+            return
+        cache[str(game_id)] = rows
+        _save_boxscore_cache()
+
+
+def _stat_int(row: dict, key: str) -> int:
+    """Целое значение статистики из строки boxscore (None/NaN -> 0)."""
+    value = row.get(key)
+    return int(value) if pd.notna(value) else 0
+
+
 def get_team_last_n_games_stats(team_abbrev: str, n_games: int = 3, season: str = '2025-26') -> dict:
     """
     Получение статистики стартеров за последние N игр команды.
@@ -384,7 +559,7 @@ def get_team_last_n_games_stats(team_abbrev: str, n_games: int = 3, season: str
         dict с информацией о последних играх и статистикой стартеров
     """
     try:
-        from nba_api.stats.endpoints import teamgamelog, boxscoretraditionalv3
+        from nba_api.stats.endpoints import teamgamelog
         from nba_api.stats.static import teams
         import time
 
@@ -421,66 +596,61 @@ def get_team_last_n_games_stats(team_abbrev: str, n_games: int = 3, season: str
             result = game_row['WL']
             team_pts = int(game_row['PTS']) if pd.notna(game_row['PTS']) else 0
 
-            # Получаем boxscore (используем V3 - работает для сезона 2025-26)
-            time.sleep(1.0)
-            boxscore = boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=game_id)
-            player_df = boxscore.get_data_frames()[0]
+            # Получаем boxscore (из кэша для уже сыгранных игр)
+            box_rows = get_boxscore_rows(game_id)
 
             # Фильтруем игроков нашей команды (V3 использует 'teamTricode' и 'position')
-            team_players = player_df[player_df['teamTricode'] == team_abbrev]
+            team_players = [r for r in box_rows if r.get('teamTricode') == team_abbrev]
             # В V3 стартеры - это те у кого position не пустая (F, C, G)
-            starters_df = team_players[team_players['position'] != '']
-            bench_df = team_players[team_players['position'] == '']
-
-            # Собираем имена стартеров для проверки
-            starter_names = set()
-            for _, row in starters_df.iterrows():
-                starter_names.add(f"{row['firstName']} {row['familyName']}")
+            starters_rows = [r for r in team_players if r.get('position')]
+            bench_rows = [r for r in team_players if not r.get('position')]
 
             starters_stats = []
             bench_stats = []
 
             # Стартеры
-            for _, row in starters_df.iterrows():
+            for row in starters_rows:
                 player_name = f"{row['firstName']} {row['familyName']}"
                 starters_stats.append({
                     'name': player_name,
+                    'player_id': row.get('personId'),
                     'position': row['position'],
-                    'min': row['minutes'],
-                    'pts': int(row['points']) if pd.notna(row['points']) else 0,
-                    'reb': int(row['reboundsTotal']) if pd.notna(row['reboundsTotal']) else 0,
-                    'ast': int(row['assists']) if pd.notna(row['assists']) else 0,
-                    'stl': int(row['steals']) if pd.notna(row['steals']) else 0,
-                    'blk': int(row['blocks']) if pd.notna(row['blocks']) else 0,
-                    'fgm': int(row['fieldGoalsMade']) if pd.notna(row['fieldGoalsMade']) else 0,
-                    'fga': int(row['fieldGoalsAttempted']) if pd.notna(row['fieldGoalsAttempted']) else 0,
-                    'fg3m': int(row['threePointersMade']) if pd.notna(row['threePointersMade']) else 0,
-                    'fg3a': int(row['threePointersAttempted']) if pd.notna(row['threePointersAttempted']) else 0,
-                    'to': int(row['turnovers']) if pd.notna(row['turnovers']) else 0,
+                    'min': row.get('minutes'),
+                    'pts': _stat_int(row, 'points'),
+                    'reb': _stat_int(row, 'reboundsTotal'),
+                    'ast': _stat_int(row, 'assists'),
+                    'stl': _stat_int(row, 'steals'),
+                    'blk': _stat_int(row, 'blocks'),
+                    'fgm': _stat_int(row, 'fieldGoalsMade'),
+                    'fga': _stat_int(row, 'fieldGoalsAttempted'),
+                    'fg3m': _stat_int(row, 'threePointersMade'),
+                    'fg3a': _stat_int(row, 'threePointersAttempted'),
+                    'to': _stat_int(row, 'turnovers'),
                     'is_starter': True,
                 })
 
             # Скамейка (только те кто играл - минуты > 0)
-            for _, row in bench_df.iterrows():
-                mins = row['minutes']
+            for row in bench_rows:
+                mins = row.get('minutes')
                 # Пропускаем игроков которые не играли
                 if not mins or mins == '0:00' or mins == 'PT00M00.00S':
                     continue
                 player_name = f"{row['firstName']} {row['familyName']}"
                 bench_stats.append({
                     'name': player_name,
+                    'player_id': row.get('personId'),
                     'position': 'BENCH',  # Помечаем как скамейку
                     'min': mins,
-                    'pts': int(row['points']) if pd.notna(row['points']) else 0,
-                    'reb': int(row['reboundsTotal']) if pd.notna(row['reboundsTotal']) else 0,
-                    'ast': int(row['assists']) if pd.notna(row['assists']) else 0,
-                    'stl': int(row['steals']) if pd.notna(row['steals']) else 0,
-                    'blk': int(row['blocks']) if pd.notna(row['blocks']) else 0,
-                    'fgm': int(row['fieldGoalsMade']) if pd.notna(row['fieldGoalsMade']) else 0,
-                    'fga': int(row['fieldGoalsAttempted']) if pd.notna(row['fieldGoalsAttempted']) else 0,
-                    'fg3m': int(row['threePointersMade']) if pd.notna(row['threePointersMade']) else 0,
-                    'fg3a': int(row['threePointersAttempted']) if pd.notna(row['threePointersAttempted']) else 0,
-                    'to': int(row['turnovers']) if pd.notna(row['turnovers']) else 0,
+                    'pts': _stat_int(row, 'points'),
+                    'reb': _stat_int(row, 'reboundsTotal'),
+                    'ast': _stat_int(row, 'assists'),
+                    'stl': _stat_int(row, 'steals'),
+                    'blk': _stat_int(row, 'blocks'),
+                    'fgm': _stat_int(row, 'fieldGoalsMade'),
+                    'fga': _stat_int(row, 'fieldGoalsAttempted'),
+                    'fg3m': _stat_int(row, 'threePointersMade'),
+                    'fg3a': _stat_int(row, 'threePointersAttempted'),
+                    'to': _stat_int(row, 'turnovers'),
                     'is_starter': False,
                 })
 
@@ -494,6 +664,9 @@ def get_team_last_n_games_stats(team_abbrev: str, n_games: int = 3, season: str
                 print(f"  Пропуск игры {game_date} ({matchup}) - нет данных о минутах (игра в процессе?)")
                 continue
 
+            # Игра завершена - её boxscore больше не изменится
+            _store_boxscore_rows(game_id, box_rows)
+
             games_data.append({
                 'game_id': game_id,
                 'date': game_date,
@@ -505,10 +678,15 @@ def get_team_last_n_games_stats(team_abbrev: str, n_games: int = 3, season: str
                 'all_players': starters_stats + bench_stats,  # Все игроки
             })
 
+        # Дата последней завершённой игры - по ней GUI решает, устарел ли кэш
+        game_dates = [normalize_game_date(g['date']) for g in games_data]
+        last_game_date = max((d for d in game_dates if d), default='')
+
         return {
             'team': team_abbrev,
             'team_name': team['full_name'],
-            'games': games_data
+            'games': games_data,
+            'last_game_date': last_game_date,
         }
 
     except Exception as e:
@@ -530,7 +708,7 @@ def get_team_last_game_starters_nba_api(team_abbrev: str, season: str = '2025-26
         dict с информацией о последней игре и стартерах
     """
     try:
-        from nba_api.stats.endpoints import teamgamelog, boxscoretraditionalv3
+        from nba_api.stats.endpoints import teamgamelog
         from nba_api.stats.static import teams
         import time
 
@@ -562,17 +740,15 @@ def get_team_last_game_starters_nba_api(team_abbrev: str, season: str = '2025-26
         matchup = last_game['MATCHUP']
         result = last_game['WL']
 
-        # Получаем boxscore для стартеров (V3 для сезона 2025-26)
-        time.sleep(1.0)
-        boxscore = boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=game_id)
-        player_df = boxscore.get_data_frames()[0]
+        # Получаем boxscore для стартеров (V3 для сезона 2025-26, через кэш)
+        box_rows = get_boxscore_rows(game_id)
 
         # Фильтруем игроков нужной команды и стартеров (V3 названия колонок)
-        team_players = player_df[player_df['teamTricode'] == team_abbrev]
-        starters = team_players[team_players['position'] != '']
+        starters = [r for r in box_rows
+                    if r.get('teamTricode') == team_abbrev and r.get('position')]
 
         starters_list = []
-        for _, row in starters.iterrows():
+        for row in starters:
             player_name = f"{row['firstName']} {row['familyName']}"
             starters_list.append({
                 'name': player_name,
@@ -0,0 +1,244 @@
+"""
+Player Index - идентификация игроков в статистике команды без повторных сравнений имён.
+
+RotoWire пишет имена сокращённо ("S. Gilgeous-Alexander"), nba_api -
+полностью ("Shai Gilgeous-Alexander"). Раньше каждое сравнение заново
+разбирало оба имени (names_match) для каждого игрока каждой игры.
+
+PlayerIndex строится один раз на загрузку статистики команды:
+- каждому игроку - канонический id (personId из boxscore, если есть,
+  иначе нормализованное полное имя);
+- ключи (фамилия, первая буква) и (фамилия, имя) -> id, поэтому и
+  сокращённое, и полное имя находятся одним обращением к dict;
+- строки статистики по играм: id -> {индекс игры: строка игрока}.
+
+Семантика как у names_match, включая AMBIGUOUS_SURNAMES (братья
+Curry/Morris/Martin/Holiday различаются по полному имени), но полное имя
+сначала ищется точно - одноклубники Jalen и Jaylin Williams не путаются.
+"""
+
+# Суффиксы, которые не являются частью фамилии
+NAME_SUFFIXES = (" Jr.", " III", " II")
+
+
+def get_last_name(full_name):
+    """Извлечение фамилии из полного имени для сравнения."""
+    if not full_name:
+        return ""
+    # Убираем суффиксы типа Jr., III, II
+    name = full_name
+    for suffix in NAME_SUFFIXES:
+        name = name.replace(suffix, "")
+    name = name.strip()
+    parts = name.split()
+    if len(parts) >= 2:
+        # Берём последнюю часть как фамилию
+        return parts[-1].lower()
+    return name.lower()
+
+
+def get_first_letter(full_name):
+    """Извлечение первой буквы имени."""
+    if not full_name:
+        return ""
+    name = full_name.strip()
+    if name:
+        return name[0].upper()
+    return ""
+
+
+# Фамилии где есть несколько игроков с одинаковой первой буквой имени
+# Для этих случаев нужно сравнивать полное имя
+AMBIGUOUS_SURNAMES = {
+    'curry': ['stephen', 'seth'],      # Stephen Curry vs Seth Curry
+    'morris': ['marcus', 'markieff'],  # Marcus Morris vs Markieff Morris
+    'martin': ['caleb', 'cody'],       # Caleb Martin vs Cody Martin
+    'holiday': ['jrue', 'justin', 'aaron'],  # Holiday brothers
+}
+
+
+def get_first_name(full_name):
+    """Извлечение имени (первого слова)."""
+    if not full_name:
+        return ""
+    parts = full_name.replace('.', '').strip().split()
+    if parts:
+        return parts[0].lower()
+    return ""
+
+
+def names_match(name1, name2):
+    """
+    Сравнение имён игроков: фамилия + первая буква имени.
+    'S. Gilgeous-Alexander' vs 'Shai Gilgeous-Alexander' -> True
+    'D. Mitchell' vs 'Donovan Mitchell' -> True
+
+    Исключение: для игроков с одинаковой фамилией и первой буквой (Curry, Morris, Martin)
+    сравниваем полные имена.
+
+    Для поиска в статистике команды используйте PlayerIndex - он не
+    разбирает имена на каждом сравнении.
+    """
+    if not name1 or not name2:
+        return False
+    last1 = get_last_name(name1)
+    last2 = get_last_name(name2)
+    if last1 != last2:
+        return False
+
+    # Проверяем проблемные фамилии (братья с одинаковой первой буквой)
+    if last1 in AMBIGUOUS_SURNAMES:
+        first1 = get_first_name(name1)
+        first2 = get_first_name(name2)
+        # Если хотя бы одно имя полное (не сокращение) - сравниваем полные имена
+        # "Stephen Curry" vs "Seth Curry" -> сравниваем stephen != seth -> False
+        # "Stephen Curry" vs "S. Curry" -> stephen vs s -> первые буквы совпадают -> проверяем полное
+        # "S. Curry" vs "Seth Curry" -> s vs seth -> первые буквы совпадают -> проверяем полное
+        if len(first1) > 1 or len(first2) > 1:
+            # Хотя бы одно полное имя - сравниваем полностью
+            if len(first1) > 1 and len(first2) > 1:
+                return first1 == first2
+            # Одно полное, одно сокращение - проверяем начинается ли полное с сокращения
+            if len(first1) > 1:
+                return first1.startswith(first2)
+            else:
+                return first2.startswith(first1)
+
+    first1 = get_first_letter(name1)
+    first2 = get_first_letter(name2)
+    return first1 == first2
+
+
+def normalize_name(name):
+    """Нормализация имени для сравнения (D. Booker -> booker)."""
+    if not name:
+        return ""
+    return get_last_name(name)
+
+
+def name_key(name):
+    """Нормализованное полное имя: 'Gary Trent Jr.' -> 'gary trent'."""
+    if not name:
+        return ""
+    for suffix in NAME_SUFFIXES:
+        name = name.replace(suffix, "")
+    return " ".join(name.replace('.', '').lower().split())
+
+
+def _first_names_compatible(first1, first2):
+    """Имя и сокращение ("j" / "jalen") или краткая форма ("nic" / "nicolas")."""
+    if len(first1) <= 1 or len(first2) <= 1:
+        return first1[:1] == first2[:1]
+    return first1.startswith(first2) or first2.startswith(first1)
+
+
+class PlayerIndex:
+    """Индекс игроков по играм команды: имя в любом формате -> id -> строки статистики."""
+
+    def __init__(self, games=None):
+        """
+        Args:
+            games: Игры команды (get_team_last_n_games_stats()['games'])
+                   или None для индекса по списку имён (см. add_name)
+        """
+        self.names = {}       # id -> имя как в источнике (первое встреченное)
+        self._by_initial = {}  # (фамилия, первая буква) -> [id] в порядке появления
+        self._by_first = {}    # (фамилия, имя) -> id
+        self._rows = {}        # id -> {индекс игры: строка игрока}
+        self._resolved = {}    # запрошенное имя -> id или None (мемоизация)
+        self.games_count = 0
+
+        for game_index, game in enumerate(games or []):
+            self.games_count += 1
+            for player in game.get('all_players', game.get('starters', [])):
+                player_id = self.add_name(player.get('name', ''), player.get('player_id'))
+                if player_id is not None:
+                    self._rows.setdefault(player_id, {}).setdefault(game_index, player)
+
+    def add_name(self, name, player_id=None):
+        """Добавление имени в индекс. Возвращает id игрока (None для пустого имени)."""
+        if not name:
+            return None
+        if player_id is None:
+            player_id = f"name:{name_key(name)}"
+        if player_id in self.names:
+            return player_id
+
+        self.names[player_id] = name
+        last = get_last_name(name)
+        self._by_initial.setdefault((last, get_first_letter(name)), []).append(player_id)
+        first = get_first_name(name)
+        if len(first) > 1:
+            self._by_first.setdefault((last, first), player_id)
+        self._resolved.clear()
+        return player_id
+
+    def resolve(self, name):
+        """
+        Id игрока по имени в любом формате ("S. Curry" / "Stephen Curry") или None.
+
+        Полное имя сначала ищется точно (фамилия, имя) - для любой фамилии,
+        иначе Jalen Williams находил бы Jaylin Williams из той же команды.
+        Без точного совпадения полное имя подходит только к сокращению
+        ("J. Williams") или к краткой форме того же имени (Nic / Nicolas);
+        это же различает братьев из AMBIGUOUS_SURNAMES. Сокращение - по
+        фамилии и первой букве; если подходят несколько игроков - первый
+        по порядку игр (как при прежнем переборе).
+        """
+        if name in self._resolved:
+            return self._resolved[name]
+
+        player_id = None
+        last = get_last_name(name)
+        candidates = self._by_initial.get((last, get_first_letter(name)), [])
+        first = get_first_name(name)
+        if candidates and len(first) > 1:
+            player_id = self._by_first.get((last, first))
+            if player_id is None:
+                player_id = next((pid for pid in candidates
+                                  if _first_names_compatible(first, get_first_name(self.names[pid]))), None)
+        elif candidates:
+            player_id = candidates[0]
+
+        self._resolved[name] = player_id
+        return player_id
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def get(self, game_index, name):
+        """Строка игрока в игре game_index или None (не играл / нет в индексе)."""
+        player_id = self.resolve(name)
+        if player_id is None:
+            return None
+        return self._rows.get(player_id, {}).get(game_index)
+
+    def player_rows(self, name):
+        """Строки игрока по всем играм (None - не играл), в порядке игр."""
+        rows = self._rows.get(self.resolve(name), {})
+        return [rows.get(i) for i in range(self.games_count)]
+
+
+def match_players_by_lastname(current_names, past_names):
+    """
+    Сравнение списков игроков (RotoWire vs nba_api) через PlayerIndex.
+    Возвращает (new_players, removed_players) с оригинальными именами.
+    """
+    past_index = PlayerIndex()
+    for name in past_names:
+        past_index.add_name(name)
+
+    # Новые игроки (есть сейчас, не было раньше)
+    seen = set()
+    new_players = []
+    for name in current_names:
+        player_id = past_index.resolve(name)
+        if player_id is None:
+            new_players.append(name)
+        else:
+            seen.add(player_id)
+
+    # Выбывшие игроки (были раньше, нет сейчас)
+    removed_players = [name for player_id, name in past_index.names.items() if player_id not in seen]
+
+    return new_players, removed_players
@@ -3,6 +3,8 @@
 Используется для поиска новостей по игроку
 """
 
+from name_resolver import get_resolver
+
 # Топ игроки NBA с русскими именами
 # Формат: английское имя -> список вариантов русского написания
 PLAYER_NAMES = {
@@ -150,11 +152,10 @@ def get_player_keywords(english_name: str) -> list:
     if english_name in PLAYER_NAMES:
         return PLAYER_NAMES[english_name]
 
-    # Пробуем найти по фамилии
-    last_name = english_name.split()[-1] if ' ' in english_name else english_name
-    for eng_name, rus_variants in PLAYER_NAMES.items():
-        if last_name.lower() in eng_name.lower():
-            return rus_variants
+    # Другое написание (сокращение RotoWire, суффикс Jr.) - английское имя из справочника имён
+    canonical = get_resolver().canonical_name(english_name)
+    if canonical in PLAYER_NAMES:
+        return PLAYER_NAMES[canonical]
 
     # Не нашли - возвращаем оригинальное имя и фамилию
     parts = english_name.split()
@@ -204,7 +205,10 @@ def get_english_name(russian_name: str) -> str:
     Returns:
         Английское имя или оригинальное если не найдено
     """
-    return RUSSIAN_TO_ENGLISH.get(russian_name.lower(), russian_name)
+    english_name = RUSSIAN_TO_ENGLISH.get(russian_name.lower())
+    if english_name:
+        return english_name
+    return get_resolver().canonical_name(russian_name, russian_name)
 
 
 # Тест
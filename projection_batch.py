@@ -0,0 +1,279 @@
+"""
+Projection Batch - AI-прогнозы для всех стартеров слейта до начала игр.
+
+Вместо одного прогноза на клик (с модальным окном загрузки) пакетный
+прогон заранее считает прогнозы для всех ожидаемых стартеров (~100 игроков):
+
+- промпты строятся из кэшированной статистики (build_player_projection_messages);
+- запросы к OpenAI идут параллельно, не больше PROJECTION_BATCH_CONCURRENCY
+  одновременно;
+- на 429 / таймаут / ошибку сервера - повтор с экспоненциальной паузой;
+  при rate limit пауза общая для всех потоков (уважается Retry-After);
+- прогресс - через колбэк on_progress(done, total, player_name, status);
+- результаты - в SQLite (projections.db), окно игрока читает их мгновенно.
+"""
+
+import time
+import random
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ai_analyzer import build_player_projection_messages, complete_player_projection, PLAYER_PROJECTION_MODEL
+from name_resolver import get_resolver, alias_key
+
+# Ошибки, после которых запрос имеет смысл повторить
+try:
+    from openai import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+    RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+except ImportError:
+    RateLimitError = None
+    RETRYABLE_ERRORS = ()
+
+DB_FILE = Path(__file__).parent / "projections.db"
+
+# Одновременных запросов к API
+PROJECTION_BATCH_CONCURRENCY = 6
+
+# Повторы: число попыток и паузы (сек)
+PROJECTION_MAX_ATTEMPTS = 5
+PROJECTION_BACKOFF_BASE = 2.0
+PROJECTION_BACKOFF_MAX = 60.0
+
+# Таймаут одного запроса (сек)
+PROJECTION_REQUEST_TIMEOUT = 60
+
+
+def init_db():
+    """Инициализация базы данных."""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_projections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slate_date TEXT NOT NULL,
+            player_key TEXT NOT NULL,
+            player_name TEXT NOT NULL,
+            team_abbrev TEXT,
+            opponent_abbrev TEXT,
+            position TEXT,
+            injuries_key TEXT,
+            status TEXT NOT NULL,
+            analysis TEXT,
+            prompt TEXT,
+            prompt_hash TEXT,
+            model TEXT,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            latency_ms INTEGER,
+            created_at TEXT NOT NULL,
+            UNIQUE(slate_date, player_key)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_projections_team ON player_projections(slate_date, team_abbrev)
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
+def player_key(player_name: str) -> str:
+    """Ключ игрока: id из справочника имён (любое написание), иначе нормализованное имя."""
+    return get_resolver().resolve(player_name) or alias_key(player_name)
+
+
+def injuries_key(team_injuries) -> str:
+    """Отпечаток списка OUT игроков - прогноз устаревает, если он изменился."""
+    names = [inj.get('name', '') if isinstance(inj, dict) else str(inj) for inj in team_injuries or []]
+    return "|".join(sorted(player_key(name) for name in names if name))
+
+
+def save_projection(slate_date: str, job: dict, status: str, analysis: str = None, prompt: str = None,
+                    attempts: int = 1, latency_ms: int = None):
+    """Запись результата (повторный прогон заменяет прежний прогноз игрока на слейт)."""
+    init_db()
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT OR REPLACE INTO player_projections
+            (slate_date, player_key, player_name, team_abbrev, opponent_abbrev, position, injuries_key,
+             status, analysis, prompt, prompt_hash, model, attempts, latency_ms, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        slate_date, player_key(job['player_name']), job['player_name'], job.get('team_abbrev'),
+        job.get('opponent_abbrev'), job.get('player_position'), injuries_key(job.get('team_injuries')),
+        status, analysis, prompt,
+        hashlib.sha256(prompt.encode('utf-8')).hexdigest() if prompt else None,
+        PLAYER_PROJECTION_MODEL, attempts, latency_ms,
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    ))
+    conn.commit()
+    conn.close()
+
+
+def get_projection(slate_date: str, player_name: str, team_injuries=None):
+    """
+    Готовый прогноз игрока на слейт или None.
+
+    Args:
+        team_injuries: Текущие OUT игроки команды; если передан и не совпадает
+                       с тем, что был при прогоне, - прогноз считается устаревшим
+
+    Returns:
+        dict строки таблицы (status='done') или None
+    """
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM player_projections
+            WHERE slate_date = ? AND player_key = ? AND status = 'done'
+        ''', (slate_date, player_key(player_name)))
+        row = cursor.fetchone()
+        conn.close()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    if team_injuries is not None and row['injuries_key'] != injuries_key(team_injuries):
+        return None
+    return dict(row)
+
+
+def get_projections(slate_date: str, team_abbrev: str = None) -> list:
+    """Все прогнозы слейта (опционально - одной команды)."""
+    init_db()
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    if team_abbrev:
+        cursor.execute('SELECT * FROM player_projections WHERE slate_date = ? AND team_abbrev = ? ORDER BY player_name',
+                       (slate_date, team_abbrev))
+    else:
+        cursor.execute('SELECT * FROM player_projections WHERE slate_date = ? ORDER BY team_abbrev, player_name',
+                       (slate_date,))
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def _retry_after(error) -> float:
+    """Пауза из заголовка Retry-After ответа API (или None)."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class ProjectionBatch:
+    """Один пакетный прогон: параллельные запросы, повторы, прогресс."""
+
+    def __init__(self, slate_date, jobs, concurrency=PROJECTION_BATCH_CONCURRENCY, on_progress=None, token=None):
+        """
+        Args:
+            slate_date: Дата слейта (ключ в таблице)
+            jobs: Аргументы build_player_projection_messages для каждого игрока (dict)
+            on_progress: Колбэк (done, total, player_name, status) - из рабочих потоков
+            token: CancelToken - отмена оставшихся запросов
+        """
+        self.slate_date = slate_date
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.token = token
+        self._lock = threading.Lock()
+        self._pause_until = 0.0  # Общая пауза после rate limit
+        self.stats = {'done': 0, 'failed': 0, 'skipped': 0, 'retries': 0, 'rate_limited': 0}
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token is not None and self.token.cancelled
+
+    def _wait_rate_limit(self):
+        while not self.cancelled:
+            with self._lock:
+                delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(min(delay, 1.0))
+
+    def _backoff(self, attempt, error):
+        """Пауза перед повтором; для rate limit - общая для всех потоков."""
+        delay = min(PROJECTION_BACKOFF_BASE * 2 ** (attempt - 1), PROJECTION_BACKOFF_MAX)
+        delay *= 0.5 + random.random()  # Джиттер - потоки не повторяют одновременно
+        if RateLimitError is not None and isinstance(error, RateLimitError):
+            delay = _retry_after(error) or delay
+            with self._lock:
+                self.stats['rate_limited'] += 1
+                self._pause_until = max(self._pause_until, time.monotonic() + delay)
+            print(f"[BATCH] Rate limit, пауза {delay:.1f}с")
+        else:
+            time.sleep(delay)
+
+    def _run_job(self, job):
+        """Прогноз одного игрока с повторами. Returns: статус."""
+        if self.cancelled:
+            return 'skipped'
+        messages, prompt = build_player_projection_messages(**job)
+        started = time.perf_counter()
+        for attempt in range(1, PROJECTION_MAX_ATTEMPTS + 1):
+            self._wait_rate_limit()
+            if self.cancelled:
+                return 'skipped'
+            try:
+                analysis = complete_player_projection(job['player_name'], messages,
+                                                      timeout=PROJECTION_REQUEST_TIMEOUT)
+            except RETRYABLE_ERRORS as e:
+                if attempt == PROJECTION_MAX_ATTEMPTS:
+                    save_projection(self.slate_date, job, 'failed', f"Ошибка AI анализа: {e}", prompt, attempt)
+                    return 'failed'
+                with self._lock:
+                    self.stats['retries'] += 1
+                self._backoff(attempt, e)
+                continue
+            except Exception as e:
+                save_projection(self.slate_date, job, 'failed', f"Ошибка AI анализа: {e}", prompt, attempt)
+                return 'failed'
+
+            latency_ms = round((time.perf_counter() - started) * 1000)
+            save_projection(self.slate_date, job, 'done', analysis, prompt, attempt, latency_ms)
+            return 'done'
+        return 'failed'
+
+    def run(self) -> dict:
+        """Прогон всех задач. Returns: self.stats."""
+        total = len(self.jobs)
+        print(f"[BATCH] Прогнозы для {total} игроков, параллельно {self.concurrency}")
+        started = time.perf_counter()
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='projection') as executor:
+            futures = {executor.submit(self._run_job, job): job for job in self.jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    status = future.result()
+                except Exception as e:
+                    print(f"[BATCH] Ошибка прогноза {job['player_name']}: {e}")
+                    status = 'failed'
+                done += 1
+                with self._lock:
+                    self.stats[status] += 1
+                if self.on_progress:
+                    self.on_progress(done, total, job['player_name'], status)
+
+        self.stats['elapsed_s'] = round(time.perf_counter() - started, 1)
+        print(f"[BATCH] Готово: {self.stats}")
+        return self.stats
+
+
+def run_projection_batch(slate_date, jobs, concurrency=PROJECTION_BATCH_CONCURRENCY, on_progress=None, token=None):
+    """Пакетный прогон прогнозов (блокирующий - вызывать из фонового потока)."""
+    return ProjectionBatch(slate_date, jobs, concurrency, on_progress, token).run()
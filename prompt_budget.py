@@ -0,0 +1,225 @@
+"""
+Prompt Budget - сборка AI промпта по бюджету токенов.
+
+Промпт прогноза игрока включал полный текст новостей, составы 10 игр и
+подробности травм - размер не контролировался, а от него зависят время
+ответа и стоимость запроса.
+
+PromptBuilder собирает промпт из разделов (статистика, травмы, составы,
+новости...):
+- токены считаются локально - tiktoken, если установлен, иначе оценка
+  по длине текста (байты UTF-8 / 4 - кириллица занимает больше токенов);
+- у раздела свой бюджет и приоритет (0 - самый важный);
+- у раздела может быть несколько вариантов - от подробного к краткому
+  (например новости: полный текст -> начало статей -> только заголовки);
+- сначала каждый раздел укладывается в свой бюджет, затем, пока общий
+  бюджет превышен, разделы сокращаются по шагу, начиная с наименее
+  важного: сперва более краткие варианты, и только когда их не осталось -
+  обрезка, потом раздел убирается;
+- обязательные разделы (required) не сокращаются никогда.
+
+Итоговое число токенов по разделам печатается на каждый вызов ([PROMPT])
+и копится в счётчиках для окна Cache Stats.
+"""
+
+import threading
+from functools import lru_cache
+
+# Точный подсчёт токенов (опционально)
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+# Оценка без tiktoken: байт UTF-8 на токен
+HEURISTIC_BYTES_PER_TOKEN = 4
+
+# Пометка об обрезанном тексте
+TRUNCATION_MARK = "\n  […сокращено]"
+
+_stats = {'calls': 0, 'tokens': 0, 'max_tokens': 0, 'shortened': 0, 'truncated': 0, 'dropped': 0}
+_stats_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """Кодировка tiktoken для модели (неизвестная модель - o200k_base, как у gpt-4o)."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Число токенов в тексте (tiktoken или оценка)."""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding(model).encode(text))
+    return -(-len(text.encode('utf-8')) // HEURISTIC_BYTES_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Обрезка текста до max_tokens (с пометкой о сокращении).
+
+    Режем по границе строки, если она не слишком далеко - в промпте
+    строки это отдельные игры / новости.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    budget = max_tokens - count_tokens(TRUNCATION_MARK, model)
+    if budget <= 0:
+        return ""
+
+    if TIKTOKEN_AVAILABLE:
+        encoding = _encoding(model)
+        cut = encoding.decode(encoding.encode(text)[:budget])
+    else:
+        cut = text.encode('utf-8')[:budget * HEURISTIC_BYTES_PER_TOKEN].decode('utf-8', errors='ignore')
+
+    newline = cut.rfind("\n")
+    if newline > len(cut) // 2:
+        cut = cut[:newline]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+class PromptSection:
+    """Раздел промпта: варианты текста от подробного к краткому."""
+
+    def __init__(self, name, variants, priority=0, budget=None, required=False):
+        """
+        Args:
+            name: Имя раздела (ключ в результате и в отчёте)
+            variants: Текст или список вариантов (первый - самый подробный)
+            priority: 0 - самый важный; сокращаются разделы с большим числом
+            budget: Максимум токенов раздела (None - без своего лимита)
+            required: Не сокращать (ключевые данные: тренды, травмы)
+        """
+        self.name = name
+        self.variants = [variants] if isinstance(variants, str) else [v for v in variants if v is not None]
+        self.priority = priority
+        self.budget = budget
+        self.required = required
+        self.level = 0        # Текущий вариант
+        self.text = self.variants[0] if self.variants else ""
+        self.tokens = 0
+        self.full_tokens = 0  # Размер подробного варианта - для отчёта
+        self.action = None    # 'shortened' / 'truncated' / 'dropped'
+
+
+class PromptBuilder:
+    """Сборка разделов промпта в общий бюджет токенов."""
+
+    def __init__(self, name, total_budget, model="gpt-4o"):
+        """
+        Args:
+            name: Имя промпта для отчёта ("player_projection", "team_analysis")
+            total_budget: Бюджет токенов всего промпта (вместе с постоянным текстом)
+            model: Модель - для кодировки tiktoken
+        """
+        self.name = name
+        self.total_budget = total_budget
+        self.model = model
+        self.sections = []
+        self.fixed_tokens = 0
+
+    def add_fixed(self, text: str):
+        """Постоянный текст (инструкции, шапка) - учитывается в бюджете, не сокращается."""
+        self.fixed_tokens += count_tokens(text, self.model)
+
+    def add(self, name, variants, priority=0, budget=None, required=False):
+        """Раздел промпта (см. PromptSection)."""
+        self.sections.append(PromptSection(name, variants, priority, budget, required))
+
+    def _shorten(self, section):
+        """Следующий, более краткий вариант раздела."""
+        section.level += 1
+        section.text = section.variants[section.level]
+        section.tokens = count_tokens(section.text, self.model)
+        section.action = 'shortened'
+
+    def _fit(self, section, limit):
+        """Сократить раздел до limit токенов: краткий вариант, затем обрезка."""
+        while section.tokens > limit and section.level < len(section.variants) - 1:
+            self._shorten(section)
+        if section.tokens > limit:
+            section.text = truncate_to_tokens(section.text, limit, self.model)
+            section.tokens = count_tokens(section.text, self.model)
+            section.action = 'truncated' if section.text else 'dropped'
+
+    def build(self) -> dict:
+        """
+        Укладывает разделы в бюджеты.
+
+        Returns:
+            {имя раздела: текст}; отчёт - в self.report / self.total_tokens
+        """
+        for section in self.sections:
+            section.tokens = section.full_tokens = count_tokens(section.text, self.model)
+            if section.budget is not None and not section.required:
+                self._fit(section, section.budget)
+
+        # Общий бюджет: по одному шагу с наименее важного раздела, с проверкой
+        # после каждого - краткие варианты всех разделов раньше любой обрезки
+        while self.total_tokens > self.total_budget:
+            reducible = sorted((s for s in self.sections if not s.required and s.tokens),
+                               key=lambda s: -s.priority)
+            if not reducible:
+                break
+            shorter = [s for s in reducible if s.level < len(s.variants) - 1]
+            if shorter:
+                self._shorten(shorter[0])
+                continue
+            section = reducible[0]
+            before = section.tokens
+            self._fit(section, max(before - (self.total_tokens - self.total_budget), 0))
+            if section.tokens >= before:
+                section.text, section.tokens, section.action = "", 0, 'dropped'
+
+        self._record()
+        return {section.name: section.text for section in self.sections}
+
+    @property
+    def total_tokens(self) -> int:
+        return self.fixed_tokens + sum(section.tokens for section in self.sections)
+
+    @property
+    def report(self) -> str:
+        """Токены по разделам: "news 1840->310 (shortened)"."""
+        parts = []
+        for section in self.sections:
+            part = f"{section.name} {section.tokens}"
+            if section.action:
+                part = f"{section.name} {section.full_tokens}->{section.tokens} ({section.action})"
+            parts.append(part)
+        counter = "tiktoken" if TIKTOKEN_AVAILABLE else "оценка"
+        return (f"{self.name}: {self.total_tokens}/{self.total_budget} токенов ({counter}); "
+                f"инструкции {self.fixed_tokens}, " + ", ".join(parts))
+
+    def _record(self):
+        total = self.total_tokens
+        with _stats_lock:
+            _stats['calls'] += 1
+            _stats['tokens'] += total
+            _stats['max_tokens'] = max(_stats['max_tokens'], total)
+            for section in self.sections:
+                if section.action:
+                    _stats[section.action] += 1
+        print(f"[PROMPT] {self.report}")
+
+
+def get_prompt_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_stats_report() -> str:
+    stats = get_prompt_stats()
+    average = stats['tokens'] / stats['calls'] if stats['calls'] else 0
+    counter = "tiktoken" if TIKTOKEN_AVAILABLE else "estimate"
+    return (f"Prompt budget: {stats['calls']} prompts, avg {average:.0f} tokens, max {stats['max_tokens']} "
+            f"({counter}); sections shortened {stats['shortened']}, truncated {stats['truncated']}, "
+            f"dropped {stats['dropped']}")
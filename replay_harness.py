@@ -0,0 +1,393 @@
+"""
+Replay Harness - нагрузочный прогон конвейера обнаружения изменений без сети.
+
+Последовательность полных снимков слейта (сотни опросов, много изменений)
+прогоняется через те же этапы, что и в приложении:
+
+    parse   - HTML в формате RotoWire → parse_lineups()
+    diff    - diff_lineups() с отпечатками команд
+    persist - lineup_history.record_snapshot() + журнал изменений (JSONL)
+    notify  - EventBus → подписчик (время доставки, потери при переполнении)
+
+Источники снимков:
+    synthetic - сгенерированный слейт + случайные изменения на каждом опросе
+    cache     - игры из lineups_cache.json + случайные изменения
+    history   - реальные снимки из lineup_history.db за дату слейта
+
+Отчёт: пропускная способность, перцентили задержки по этапам, память
+(tracemalloc). Запись идёт во временную папку - рабочие базы не трогаются.
+
+Примеры:
+    python replay_harness.py --polls 500 --games 15 --changes 3
+    python replay_harness.py --games 45 --interval 0.2 --notify-ms 50
+    python replay_harness.py --source history --date 2026-01-15
+"""
+
+import os
+import io
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from bs4 import BeautifulSoup
+
+import lineup_history
+from nba_lineups_scraper import parse_lineups
+from lineup_diff import diff_lineups, STARTER_POSITIONS
+from event_bus import EventBus
+from latency import summarize_samples
+from team_mapping import NBA_TEAMS
+
+# Топик прогона (не пересекается с топиком приложения)
+REPLAY_TOPIC = 'replay.changes'
+
+# Этапы конвейера (порядок - для отчёта)
+REPLAY_STAGES = ('parse', 'diff', 'persist', 'publish', 'notify')
+
+# Надписи статусов в HTML RotoWire (как их понимает parse_player)
+STATUS_LABELS = {'out': 'Out', 'doubtful': 'Doub', 'questionable': 'Ques', 'probable': 'Prob'}
+
+BENCH_SIZE = 4
+
+
+# ===== Источники снимков =====
+
+def synthetic_slate(n_games: int, rng: random.Random) -> list:
+    """Сгенерированный слейт. Больше 15 игр - команды повторяются с суффиксом (другие даты)."""
+    abbrevs = list(NBA_TEAMS)
+    games = []
+    for index in range(n_games):
+        if index % 15 == 0:
+            rng.shuffle(abbrevs)
+        suffix = str(index // 15 + 1) if index >= 15 else ''
+        pair = abbrevs[(index % 15) * 2:(index % 15) * 2 + 2]
+        game = {'game_time': f"{7 + index % 4}:{'30' if index % 2 else '00'} PM ET"}
+        for side, abbrev in zip(('away_team', 'home_team'), pair):
+            abbrev = abbrev + suffix
+            lineup = [{'name': f"{abbrev[0]}. {abbrev}Starter{i}", 'position': pos,
+                       'status': 'active', 'injury_note': None}
+                      for i, pos in enumerate(STARTER_POSITIONS)]
+            lineup += [{'name': f"{abbrev[0]}. {abbrev}Bench{i}", 'position': rng.choice(['G', 'F', 'C']),
+                        'status': rng.choice(['out', 'questionable', 'probable']), 'injury_note': None}
+                       for i in range(BENCH_SIZE)]
+            for player in lineup:
+                player['injury_note'] = STATUS_LABELS.get(player['status'])
+            game[side] = {'abbrev': abbrev, 'record': f"{rng.randint(0, 40)}-{rng.randint(0, 40)}",
+                          'lineup': lineup, 'injuries': []}
+        games.append(game)
+    return games
+
+
+def cached_slate() -> list:
+    """Игры из кэша приложения."""
+    with open('lineups_cache.json', 'r', encoding='utf-8') as f:
+        return json.load(f).get('games', [])
+
+
+def history_snapshots(slate_date: str) -> list:
+    """Полные снимки слейта на каждый записанный момент опроса."""
+    snapshots = []
+    for at in lineup_history.get_recorded_times(slate_date):
+        teams = lineup_history.get_snapshot_at(at, slate_date)
+        games = {}
+        for abbrev, state in teams.items():
+            away, _, home = state['game'].partition('@')
+            game = games.setdefault(state['game'], {'game_time': state['game_time']})
+            side = 'away_team' if abbrev == away else 'home_team'
+            game[side] = {'abbrev': abbrev, 'record': state['record'], 'lineup': state['lineup'], 'injuries': []}
+        snapshots.append([g for g in games.values() if 'away_team' in g and 'home_team' in g])
+    return snapshots
+
+
+def mutate(games: list, n_changes: int, rng: random.Random) -> list:
+    """Новый снимок с n_changes случайными изменениями (замены, статусы, позиции, состав)."""
+    games = json.loads(json.dumps(games))
+    for _ in range(n_changes):
+        team = rng.choice(games)[rng.choice(['away_team', 'home_team'])]
+        lineup = team['lineup']
+        starters = [p for p in lineup if p.get('position') in STARTER_POSITIONS]
+        bench = [p for p in lineup if p.get('position') not in STARTER_POSITIONS]
+        kind = rng.choice(['swap', 'status', 'status', 'position', 'roster'])
+
+        if kind == 'swap' and starters and bench:
+            starter, sub = rng.choice(starters), rng.choice(bench)
+            starter['name'], sub['name'] = sub['name'], starter['name']
+        elif kind == 'status':
+            player = rng.choice(lineup)
+            player['status'] = rng.choice([s for s in ('active',) + tuple(STATUS_LABELS) if s != player['status']])
+            player['injury_note'] = STATUS_LABELS.get(player['status'])
+        elif kind == 'position' and len(starters) >= 2:
+            first, second = rng.sample(starters, 2)
+            i, j = lineup.index(first), lineup.index(second)
+            lineup[i], lineup[j] = lineup[j], lineup[i]
+            first['position'], second['position'] = second['position'], first['position']
+        elif bench:
+            lineup.remove(rng.choice(bench))
+            lineup.append({'name': f"{team['abbrev'][0]}. {team['abbrev']}Call{rng.randint(0, 999)}",
+                           'position': 'G', 'status': 'questionable', 'injury_note': 'Ques'})
+    return games
+
+
+# ===== HTML =====
+
+def render_rotowire_html(games: list) -> str:
+    """Страница в разметке RotoWire, которую понимает parse_lineups()."""
+    parts = ['<html><body>']
+    for game in games:
+        parts.append('<div class="lineup is-nba">')
+        parts.append(f'<div class="lineup__time">{game.get("game_time") or ""}</div>')
+        parts.append('<div class="lineup__box">')
+        for side in ('away_team', 'home_team'):
+            parts.append(f'<div class="lineup__abbr">{game[side]["abbrev"]}</div>')
+        for side in ('away_team', 'home_team'):
+            parts.append(f'<span class="lineup__wl">{game[side].get("record") or ""}</span>')
+        for side in ('away_team', 'home_team'):
+            parts.append('<ul class="lineup__list">')
+            for player in game[side]['lineup']:
+                label = STATUS_LABELS.get(player.get('status'))
+                injury = f'<span class="lineup__inj">{label}</span>' if label else ''
+                parts.append(f'<li class="lineup__player"><div class="lineup__pos">{player.get("position") or ""}</div>'
+                             f'<a>{player["name"]}</a>{injury}</li>')
+            parts.append('</ul>')
+        parts.append('</div></div>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def games_to_dict(games: list) -> dict:
+    """Как LineupsGUI.games_to_dict()."""
+    return {
+        f"{g['away_team']['abbrev']}@{g['home_team']['abbrev']}": {
+            'away_team': g['away_team'], 'home_team': g['home_team'], 'game_time': g.get('game_time')
+        }
+        for g in games
+    }
+
+
+# ===== Прогон =====
+
+class ReplayHarness:
+    """Прогон снимков через parse → diff → persist → notify."""
+
+    def __init__(self, work_dir: str, notify_ms: float = 0, queue_size: int = 50, parse_html: bool = True):
+        self.work_dir = work_dir
+        self.notify_seconds = notify_ms / 1000
+        self.parse_html = parse_html
+        self.samples = {stage: [] for stage in REPLAY_STAGES}
+        self.polls = 0
+        self.changes = 0
+        self.change_types = {}
+        self.published = 0
+
+        lineup_history.set_db_file(os.path.join(work_dir, 'lineup_history.db'))
+        self.changes_file = os.path.join(work_dir, 'changes_log.jsonl')
+        self.bus = EventBus()
+        self.bus.subscribe('notify', self._on_changes, topics=(REPLAY_TOPIC,), maxsize=queue_size)
+
+        self._previous = {}
+        self._fingerprints = None
+
+    def _on_changes(self, payload):
+        """Подписчик-уведомление: задержка доставки + имитация работы потребителя."""
+        if self.notify_seconds:
+            time.sleep(self.notify_seconds)
+        self.samples['notify'].append((time.perf_counter() - payload['published']) * 1000)
+
+    def run_poll(self, games: list, recorded_at: str, slate_date: str):
+        """Один опрос."""
+        # "Сеть": снимок приходит как HTML, как со страницы RotoWire
+        html = render_rotowire_html(games) if self.parse_html else json.dumps(games)
+        sink = io.StringIO()  # parse_lineups/record_snapshot печатают на каждом опросе
+
+        started = time.perf_counter()
+        with redirect_stdout(sink):
+            if self.parse_html:
+                parsed = parse_lineups(BeautifulSoup(html, 'html.parser'))
+            else:
+                parsed = json.loads(html)
+        parsed_at = time.perf_counter()
+
+        current = games_to_dict(parsed)
+        changes, self._fingerprints = diff_lineups(self._previous, current, self._fingerprints)
+        self._previous = current
+        diffed_at = time.perf_counter()
+
+        with redirect_stdout(sink):
+            lineup_history.record_snapshot(parsed, recorded_at=recorded_at, slate_date=slate_date)
+        if changes:
+            with open(self.changes_file, 'a', encoding='utf-8') as f:
+                for change in changes:
+                    f.write(json.dumps(change, ensure_ascii=False) + "\n")
+        persisted_at = time.perf_counter()
+
+        if changes:
+            self.bus.publish(REPLAY_TOPIC, {'published': time.perf_counter(), 'changes': changes})
+            self.published += 1
+        published_at = time.perf_counter()
+
+        self.samples['parse'].append((parsed_at - started) * 1000)
+        self.samples['diff'].append((diffed_at - parsed_at) * 1000)
+        self.samples['persist'].append((persisted_at - diffed_at) * 1000)
+        self.samples['publish'].append((published_at - persisted_at) * 1000)
+
+        self.polls += 1
+        self.changes += len(changes)
+        for change in changes:
+            self.change_types[change['type']] = self.change_types.get(change['type'], 0) + 1
+
+    def notify_stats(self) -> dict:
+        return self.bus.stats().get('notify', {})
+
+    def drain(self, timeout: float = 30):
+        """Ожидание доставки всех событий (потерянные при переполнении не ждём)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            stats = self.notify_stats()
+            if stats.get('delivered', 0) + stats.get('errors', 0) + stats.get('dropped', 0) >= self.published:
+                return
+            time.sleep(0.02)
+
+    def close(self):
+        self.bus.shutdown()
+
+
+def run_replay(args) -> dict:
+    """Прогон по аргументам командной строки, возвращает отчёт."""
+    rng = random.Random(args.seed)
+    slate_date = args.date or datetime.now().strftime('%Y-%m-%d')
+
+    if args.source == 'history':
+        snapshots = history_snapshots(slate_date)
+        if not snapshots:
+            raise SystemExit(f"Нет истории составов за {slate_date}")
+        base = None
+    else:
+        base = cached_slate() if args.source == 'cache' else synthetic_slate(args.games, rng)
+        if not base:
+            raise SystemExit("Нет игр для прогона")
+        snapshots = None
+
+    polls = len(snapshots) if snapshots else args.polls
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='replay_')
+    harness = ReplayHarness(work_dir, notify_ms=args.notify_ms, queue_size=args.queue_size,
+                            parse_html=not args.no_html)
+
+    # tracemalloc заметно замедляет прогон - для чистой пропускной способности есть --no-memory
+    if not args.no_memory:
+        tracemalloc.start()
+    memory_baseline = None
+    recorded_at = datetime.strptime(slate_date, '%Y-%m-%d').replace(hour=12)
+    current = base
+    started = time.perf_counter()
+
+    try:
+        for index in range(polls):
+            poll_started = time.perf_counter()
+            if snapshots:
+                current = snapshots[index]
+            elif index:
+                current = mutate(current, rng.randint(0, args.changes * 2), rng)
+
+            harness.run_poll(current, (recorded_at + timedelta(seconds=index)).strftime('%Y-%m-%d %H:%M:%S'),
+                             slate_date)
+            if index == 0 and tracemalloc.is_tracing():
+                memory_baseline = tracemalloc.get_traced_memory()[0]
+
+            if args.interval:
+                time.sleep(max(args.interval - (time.perf_counter() - poll_started), 0))
+
+        harness.drain()
+        elapsed = time.perf_counter() - started
+        memory_current, memory_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        notify_stats = harness.notify_stats()
+    finally:
+        tracemalloc.stop()
+        harness.close()
+
+    return {
+        'source': args.source,
+        'polls': harness.polls,
+        'games': len(current),
+        'changes': harness.changes,
+        'change_types': harness.change_types,
+        'elapsed_seconds': round(elapsed, 2),
+        'polls_per_second': round(harness.polls / elapsed, 1) if elapsed else None,
+        'changes_per_second': round(harness.changes / elapsed, 1) if elapsed else None,
+        'stages_ms': {stage: summarize_samples(values) for stage, values in harness.samples.items()},
+        'notify_published': harness.published,
+        'notify_delivered': notify_stats.get('delivered', 0),
+        'notify_dropped': notify_stats.get('dropped', 0),
+        'memory': {
+            'baseline_kb': round((memory_baseline or 0) / 1024),
+            'current_kb': round(memory_current / 1024),
+            'peak_kb': round(memory_peak / 1024),
+            'growth_kb': round((memory_current - (memory_baseline or 0)) / 1024),
+        },
+        'history_db': lineup_history.get_history_stats(),
+        'work_dir': work_dir,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Текстовый отчёт прогона."""
+    lines = [
+        f"Replay: {report['source']}, {report['polls']} polls x {report['games']} games, "
+        f"{report['changes']} changes in {report['elapsed_seconds']}s",
+        f"Throughput: {report['polls_per_second']} polls/s, {report['changes_per_second']} changes/s",
+        "Change types: " + ", ".join(f"{k}={v}" for k, v in sorted(report['change_types'].items())),
+        "",
+    ]
+    header = f"{'stage':<10}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+    lines.append(header + "   (ms)")
+    lines.append('-' * len(header))
+    for stage in REPLAY_STAGES:
+        data = report['stages_ms'][stage]
+        values = [f"{data[key]:>9.2f}" if data[key] is not None else f"{'-':>9}" for key in ('p50', 'p90', 'p99', 'max')]
+        lines.append(f"{stage:<10}{data['count']:>7}" + ''.join(values))
+
+    memory = report['memory']
+    history = report['history_db']
+    lines += [
+        "",
+        f"Notify: published {report['notify_published']}, delivered {report['notify_delivered']}, "
+        f"dropped {report['notify_dropped']}",
+        f"Memory: baseline {memory['baseline_kb']} KB, current {memory['current_kb']} KB, "
+        f"peak {memory['peak_kb']} KB, growth {memory['growth_kb']} KB",
+        f"History DB: {history['rows']} rows ({history['keyframes']} keyframes), {history['bytes'] // 1024} KB",
+        f"Work dir: {report['work_dir']}",
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон обнаружения изменений составов без сети")
+    parser.add_argument('--source', choices=['synthetic', 'cache', 'history'], default='synthetic')
+    parser.add_argument('--polls', type=int, default=300, help="Число опросов (synthetic/cache)")
+    parser.add_argument('--games', type=int, default=15, help="Игр в синтетическом слейте (>15 - несколько дат)")
+    parser.add_argument('--changes', type=int, default=2, help="Среднее число изменений на опрос")
+    parser.add_argument('--interval', type=float, default=0, help="Пауза между опросами, сек (0 - максимум)")
+    parser.add_argument('--notify-ms', type=float, default=0, help="Имитация медленного уведомления, мс")
+    parser.add_argument('--queue-size', type=int, default=50, help="Очередь подписчика уведомлений")
+    parser.add_argument('--no-html', action='store_true', help="Без этапа HTML-парсинга")
+    parser.add_argument('--no-memory', action='store_true', help="Без tracemalloc (быстрее, без отчёта о памяти)")
+    parser.add_argument('--date', help="Дата слейта YYYY-MM-DD (history)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', help="Папка для базы и журнала прогона (по умолчанию - временная)")
+    parser.add_argument('--json', help="Сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    report = run_replay(args)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Отчёт сохранён: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
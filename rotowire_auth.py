@@ -5,6 +5,7 @@ RotoWire Authenticated Scraper - парсинг лайнапов с автори
 
 import os
 import json
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from bs4 import BeautifulSoup
@@ -161,12 +162,13 @@ def check_auth_status() -> bool:
         return False
 
 
-def fetch_lineups_with_auth(date: str = "today") -> list:
+def fetch_lineups_with_auth(date: str = "today", meta: dict = None) -> list:
     """
     Fetch lineups using saved cookies (thread-safe).
 
     Args:
         date: "today" or "tomorrow"
+        meta: Optional dict, filled with response time and Last-Modified header
 
     Returns:
         List of games with lineups
@@ -193,6 +195,11 @@ def fetch_lineups_with_auth(date: str = "today") -> list:
             verify=False
         )
 
+        if meta is not None:
+            meta['fetched_at'] = time.time()
+            meta['last_modified'] = response.headers.get('Last-Modified')
+            meta['date'] = response.headers.get('Date')
+
         if response.status_code != 200:
             print(f"[ERROR] HTTP {response.status_code}")
             return []
@@ -0,0 +1,219 @@
+"""
+Stat Matrix - статистика игроков команды в массивах NumPy.
+
+Раньше средние и тренды пересчитывались из вложенных dict на каждый клик
+(_get_player_avg_stats, сборка player_stats в _on_player_click, средние
+в analyze_player_projection со своим parse_minutes).
+
+TeamStatMatrix строится один раз на загрузку статистики команды:
+- values: игроки × игры × STAT_FIELDS (float, минуты - числом);
+- played: маска "играл" (False - DNP / травма);
+- starter: маска "в старте".
+
+Игры идут как в get_team_last_n_games_stats - от последней к более
+ранним, поэтому "последние N игр" - первые N сыгранных по оси игр.
+Средние, медианы, тренды и сплиты старт/скамейка для всей команды -
+несколько операций над массивами.
+"""
+
+import re
+
+import numpy as np
+
+from player_index import PlayerIndex
+
+# Колонки матрицы (порядок фиксирован - индексы через STAT_INDEX)
+STAT_FIELDS = ('min', 'pts', 'reb', 'ast', 'stl', 'blk', 'fgm', 'fga', 'fg3m', 'fg3a', 'to')
+STAT_INDEX = {name: i for i, name in enumerate(STAT_FIELDS)}
+
+# Минуты boxscore V3 иногда приходят в ISO 8601: "PT34M12.00S"
+_ISO_MINUTES = re.compile(r'^PT(?:(\d+)M)?(?:([\d.]+)S)?$')
+
+
+def parse_minutes(min_val) -> float:
+    """Минуты из "MM:SS" / "PT34M12.00S" / числа в float (0 - не удалось разобрать)."""
+    if min_val is None:
+        return 0.0
+    if isinstance(min_val, (int, float)):
+        return float(min_val)
+    if isinstance(min_val, str):
+        if ':' in min_val:
+            try:
+                parts = min_val.split(':')
+                return int(parts[0]) + int(parts[1]) / 60
+            except ValueError:
+                return 0.0
+        match = _ISO_MINUTES.match(min_val)
+        if match:
+            return int(match.group(1) or 0) + float(match.group(2) or 0) / 60
+    try:
+        return float(min_val)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def format_minutes(minutes: float) -> str:
+    """Минуты в "MM:SS" (как в boxscore)."""
+    total_seconds = int(round(minutes * 60))
+    return f"{total_seconds // 60}:{total_seconds % 60:02d}"
+
+
+def _masked_mean(values, mask):
+    """Среднее values (…, G, S) по оси игр с маской (…, G); без игр - 0."""
+    counts = mask.sum(axis=-1)
+    sums = (values * mask[..., None]).sum(axis=-2)
+    return sums / np.maximum(counts, 1)[..., None], counts
+
+
+def last_n_mask(played, n=None):
+    """Маска первых n сыгранных игр по каждому игроку (игры от последней к ранним)."""
+    if n is None:
+        return played.copy()
+    return played & (np.cumsum(played, axis=-1) <= n)
+
+
+class TeamStatMatrix:
+    """Статистика команды: игроки × игры × STAT_FIELDS."""
+
+    def __init__(self, games=None, index: PlayerIndex = None):
+        """
+        Args:
+            games: Игры команды (get_team_last_n_games_stats()['games'])
+            index: PlayerIndex по тем же играм (None - построить)
+        """
+        games = games or []
+        self.index = index if index is not None else PlayerIndex(games)
+        self.games = [{'matchup': g.get('matchup', 'N/A'), 'date': g.get('date', '')} for g in games]
+        self.player_ids = list(self.index.names)
+        self._row_of = {player_id: row for row, player_id in enumerate(self.player_ids)}
+
+        shape = (len(self.player_ids), len(games))
+        self.values = np.zeros(shape + (len(STAT_FIELDS),), dtype=float)
+        self.played = np.zeros(shape, dtype=bool)
+        self.starter = np.zeros(shape, dtype=bool)
+
+        for row, player_id in enumerate(self.player_ids):
+            for col, player in enumerate(self.index.player_rows(self.index.names[player_id])):
+                if player is None:
+                    continue
+                self.played[row, col] = True
+                self.starter[row, col] = player.get('is_starter', True)
+                self.values[row, col] = [
+                    parse_minutes(player.get('min')) if field == 'min' else (player.get(field) or 0)
+                    for field in STAT_FIELDS
+                ]
+
+    @property
+    def names(self) -> list:
+        """Имена игроков в порядке строк матрицы."""
+        return [self.index.names[player_id] for player_id in self.player_ids]
+
+    def row(self, name):
+        """Строка матрицы игрока (имя в любом формате) или None."""
+        player_id = self.index.resolve(name)
+        return self._row_of.get(player_id) if player_id is not None else None
+
+    # ===== Вся команда =====
+
+    def averages(self, n=None, starter=None):
+        """
+        Средние по последним n сыгранным играм для всех игроков.
+
+        Args:
+            n: Сколько последних сыгранных игр (None - все)
+            starter: True - только игры в старте, False - со скамейки, None - все
+
+        Returns:
+            (средние (игроки × STAT_FIELDS), число игр (игроки,))
+        """
+        mask = self.played
+        if starter is not None:
+            mask = mask & (self.starter if starter else ~self.starter)
+        return _masked_mean(self.values, last_n_mask(mask, n))
+
+    def medians(self, n=None):
+        """Медианы по последним n сыгранным играм (игроки × STAT_FIELDS); без игр - 0."""
+        mask = last_n_mask(self.played, n)
+        if not mask.size:
+            return np.zeros((len(self.player_ids), len(STAT_FIELDS)))
+        masked = np.where(mask[..., None], self.values, np.nan)
+        empty = ~mask.any(axis=-1)
+        masked[empty] = 0  # nanmedian по пустой строке - предупреждение и nan
+        return np.nanmedian(masked, axis=-2)
+
+    def trends(self, stat='pts', n=None):
+        """
+        Наклон линейного тренда stat за игру (от ранних к последним) для всех игроков.
+
+        Считается по сыгранным играм (МНК с маской); меньше 2 игр - 0.
+        """
+        mask = last_n_mask(self.played, n).astype(float)
+        y = self.values[..., STAT_INDEX[stat]]
+        # Игры от последней к ранним - время идёт в обратную сторону
+        x = np.arange(self.played.shape[-1], 0, -1, dtype=float)
+        count = mask.sum(axis=-1)
+        sum_x = (mask * x).sum(axis=-1)
+        sum_y = (mask * y).sum(axis=-1)
+        sum_xy = (mask * x * y).sum(axis=-1)
+        sum_xx = (mask * x * x).sum(axis=-1)
+        safe_count = np.maximum(count, 1)
+        denominator = sum_xx - sum_x * sum_x / safe_count
+        slope = (sum_xy - sum_x * sum_y / safe_count) / np.where(denominator > 0, denominator, 1)
+        return np.where((count >= 2) & (denominator > 0), slope, 0.0)
+
+    def splits(self, n=None) -> dict:
+        """Сплиты старт/скамейка: {'starter': (средние, игры), 'bench': (средние, игры)}."""
+        return {'starter': self.averages(n, starter=True), 'bench': self.averages(n, starter=False)}
+
+    # ===== Один игрок =====
+
+    def player_averages(self, name, n=None) -> dict:
+        """{'games_played', 'min', 'pts', ...} по последним n сыгранным играм игрока."""
+        row = self.row(name)
+        if row is None:
+            return dict({'games_played': 0}, **{field: 0.0 for field in STAT_FIELDS})
+        mask = last_n_mask(self.played[row], n)
+        means, count = _masked_mean(self.values[row], mask)
+        result = {'games_played': int(count)}
+        result.update({field: float(means[i]) for i, field in enumerate(STAT_FIELDS)})
+        return result
+
+    def player_games(self, name) -> list:
+        """
+        Игры команды с точки зрения игрока (формат player_stats для analyze_player_projection).
+
+        Игра, в которой игрока нет в boxscore, - 'injured': True с нулями.
+        """
+        row = self.row(name)
+        result = []
+        for col, game in enumerate(self.games):
+            entry = {'matchup': game['matchup'], 'date': game['date']}
+            if row is not None and self.played[row, col]:
+                stats = self.values[row, col]
+                entry.update({field: int(stats[STAT_INDEX[field]]) for field in ('pts', 'reb', 'ast', 'stl', 'blk')})
+                entry['min'] = format_minutes(stats[STAT_INDEX['min']])
+                entry['is_starter'] = bool(self.starter[row, col])
+                entry['injured'] = False
+            else:
+                entry.update({'pts': 0, 'reb': 0, 'ast': 0, 'stl': 0, 'blk': 0, 'min': 0,
+                              'is_starter': True, 'injured': True})  # Флаг травмы
+            result.append(entry)
+        return result
+
+
+def summarize_player_games(player_stats: list) -> dict:
+    """
+    Средние по сыгранным играм из списка player_stats (см. TeamStatMatrix.player_games).
+
+    Returns:
+        {'games_played', 'min', 'pts', ...}
+    """
+    played = np.array([not g.get('injured', False) for g in player_stats], dtype=bool)
+    values = np.array([
+        [parse_minutes(g.get('min')) if field == 'min' else (g.get(field) or 0) for field in STAT_FIELDS]
+        for g in player_stats
+    ], dtype=float).reshape(len(player_stats), len(STAT_FIELDS))
+    means, count = _masked_mean(values, played)
+    result = {'games_played': int(count)}
+    result.update({field: float(means[i]) for i, field in enumerate(STAT_FIELDS)})
+    return result
@@ -0,0 +1,208 @@
+"""
+Team Analytics - скользящие средние, показатели на 36 минут и доли игроков команды.
+
+Считается по кэшированной статистике команды (games / all_players) за один
+векторизованный проход pandas groupby для всех игроков сразу:
+- скользящие средние за ROLLING_WINDOW игр (по сыгранным играм игрока);
+- показатели на 36 минут за все игры;
+- доля минут и доля владений команды (броски с игры + потери) и их
+  изменение: последние ROLLING_WINDOW игр игрока против более ранних;
+- сплиты старт / скамейка.
+
+Результат мемоизируется по (команда, версия кэша) - версия это cached_at,
+который ставится при каждой загрузке статистики (_store_team_stats).
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from player_index import PlayerIndex
+from stat_matrix import parse_minutes
+
+# Окно скользящих средних (игр)
+ROLLING_WINDOW = 3
+
+# Показатели в расчётах
+ANALYTICS_STATS = ['min', 'pts', 'reb', 'ast', 'stl', 'blk', 'fga', 'fg3a', 'to']
+ROLLING_STATS = ['min', 'pts', 'reb', 'ast']
+PER36_STATS = ['pts', 'reb', 'ast', 'stl', 'blk']
+
+# Сколько результатов хранить в памяти (команд × версий кэша)
+ANALYTICS_CACHE_SIZE = 60
+
+_analytics_cache = OrderedDict()  # (команда, cached_at, окно) -> TeamAnalytics
+_analytics_lock = threading.Lock()
+
+
+class TeamAnalytics:
+    """Аналитика команды: players - по игроку, rolling - по игре каждого игрока."""
+
+    def __init__(self, games, index: PlayerIndex = None, window=ROLLING_WINDOW):
+        """
+        Args:
+            games: Игры команды (get_team_last_n_games_stats()['games'], от последней к ранним)
+            index: PlayerIndex по тем же играм (None - построить)
+            window: Окно скользящих средних
+        """
+        games = games or []
+        self.window = window
+        self.games_count = len(games)
+        self.index = index if index is not None else PlayerIndex(games)
+
+        records = []
+        for game_index, game in enumerate(games):
+            for player in game.get('all_players', game.get('starters', [])):
+                player_id = self.index.resolve(player.get('name', ''))
+                if player_id is None:
+                    continue
+                record = {
+                    'player_id': player_id,
+                    'order': len(games) - 1 - game_index,  # 0 - самая ранняя игра
+                    'date': game.get('date', ''),
+                    'is_starter': bool(player.get('is_starter', True)),
+                }
+                for stat in ANALYTICS_STATS:
+                    record[stat] = parse_minutes(player.get('min')) if stat == 'min' else float(player.get(stat) or 0)
+                records.append(record)
+
+        self.rolling = self._compute_rolling(pd.DataFrame(records))
+        self.players = self._compute_players(self.rolling)
+
+    def _compute_rolling(self, df):
+        """Строки "игрок × игра" со скользящими средними и долями команды."""
+        if df.empty:
+            return df
+        df = df.sort_values(['player_id', 'order']).reset_index(drop=True)
+        by_player = df.groupby('player_id', sort=False)
+
+        rolling = (by_player[ROLLING_STATS]
+                   .rolling(self.window, min_periods=1).mean()
+                   .reset_index(level=0, drop=True))
+        for stat in ROLLING_STATS:
+            df[f'roll_{stat}'] = rolling[stat]
+
+        # Доли команды в игре (сумма по всем игрокам - учитывает овертаймы)
+        by_game = df.groupby('order')
+        team_min = by_game['min'].transform('sum')
+        possessions = df['fga'] + df['to']
+        team_possessions = possessions.groupby(df['order']).transform('sum')
+        df['min_share'] = (df['min'] / team_min.where(team_min > 0)).fillna(0)
+        df['usage_share'] = (possessions / team_possessions.where(team_possessions > 0)).fillna(0)
+
+        # Последние window игр игрока - "сейчас", остальные - "раньше"
+        df['recent'] = by_player.cumcount(ascending=False) < self.window
+        return df
+
+    def _compute_players(self, df):
+        """Сводка по игроку (индекс - player_id), по убыванию суммарных минут."""
+        if df.empty:
+            return pd.DataFrame()
+        by_player = df.groupby('player_id')
+        totals = by_player[ANALYTICS_STATS].sum()
+
+        players = pd.DataFrame(index=totals.index)
+        players['name'] = [self.index.names[player_id] for player_id in totals.index]
+        players['games'] = by_player.size()
+        players['min'] = totals['min'] / players['games']
+        players['pts'] = totals['pts'] / players['games']
+
+        minutes = totals['min'].where(totals['min'] > 0)
+        for stat in PER36_STATS:
+            players[f'{stat}_per36'] = (totals[stat] / minutes * 36).fillna(0)
+
+        # Последнее значение скользящего среднего (строки отсортированы по времени)
+        last = by_player[[f'roll_{stat}' for stat in ROLLING_STATS]].last()
+        players = players.join(last)
+
+        shares = df.pivot_table(index='player_id', columns='recent',
+                                values=['min_share', 'usage_share'], aggfunc='mean')
+        for share in ('min_share', 'usage_share'):
+            recent = shares[share][True] if True in shares[share] else pd.Series(dtype=float)
+            prior = shares[share][False] if False in shares[share] else pd.Series(dtype=float)
+            players[share] = by_player[share].mean()
+            players[f'{share}_change'] = recent.reindex(players.index) - prior.reindex(players.index)
+
+        splits = df.groupby(['player_id', 'is_starter'])['pts'].agg(['mean', 'size']).unstack('is_starter')
+        for is_starter, prefix in ((True, 'starter'), (False, 'bench')):
+            if ('mean', is_starter) in splits:
+                players[f'{prefix}_pts'] = splits[('mean', is_starter)]
+                players[f'{prefix}_games'] = splits[('size', is_starter)].fillna(0).astype(int)
+            else:
+                players[f'{prefix}_pts'] = float('nan')
+                players[f'{prefix}_games'] = 0
+
+        return players.sort_values('min', ascending=False)
+
+    def player(self, name):
+        """Сводка игрока (dict) по имени в любом формате или None."""
+        player_id = self.index.resolve(name)
+        if player_id is None or self.players.empty or player_id not in self.players.index:
+            return None
+        return self.players.loc[player_id].to_dict()
+
+    def summary_rows(self, limit=None) -> list:
+        """Сводка по игрокам для таблиц UI (список dict, по убыванию минут)."""
+        if self.players.empty:
+            return []
+        rows = self.players.head(limit) if limit else self.players
+        return rows.to_dict('records')
+
+
+def get_team_analytics(team_abbrev, data, index: PlayerIndex = None, window=ROLLING_WINDOW):
+    """
+    Аналитика команды с мемоизацией по (команда, версия кэша, окно).
+
+    Args:
+        team_abbrev: Аббревиатура команды
+        data: Статистика команды из кэша ({'games', 'cached_at', ...})
+        index: PlayerIndex по data['games'] (None - построить)
+    """
+    if not data:
+        return None
+    key = (team_abbrev, data.get('cached_at'), window)
+    with _analytics_lock:
+        analytics = _analytics_cache.get(key)
+        if analytics is not None:
+            _analytics_cache.move_to_end(key)
+            return analytics
+
+    analytics = TeamAnalytics(data.get('games', []), index=index, window=window)
+
+    with _analytics_lock:
+        _analytics_cache[key] = analytics
+        while len(_analytics_cache) > ANALYTICS_CACHE_SIZE:
+            _analytics_cache.popitem(last=False)
+    return analytics
+
+
+def _signed(value, scale=100, suffix=" п.п.") -> str:
+    if value is None or pd.isna(value):
+        return "нет данных"
+    return f"{value * scale:+.1f}{suffix}"
+
+
+def format_player_analytics(analytics, player_name) -> str:
+    """Блок для AI промпта: на 36 минут, скользящие средние, доли, старт/скамейка."""
+    if analytics is None:
+        return ""
+    stats = analytics.player(player_name)
+    if not stats:
+        return ""
+
+    window = analytics.window
+    text = f"\n\nРАСШИРЕННАЯ АНАЛИТИКА {player_name} (последние {analytics.games_count} игр команды):"
+    text += (f"\n- На 36 минут: {stats['pts_per36']:.1f} очков, {stats['reb_per36']:.1f} подборов, "
+             f"{stats['ast_per36']:.1f} передач")
+    text += (f"\n- Скользящее среднее ({window} игры): {stats['roll_pts']:.1f} очков, "
+             f"{stats['roll_reb']:.1f} подборов, {stats['roll_ast']:.1f} передач, {stats['roll_min']:.1f} мин")
+    text += (f"\n- Доля минут команды: {stats['min_share'] * 100:.1f}% "
+             f"(последние {window} игры vs раньше: {_signed(stats['min_share_change'])})")
+    text += (f"\n- Доля владений команды (броски + потери): {stats['usage_share'] * 100:.1f}% "
+             f"(изменение: {_signed(stats['usage_share_change'])})")
+    if stats['starter_games']:
+        text += f"\n- В старте: {stats['starter_pts']:.1f} очков за {stats['starter_games']} игр"
+    if stats['bench_games']:
+        text += f"\n- Со скамейки: {stats['bench_pts']:.1f} очков за {stats['bench_games']} игр"
+    return text
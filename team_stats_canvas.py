@@ -0,0 +1,275 @@
+"""
+Team Stats Canvas - таблица статистики команды на одном tk.Canvas.
+
+Вместо сетки из сотен tk.Label (игры × игроки × колонки) таблица
+рисуется примитивами Canvas:
+
+- build_team_stats_view(data, analytics) - модель отображения: координаты,
+  тексты, цвета и области кликов. Чистая функция без Tk - считается в
+  фоновом потоке вместе с загрузкой статистики. С TeamAnalytics сверху
+  добавляется сводка: скользящие средние, на 36 минут, доля минут.
+- TeamStatsCanvas - рисует модель. Блоки игр рисуются по мере
+  прокрутки (видимые + буфер), поэтому открытие окна не зависит от
+  числа игр. Клик и hover по имени игрока - свой hit-test по строкам.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_right
+
+# Колонки таблицы: (заголовок, ширина в px)
+STATS_COLUMNS = [
+    ('POS', 40), ('PLAYER', 170), ('MIN', 56), ('PTS', 48),
+    ('REB', 48), ('AST', 48), ('STL', 48), ('BLK', 48),
+]
+
+# Колонки сводки TeamAnalytics: (заголовок, ширина в px, ключ, формат)
+ANALYTICS_COLUMNS = [
+    ('PLAYER', 150, 'name', '{}'), ('GP', 32, 'games', '{}'), ('MIN', 44, 'min', '{:.1f}'),
+    ('L3 PTS', 50, 'roll_pts', '{:.1f}'), ('PTS/36', 50, 'pts_per36', '{:.1f}'),
+    ('REB/36', 46, 'reb_per36', '{:.1f}'), ('AST/36', 46, 'ast_per36', '{:.1f}'),
+    ('MIN%', 44, 'min_share', '{:.0%}'), ('ΔMIN%', 44, 'min_share_change', '{:+.0%}'),
+]
+
+# Сколько игроков показывать в сводке
+ANALYTICS_ROWS_LIMIT = 12
+
+# Вертикальные размеры (px)
+GAME_HEADER_HEIGHT = 36
+TABLE_HEADER_HEIGHT = 22
+ROW_HEIGHT = 22
+BLOCK_GAP = 16
+PADDING = 5
+
+# Сколько px сверх видимой области дорисовывать заранее
+DRAW_BUFFER_PX = 400
+
+NAME_COLOR = '#9b59b6'
+NAME_HOVER_COLOR = '#c39bd3'
+
+
+def _format_cell(fmt, value) -> str:
+    if value is None or value != value:  # None / NaN
+        return '-'
+    return fmt.format(value)
+
+
+def _analytics_block(analytics, top, width) -> dict:
+    """Блок сводки TeamAnalytics (без кликабельных строк)."""
+    shapes = []
+    right = width - PADDING
+    rows = analytics.summary_rows(ANALYTICS_ROWS_LIMIT)
+    bottom = top + GAME_HEADER_HEIGHT + PADDING + TABLE_HEADER_HEIGHT + ROW_HEIGHT * len(rows) + PADDING
+    shapes.append(('rect', PADDING, top, right, bottom, '#16213e'))
+    shapes.append(('rect', PADDING, top, right, top + GAME_HEADER_HEIGHT, '#0f3460'))
+    shapes.append(('text', PADDING + 10, top + GAME_HEADER_HEIGHT / 2,
+                   f"Rolling {analytics.window} / per-36 | last {analytics.games_count} games",
+                   'white', ('Arial', 11, 'bold'), 'w', None))
+
+    x0 = 2 * PADDING
+    row_top = top + GAME_HEADER_HEIGHT + PADDING
+    table_width = sum(col[1] for col in ANALYTICS_COLUMNS)
+    shapes.append(('rect', x0, row_top, x0 + table_width, row_top + TABLE_HEADER_HEIGHT, '#0f3460'))
+    x = x0
+    for title, col_width, _, _ in ANALYTICS_COLUMNS:
+        shapes.append(('text', x + col_width / 2, row_top + TABLE_HEADER_HEIGHT / 2, title,
+                       '#a0a0a0', ('Arial', 9, 'bold'), 'center', None))
+        x += col_width
+
+    row_top += TABLE_HEADER_HEIGHT
+    for row in rows:
+        mid = row_top + ROW_HEIGHT / 2
+        x = x0
+        for title, col_width, key, fmt in ANALYTICS_COLUMNS:
+            value = row.get(key)
+            if key == 'name':
+                shapes.append(('text', x + 4, mid, str(value)[:16], 'white', ('Consolas', 10), 'w', None))
+            else:
+                color = 'white'
+                if key == 'min_share_change' and value == value and value is not None and abs(value) >= 0.02:
+                    color = '#6bcb77' if value > 0 else '#ff6b6b'
+                shapes.append(('text', x + col_width / 2, mid, _format_cell(fmt, value), color,
+                               ('Consolas', 10), 'center', None))
+            x += col_width
+        row_top += ROW_HEIGHT
+
+    return {'top': top, 'bottom': bottom, 'shapes': shapes}
+
+
+def build_team_stats_view(data: dict, analytics=None) -> dict:
+    """
+    Модель отображения таблицы статистики команды.
+
+    Args:
+        data: Результат get_team_last_n_games_stats ({'team', 'games': [...]})
+        analytics: TeamAnalytics команды (None - без сводки)
+
+    Returns:
+        {'width', 'height',
+         'blocks': [{'top', 'bottom', 'shapes': [...]}],
+         'rows': [{'top', 'bottom', 'x0', 'x1', 'name', 'position', 'block'}]}
+        shapes: ('rect', x0, y0, x1, y1, fill) / ('text', x, y, text, fill, font, anchor, row)
+        row - индекс в rows для имени игрока (для hover), иначе None
+    """
+    table_width = sum(width for _, width in STATS_COLUMNS)
+    width = table_width + 4 * PADDING
+    blocks = []
+    rows = []
+    y = PADDING
+
+    if analytics is not None and analytics.summary_rows(1):
+        blocks.append(_analytics_block(analytics, y, width))
+        y = blocks[-1]['bottom'] + BLOCK_GAP
+
+    for i, game in enumerate(data.get('games', [])):
+        top = y
+        shapes = []
+        right = width - PADDING
+        starters = game.get('starters', [])
+        bottom = top + GAME_HEADER_HEIGHT + PADDING + TABLE_HEADER_HEIGHT + ROW_HEIGHT * len(starters) + PADDING
+        shapes.append(('rect', PADDING, top, right, bottom, '#16213e'))
+
+        # Заголовок игры
+        result = game.get('result', '')
+        result_color = '#6bcb77' if result == 'W' else '#ff6b6b'
+        header_mid = top + GAME_HEADER_HEIGHT / 2
+        shapes.append(('rect', PADDING, top, right, top + GAME_HEADER_HEIGHT, '#0f3460'))
+        shapes.append(('text', PADDING + 10, header_mid,
+                       f"Game {i+1}: {game.get('matchup', '')} | {game.get('date', '')}",
+                       'white', ('Arial', 11, 'bold'), 'w', None))
+        shapes.append(('text', right - 15, header_mid, result, result_color, ('Arial', 14, 'bold'), 'e', None))
+
+        # Заголовок таблицы
+        x0 = 2 * PADDING
+        row_top = top + GAME_HEADER_HEIGHT + PADDING
+        shapes.append(('rect', x0, row_top, x0 + table_width, row_top + TABLE_HEADER_HEIGHT, '#0f3460'))
+        x = x0
+        for title, col_width in STATS_COLUMNS:
+            shapes.append(('text', x + col_width / 2, row_top + TABLE_HEADER_HEIGHT / 2, title,
+                           '#a0a0a0', ('Arial', 9, 'bold'), 'center', None))
+            x += col_width
+
+        # Строки с игроками
+        row_top += TABLE_HEADER_HEIGHT
+        for starter in starters:
+            mid = row_top + ROW_HEIGHT / 2
+            pts, reb, ast = starter.get('pts', 0), starter.get('reb', 0), starter.get('ast', 0)
+            values = [
+                (starter.get('position', ''), 'white'),
+                None,  # Имя - отдельно (кликабельное)
+                (starter.get('min') or '-', '#a0a0a0'),
+                (str(pts), '#ffd93d' if pts >= 20 else 'white'),
+                (str(reb), '#6bcb77' if reb >= 10 else 'white'),
+                (str(ast), '#4fc3f7' if ast >= 8 else 'white'),
+                (str(starter.get('stl', 0)), 'white'),
+                (str(starter.get('blk', 0)), 'white'),
+            ]
+
+            x = x0
+            for value, (_, col_width) in zip(values, STATS_COLUMNS):
+                if value is None:
+                    rows.append({
+                        'top': row_top, 'bottom': row_top + ROW_HEIGHT,
+                        'x0': x, 'x1': x + col_width,
+                        'name': starter.get('name', ''), 'position': starter.get('position', ''),
+                        'block': len(blocks),
+                    })
+                    shapes.append(('text', x + 4, mid, starter.get('name', '')[:18], NAME_COLOR,
+                                   ('Consolas', 10, 'underline'), 'w', len(rows) - 1))
+                else:
+                    shapes.append(('text', x + col_width / 2, mid, value[0], value[1],
+                                   ('Consolas', 10), 'center', None))
+                x += col_width
+            row_top += ROW_HEIGHT
+
+        blocks.append({'top': top, 'bottom': bottom, 'shapes': shapes})
+        y = bottom + BLOCK_GAP
+
+    return {'width': width, 'height': y, 'blocks': blocks, 'rows': rows}
+
+
+class TeamStatsCanvas:
+    """Отрисовка модели build_team_stats_view с кликом/hover по именам игроков."""
+
+    def __init__(self, parent, view, on_player_click=None, bg='#1a1a2e'):
+        self.view = view
+        self.on_player_click = on_player_click
+
+        self.frame = tk.Frame(parent, bg=bg)
+        self.canvas = tk.Canvas(self.frame, bg=bg, highlightthickness=0, width=view['width'])
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll,
+                              scrollregion=(0, 0, view['width'], view['height']))
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self._block_tops = [block['top'] for block in view['blocks']]
+        self._row_tops = [row['top'] for row in view['rows']]
+        self._drawn = set()       # индексы нарисованных блоков
+        self._name_items = {}     # индекс строки -> id текста имени
+        self._hover_row = None
+
+        self.canvas.bind('<Configure>', lambda e: self._draw_visible())
+        self.canvas.bind('<Motion>', self._on_motion)
+        self.canvas.bind('<Leave>', lambda e: self._set_hover(None))
+        self.canvas.bind('<Button-1>', self._on_click)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._draw_visible()
+
+    def _draw_visible(self):
+        """Рисует ещё не нарисованные блоки в видимой области (+ буфер)."""
+        top = self.canvas.canvasy(0) - DRAW_BUFFER_PX
+        bottom = self.canvas.canvasy(self.canvas.winfo_height()) + DRAW_BUFFER_PX
+        first = max(bisect_right(self._block_tops, top) - 1, 0)
+        last = bisect_right(self._block_tops, bottom)
+        for index in range(first, last):
+            if index not in self._drawn and self.view['blocks'][index]['bottom'] >= top:
+                self._draw_block(index)
+
+    def _draw_block(self, index):
+        self._drawn.add(index)
+        for shape in self.view['blocks'][index]['shapes']:
+            if shape[0] == 'rect':
+                _, x0, y0, x1, y1, fill = shape
+                self.canvas.create_rectangle(x0, y0, x1, y1, fill=fill, width=0)
+            else:
+                _, x, y, text, fill, font, anchor, row = shape
+                item = self.canvas.create_text(x, y, text=text, fill=fill, font=font, anchor=anchor)
+                if row is not None:
+                    self._name_items[row] = item
+
+    def _row_at(self, event):
+        """Индекс строки, по имени игрока в которой находится курсор (или None)."""
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        index = bisect_right(self._row_tops, y) - 1
+        if index < 0:
+            return None
+        row = self.view['rows'][index]
+        if y < row['bottom'] and row['x0'] <= x < row['x1']:
+            return index
+        return None
+
+    def _set_hover(self, index):
+        if index == self._hover_row:
+            return
+        if self._hover_row in self._name_items:
+            self.canvas.itemconfigure(self._name_items[self._hover_row], fill=NAME_COLOR)
+        if index in self._name_items:
+            self.canvas.itemconfigure(self._name_items[index], fill=NAME_HOVER_COLOR)
+        self.canvas.configure(cursor='hand2' if index is not None else '')
+        self._hover_row = index
+
+    def _on_motion(self, event):
+        self._set_hover(self._row_at(event))
+
+    def _on_click(self, event):
+        index = self._row_at(event)
+        if index is not None and self.on_player_click:
+            row = self.view['rows'][index]
+            self.on_player_click(row['name'], row['position'])
@@ -0,0 +1,58 @@
+"""Тесты PlayerIndex: поиск игроков в статистике команды."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from player_index import PlayerIndex, match_players_by_lastname
+
+
+def _game(*players):
+    return {'all_players': [{'name': name, 'player_id': pid, 'pts': pts} for name, pid, pts in players]}
+
+
+def _okc_games():
+    # Jalen и Jaylin Williams - одна фамилия и первая буква в одной команде
+    return [
+        _game(('Jaylin Williams', 1631119, 4), ('Jalen Williams', 1631114, 22)),
+        _game(('Jalen Williams', 1631114, 30)),
+    ]
+
+
+def test_full_name_resolves_exact_player_with_same_initial():
+    index = PlayerIndex(_okc_games())
+
+    assert index.resolve('Jalen Williams') == 1631114
+    assert index.resolve('Jaylin Williams') == 1631119
+    assert [row and row['pts'] for row in index.player_rows('Jalen Williams')] == [22, 30]
+    assert [row and row['pts'] for row in index.player_rows('Jaylin Williams')] == [4, None]
+
+
+def test_full_name_does_not_fall_back_to_other_first_name():
+    index = PlayerIndex([_game(('Jaylin Williams', 1631119, 4))])
+
+    assert index.resolve('Jalen Williams') is None
+    assert index.resolve('J. Williams') == 1631119
+
+
+def test_abbreviation_and_short_first_name():
+    index = PlayerIndex([_game(('Shai Gilgeous-Alexander', 1628983, 31), ('Nicolas Claxton', 1629651, 10))])
+
+    assert index.resolve('S. Gilgeous-Alexander') == 1628983
+    assert index.resolve('Nic Claxton') == 1629651
+
+
+def test_ambiguous_surnames_need_full_name():
+    index = PlayerIndex([_game(('Stephen Curry', 201939, 28))])
+
+    assert index.resolve('Seth Curry') is None
+    assert index.resolve('S. Curry') == 201939
+
+
+def test_match_players_by_lastname():
+    new_players, removed_players = match_players_by_lastname(
+        ['J. Williams', 'C. Holmgren'], ['Jalen Williams', 'Luguentz Dort'])
+
+    assert new_players == ['C. Holmgren']
+    assert removed_players == ['Luguentz Dort']
@@ -0,0 +1,168 @@
+"""
+UI Dispatch - передача обновлений из фоновых потоков в Tk.
+
+Вместо root.after(0, ...) на каждое обновление фоновые потоки кладут
+колбэки в одну потокобезопасную очередь, которую разбирает один
+периодический Tk колбэк (drain). Tk вызывается только из UI потока.
+
+- post(callback, key=...) - обновления одной цели схлопываются: пока
+  колбэк не выполнен, новый с тем же key заменяет старый (выполнится
+  только последний текст статуса, а не все промежуточные).
+- За один кадр выполняется не больше UI_DISPATCH_MAX_PER_FRAME колбэков
+  и не дольше UI_DISPATCH_FRAME_BUDGET_MS - остальное ждёт следующего
+  кадра, ввод и перерисовка не блокируются.
+- С UIWatchdog каждый колбэк замеряется по отдельности (иначе все они
+  были бы одним _drain в гистограмме).
+- TextStream - потоковый текст (ответ AI по токенам): фрагменты копятся
+  в буфере, в виджет вставляются одним куском за кадр.
+"""
+
+import time
+import threading
+from collections import deque
+
+from ui_watchdog import callback_name
+
+# Период разбора очереди (мс)
+UI_DISPATCH_INTERVAL_MS = 20
+
+# Ограничения на один кадр
+UI_DISPATCH_MAX_PER_FRAME = 50
+UI_DISPATCH_FRAME_BUDGET_MS = 8
+
+
+class UIDispatcher:
+    """Очередь колбэков для UI потока с коалесценцией по ключу."""
+
+    def __init__(self, root, interval_ms=UI_DISPATCH_INTERVAL_MS,
+                 max_per_frame=UI_DISPATCH_MAX_PER_FRAME, frame_budget_ms=UI_DISPATCH_FRAME_BUDGET_MS,
+                 watchdog=None):
+        self.root = root
+        self.watchdog = watchdog
+        self.interval_ms = interval_ms
+        self.max_per_frame = max_per_frame
+        self.frame_budget = frame_budget_ms / 1000
+        self._lock = threading.Lock()
+        self._order = deque()   # ключи в порядке первой постановки
+        self._pending = {}      # key -> последний колбэк
+        self._job = None
+        self.stats = {'posted': 0, 'coalesced': 0, 'executed': 0, 'errors': 0,
+                      'frames': 0, 'max_backlog': 0}
+
+    def start(self):
+        """Запуск периодического разбора (вызывать из UI потока)."""
+        if self._job is None:
+            self._job = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def post(self, callback, key=None):
+        """
+        Поставить колбэк в очередь UI (из любого потока).
+
+        Args:
+            callback: Функция без аргументов
+            key: Цель обновления (например 'status'); колбэк с тем же key,
+                 ещё не выполненный, заменяется - выполнится только последний
+                 (на месте первого в очереди)
+        """
+        with self._lock:
+            self.stats['posted'] += 1
+            if key is None:
+                key = object()  # Уникальный ключ - без схлопывания
+            if key in self._pending:
+                self.stats['coalesced'] += 1
+            else:
+                self._order.append(key)
+            self._pending[key] = callback
+            backlog = len(self._order)
+            if backlog > self.stats['max_backlog']:
+                self.stats['max_backlog'] = backlog
+
+    @property
+    def backlog(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+    def _take(self):
+        with self._lock:
+            if not self._order:
+                return None
+            return self._pending.pop(self._order.popleft())
+
+    def _drain(self):
+        """Выполнение колбэков в пределах лимитов кадра и перепланирование."""
+        deadline = time.perf_counter() + self.frame_budget
+        executed = 0
+        while executed < self.max_per_frame and time.perf_counter() < deadline:
+            callback = self._take()
+            if callback is None:
+                break
+            executed += 1
+            try:
+                if self.watchdog is not None:
+                    with self.watchdog.track(callback_name(callback)):
+                        callback()
+                else:
+                    callback()
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"[UI] Ошибка в колбэке UI: {e}")
+
+        self.stats['executed'] += executed
+        if executed:
+            self.stats['frames'] += 1
+
+        # Остался хвост - следующий кадр сразу, иначе - по обычному интервалу
+        self._job = self.root.after(1 if self.backlog else self.interval_ms, self._drain)
+
+    def get_stats_report(self) -> str:
+        stats = self.stats
+        return (f"UI dispatch: posted {stats['posted']}, coalesced {stats['coalesced']}, "
+                f"executed {stats['executed']} in {stats['frames']} frames, "
+                f"max backlog {stats['max_backlog']}, errors {stats['errors']}")
+
+
+class TextStream:
+    """
+    Потоковый текст из фонового потока в UI: фрагменты склеиваются до кадра.
+
+    feed() вызывается из рабочего потока на каждый фрагмент; flush ставится
+    в UIDispatcher с одним key, поэтому за кадр выполняется одна вставка
+    всего накопленного текста, сколько бы фрагментов ни пришло.
+    """
+
+    def __init__(self, dispatcher: UIDispatcher, on_text, key=None):
+        """
+        Args:
+            dispatcher: UIDispatcher окна
+            on_text: Колбэк UI потока (накопленный текст) - дописать в виджет
+            key: Ключ коалесценции (по умолчанию - свой для каждого потока)
+        """
+        self.dispatcher = dispatcher
+        self.on_text = on_text
+        self.key = key if key is not None else ('text_stream', id(self))
+        self._lock = threading.Lock()
+        self._buffer = []
+        self.chunks = 0
+        self.flushes = 0
+
+    def feed(self, delta: str):
+        """Фрагмент текста (из любого потока)."""
+        if not delta:
+            return
+        with self._lock:
+            self._buffer.append(delta)
+            self.chunks += 1
+        self.dispatcher.post(self._flush, key=self.key)
+
+    def _flush(self):
+        with self._lock:
+            text = "".join(self._buffer)
+            self._buffer.clear()
+        if text:
+            self.flushes += 1
+            self.on_text(text)
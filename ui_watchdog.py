@@ -0,0 +1,228 @@
+"""
+UI Watchdog - зависания цикла событий Tk и время выполнения колбэков.
+
+- Heartbeat: периодический root.after; задержка его срабатывания - это
+  время, на которое UI поток был занят (lag).
+- Отдельный поток следит за heartbeat: если UI не отвечает дольше
+  STALL_THRESHOLD_MS, снимается стек главного потока
+  (sys._current_frames) и запоминается, какой колбэк выполнялся.
+- Каждый Python колбэк Tk (after, bind, command) замеряется: tkinter
+  вызывает их через tkinter.CallWrapper, который подменяется на
+  замеряющий. Колбэки UIDispatcher замеряются по отдельности.
+- Скользящая гистограмма длительностей и топ колбэков по суммарному
+  времени - в окне UI Diagnostics.
+"""
+
+import sys
+import json
+import time
+import threading
+import traceback
+import tkinter
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from latency import summarize_samples
+
+# Файл с зависаниями и статистикой колбэков (кнопка Save JSON)
+UI_WATCHDOG_FILE = "ui_watchdog.json"  # Сохраняем в текущую директорию
+
+# Период heartbeat и порог зависания (мс)
+HEARTBEAT_INTERVAL_MS = 100
+STALL_THRESHOLD_MS = 500
+
+# Сколько последних замеров колбэков и зависаний хранить
+CALLBACK_WINDOW = 2000
+MAX_STALLS = 50
+
+# Сколько последних кадров стека сохранять
+STACK_DEPTH = 12
+
+# Границы корзин гистограммы (мс)
+HISTOGRAM_BUCKETS_MS = (4, 16, 50, 100, 250, 500, 1000)
+
+_HEARTBEAT_NAME = 'UIWatchdog._beat'
+
+
+def callback_name(func) -> str:
+    """Читаемое имя колбэка (after() оборачивает функцию в callit - берём исходную)."""
+    if getattr(func, '__qualname__', '').endswith('after.<locals>.callit') and func.__closure__:
+        for cell in func.__closure__:
+            try:
+                contents = cell.cell_contents
+            except ValueError:
+                continue
+            if callable(contents) and not isinstance(contents, tkinter.Misc):
+                func = contents
+                break
+    return getattr(func, '__qualname__', None) or repr(func)
+
+
+class _TimedCallWrapper(tkinter.CallWrapper):
+    """CallWrapper, замеряющий каждый колбэк через активный UIWatchdog."""
+
+    watchdog = None
+
+    def __call__(self, *args):
+        watchdog = _TimedCallWrapper.watchdog
+        if watchdog is None:
+            return super().__call__(*args)
+        with watchdog.track(callback_name(self.func)):
+            return super().__call__(*args)
+
+
+class UIWatchdog:
+    """Heartbeat + поток-наблюдатель + замеры колбэков UI потока."""
+
+    def __init__(self, root, interval_ms=HEARTBEAT_INTERVAL_MS, stall_ms=STALL_THRESHOLD_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self._main_ident = threading.get_ident()  # Создаётся в UI потоке
+        self._lock = threading.Lock()
+        self._active = []  # Стек выполняющихся колбэков: [(name, started)]
+        self._durations = deque(maxlen=CALLBACK_WINDOW)  # (name, ms)
+        self._lags = deque(maxlen=CALLBACK_WINDOW)
+        self.stalls = deque(maxlen=MAX_STALLS)
+        self._open_stall = None
+        self._last_beat = time.perf_counter()
+
+    def start(self):
+        """Подмена CallWrapper, запуск heartbeat и потока-наблюдателя (из UI потока)."""
+        _TimedCallWrapper.watchdog = self
+        tkinter.CallWrapper = _TimedCallWrapper
+        self._last_beat = time.perf_counter()
+        self.root.after(self.interval_ms, self._beat)
+        thread = threading.Thread(target=self._monitor_loop, name='ui-watchdog', daemon=True)
+        thread.start()
+
+    # ===== Замеры колбэков =====
+
+    @contextmanager
+    def track(self, name):
+        """Замер колбэка UI потока (вложенные колбэки - стеком)."""
+        started = time.perf_counter()
+        self._active.append((name, started))
+        try:
+            yield
+        finally:
+            self._active.pop()
+            if name != _HEARTBEAT_NAME:
+                self._durations.append((name, (time.perf_counter() - started) * 1000))
+
+    # ===== Heartbeat =====
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = max((now - self._last_beat) * 1000 - self.interval_ms, 0)
+        self._lags.append(lag)
+        with self._lock:
+            self._last_beat = now
+            stall, self._open_stall = self._open_stall, None
+        if stall is not None:
+            stall['duration_ms'] = round(lag)
+            print(f"[WATCHDOG] UI снова отвечает: зависание {stall['duration_ms']}мс в {stall['callback']}")
+        self.root.after(self.interval_ms, self._beat)
+
+    def _monitor_loop(self):
+        while True:
+            time.sleep(self.stall_ms / 4000)
+            with self._lock:
+                blocked = (time.perf_counter() - self._last_beat) * 1000 - self.interval_ms
+                if blocked < self.stall_ms or self._open_stall is not None:
+                    continue
+                stall = self._capture_stall(blocked)
+                self._open_stall = stall
+                self.stalls.append(stall)
+            print(f"[WATCHDOG] UI не отвечает {blocked:.0f}мс: {stall['callback']}")
+
+    def _capture_stall(self, blocked_ms) -> dict:
+        """Стек главного потока и выполняющиеся колбэки в момент зависания."""
+        frame = sys._current_frames().get(self._main_ident)
+        stack = [line.rstrip() for line in traceback.format_stack(frame)[-STACK_DEPTH:]] if frame else []
+        active = [name for name, _ in list(self._active)]
+        return {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'callback': active[-1] if active else '(вне Python колбэков)',
+            'callbacks': active,
+            'detected_after_ms': round(blocked_ms),
+            'duration_ms': None,  # Заполняется при следующем heartbeat
+            'stack': stack,
+        }
+
+    # ===== Отчёты =====
+
+    def get_callback_stats(self) -> dict:
+        """{имя колбэка: {'count', 'total_ms', 'p50', 'p90', 'p99', 'max'}} по скользящему окну."""
+        by_name = {}
+        for name, duration in list(self._durations):
+            by_name.setdefault(name, []).append(duration)
+        stats = {}
+        for name, values in by_name.items():
+            summary = summarize_samples(values)
+            summary['total_ms'] = sum(values)
+            stats[name] = summary
+        return stats
+
+    def get_histogram(self) -> list:
+        """[(подпись корзины, число колбэков)] по скользящему окну."""
+        bounds = HISTOGRAM_BUCKETS_MS
+        counts = [0] * (len(bounds) + 1)
+        for _, duration in list(self._durations):
+            index = next((i for i, bound in enumerate(bounds) if duration < bound), len(bounds))
+            counts[index] += 1
+        labels = [f"<{bound}ms" for bound in bounds] + [f">={bounds[-1]}ms"]
+        return list(zip(labels, counts))
+
+    def format_report(self, top=15) -> str:
+        lines = []
+        lag = summarize_samples(list(self._lags))
+        if lag['count']:
+            lines.append(f"Heartbeat lag ({lag['count']} beats): p50 {lag['p50']:.0f}ms, p90 {lag['p90']:.0f}ms, "
+                         f"p99 {lag['p99']:.0f}ms, max {lag['max']:.0f}ms")
+        else:
+            lines.append("Heartbeat lag: no data")
+
+        lines.append("")
+        lines.append(f"Callback durations (last {CALLBACK_WINDOW})")
+        histogram = self.get_histogram()
+        peak = max((count for _, count in histogram), default=0) or 1
+        for label, count in histogram:
+            lines.append(f"{label:>9} {count:>6} {'#' * round(40 * count / peak)}")
+
+        lines.append("")
+        header = f"{'callback':<52}{'count':>6}{'total':>9}{'p50':>7}{'p99':>7}{'max':>7}"
+        lines.append(header)
+        lines.append('-' * len(header))
+        stats = sorted(self.get_callback_stats().items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        for name, data in stats[:top]:
+            lines.append(f"{name[-52:]:<52}{data['count']:>6}{data['total_ms']:>9.0f}"
+                         f"{data['p50']:>7.1f}{data['p99']:>7.1f}{data['max']:>7.0f}")
+
+        lines.append("")
+        stalls = list(self.stalls)
+        lines.append(f"Stalls > {self.stall_ms}ms: {len(stalls)}")
+        for stall in reversed(stalls[-5:]):
+            duration = f"{stall['duration_ms']}ms" if stall['duration_ms'] is not None else "ongoing"
+            lines.append(f"  {stall['at']}  {duration}  {stall['callback']}")
+            lines.extend(f"      {line.splitlines()[0].strip()}" for line in stall['stack'][-4:])
+        return "\n".join(lines)
+
+    def dump(self, path=UI_WATCHDOG_FILE) -> str:
+        """Сохранение зависаний и статистики колбэков в JSON."""
+        data = {
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'heartbeat_lag_ms': summarize_samples(list(self._lags)),
+            'callbacks': self.get_callback_stats(),
+            'histogram': self.get_histogram(),
+            'stalls': list(self.stalls),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+    def reset(self):
+        self._durations.clear()
+        self._lags.clear()
+        self.stalls.clear()
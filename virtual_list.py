@@ -0,0 +1,284 @@
+"""
+VirtualList - виртуализированный список на Canvas.
+
+Виджеты создаются только для строк в видимой области плюс небольшой
+буфер сверху и снизу. Строки, ушедшие из вида, уходят в пул и
+переиспользуются под другие элементы, поэтому число виджетов, память и
+время первой отрисовки не зависят от длины списка (сотни новостей,
+слейт на несколько дней).
+
+- Высота строк переменная: отрисованная строка измеряется, высота
+  кэшируется по ключу элемента; для неизмеренных - estimated_height.
+- set_items() при обновлении данных сохраняет позицию прокрутки: верхний
+  видимый элемент остаётся на месте, даже если выше появились новые.
+
+Колбэки:
+    create_row(parent, item) -> widget
+    update_row(widget, item, same_key) -> bool
+        same_key=True  - тот же элемент, данные изменились (точечная правка)
+        same_key=False - виджет из пула под другой элемент
+        вернуть False  - переиспользовать нельзя, виджет будет пересоздан
+    release_row(widget, key) - виджет больше не показывает key (очистка ссылок)
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_right
+
+# Сколько строк держать сверх видимых сверху и снизу
+VIRTUAL_LIST_BUFFER_ROWS = 3
+
+# Сколько свободных виджетов хранить в пуле для переиспользования
+VIRTUAL_LIST_POOL_SIZE = 10
+
+# Сколько раз за отрисовку уточнять раскладку после измерения строк
+_MAX_LAYOUT_PASSES = 3
+
+
+class VirtualList:
+    """Прокручиваемый список, который держит виджеты только для видимых строк."""
+
+    def __init__(self, parent, create_row, update_row=None, release_row=None, key=None,
+                 estimated_height=100, row_gap=5, padx=5, bg='#1a1a2e', recycle=True,
+                 buffer_rows=VIRTUAL_LIST_BUFFER_ROWS, **canvas_options):
+        self.frame = tk.Frame(parent, bg=bg)
+        self.canvas = tk.Canvas(self.frame, bg=bg, highlightthickness=0, **canvas_options)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        self._create_row = create_row
+        self._update_row = update_row
+        self._release_row = release_row
+        self._key = key
+        self.estimated_height = estimated_height
+        self.row_gap = row_gap
+        self.padx = padx
+        self.bg = bg
+        self.recycle = recycle and update_row is not None
+        self.buffer_rows = buffer_rows
+
+        self._items = []
+        self._keys = []
+        self._index = {}      # key -> позиция в списке
+        self._heights = {}    # key -> измеренная высота строки
+        self._offsets = [row_gap]  # y начала каждой строки; последний элемент - полная высота
+        self._rows = {}       # key -> [widget, window_id, item] - отрисованные строки
+        self._dirty = set()   # отрисованные ключи, у которых сменились данные
+        self._pool = []       # [(widget, window_id)] - скрытые строки для переиспользования
+        self._message = None  # (label, window_id) - сообщение вместо списка
+        self._width = 1
+        self._render_pending = False
+        self._rendering = False
+
+        self.canvas.bind('<Configure>', self._on_configure)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    @property
+    def rendered_count(self) -> int:
+        """Сколько строк сейчас имеют виджеты."""
+        return len(self._rows)
+
+    # ===== Данные =====
+
+    def set_items(self, items, keep_position=True):
+        """
+        Новые данные списка.
+
+        Отрисованные строки с тем же ключом правятся через update_row,
+        остальные создаются/переиспользуются при отрисовке.
+
+        Args:
+            items: Элементы в порядке отображения (ключи должны быть уникальны)
+            keep_position: Оставить верхний видимый элемент на месте (иначе - в начало)
+        """
+        anchor = self._anchor() if keep_position else None
+        self._clear_message()
+
+        self._items = list(items)
+        self._keys = [self._key(item) if self._key else index for index, item in enumerate(self._items)]
+        self._index = {key: index for index, key in enumerate(self._keys)}
+        self._heights = {key: height for key, height in self._heights.items() if key in self._index}
+
+        for key, row in self._rows.items():
+            index = self._index.get(key)
+            if index is None:
+                continue
+            item = self._items[index]
+            # Тот же объект мог измениться на месте - тоже правим
+            if item is row[2] or item != row[2]:
+                row[2] = item
+                self._dirty.add(key)
+
+        self._compute_offsets()
+        self._update_scrollregion()
+        if anchor:
+            self._restore_anchor(anchor)
+        else:
+            self.canvas.yview_moveto(0)
+        self._render()
+
+    def show_message(self, text, fg='#a0a0a0', font=('Arial', 12)):
+        """Сообщение вместо списка (загрузка, ошибка, пусто)."""
+        self.set_items([], keep_position=False)
+        label = tk.Label(self.canvas, text=text, font=font, fg=fg, bg=self.bg,
+                         justify='center', pady=30)
+        window = self.canvas.create_window(self.padx, self.row_gap, window=label, anchor='nw',
+                                           width=self._row_width())
+        self._message = (label, window)
+
+    def _clear_message(self):
+        if self._message:
+            label, window = self._message
+            self.canvas.delete(window)
+            label.destroy()
+            self._message = None
+
+    # ===== Раскладка =====
+
+    def _row_width(self) -> int:
+        return max(self._width - 2 * self.padx, 1)
+
+    def _compute_offsets(self):
+        offsets = [self.row_gap]
+        y = self.row_gap
+        for key in self._keys:
+            y += self._heights.get(key, self.estimated_height) + self.row_gap
+            offsets.append(y)
+        self._offsets = offsets
+
+    def _update_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self._width, max(self._offsets[-1], 1)))
+
+    def _visible_range(self) -> tuple:
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        count = len(self._keys)
+        first = max(bisect_right(self._offsets, top) - 1 - self.buffer_rows, 0)
+        last = min(bisect_right(self._offsets, bottom) + self.buffer_rows, count)
+        return first, last
+
+    def _anchor(self):
+        """(ключ верхней видимой строки, смещение от её начала до края окна)."""
+        if not self._keys:
+            return None
+        top = self.canvas.canvasy(0)
+        index = min(max(bisect_right(self._offsets, top) - 1, 0), len(self._keys) - 1)
+        return self._keys[index], top - self._offsets[index]
+
+    def _restore_anchor(self, anchor):
+        key, delta = anchor
+        index = self._index.get(key)
+        total = self._offsets[-1]
+        if index is None or total <= 0:
+            return
+        self.canvas.yview_moveto(max(self._offsets[index] + delta, 0) / total)
+
+    # ===== Отрисовка =====
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_render()
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            for _, window, _ in self._rows.values():
+                self.canvas.itemconfigure(window, width=self._row_width())
+            if self._message:
+                self.canvas.itemconfigure(self._message[1], width=self._row_width())
+            self._update_scrollregion()
+        self._schedule_render()
+
+    def _schedule_render(self):
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self._render)
+
+    def _render(self):
+        """Привязка виджетов к видимым строкам, измерение и раскладка."""
+        self._render_pending = False
+        if self._rendering:
+            return
+        self._rendering = True
+        try:
+            for _ in range(_MAX_LAYOUT_PASSES):
+                first, last = self._visible_range()
+                wanted = set(self._keys[first:last])
+
+                for key in [k for k in self._rows if k not in wanted]:
+                    self._release(key)
+
+                measure = []
+                for index in range(first, last):
+                    key = self._keys[index]
+                    if key not in self._rows:
+                        self._rows[key] = self._bind(key, self._items[index])
+                        measure.append(key)
+                    elif key in self._dirty:
+                        widget, window, item = self._rows[key]
+                        if not self._update_row or not self._update_row(widget, item, True):
+                            self._release(key)
+                            self._rows[key] = self._bind(key, item)
+                        measure.append(key)
+                self._dirty.clear()
+
+                if not measure:
+                    self._place_rows()
+                    break
+
+                # Изменение высоты строк выше окна не должно сдвигать видимое
+                anchor = self._anchor()
+                self.canvas.update_idletasks()
+                changed = False
+                for key in measure:
+                    height = self._rows[key][0].winfo_reqheight()
+                    if self._heights.get(key) != height:
+                        self._heights[key] = height
+                        changed = True
+
+                if changed:
+                    self._compute_offsets()
+                    self._update_scrollregion()
+                    if anchor:
+                        self._restore_anchor(anchor)
+                self._place_rows()
+                if not changed:
+                    break
+        finally:
+            self._rendering = False
+
+    def _place_rows(self):
+        for key, (_, window, _) in self._rows.items():
+            self.canvas.coords(window, self.padx, self._offsets[self._index[key]])
+
+    def _bind(self, key, item) -> list:
+        """Виджет для строки: из пула (если update_row согласен) или новый."""
+        while self._pool:
+            widget, window = self._pool.pop()
+            if self._update_row(widget, item, False):
+                self.canvas.itemconfigure(window, state='normal', width=self._row_width())
+                return [widget, window, item]
+            self.canvas.delete(window)
+            widget.destroy()
+
+        widget = self._create_row(self.canvas, item)
+        window = self.canvas.create_window(self.padx, 0, window=widget, anchor='nw',
+                                           width=self._row_width())
+        return [widget, window, item]
+
+    def _release(self, key):
+        """Строка ушла из вида: в пул или уничтожение."""
+        widget, window, _ = self._rows.pop(key)
+        self._dirty.discard(key)
+        if self._release_row:
+            self._release_row(widget, key)
+        if self.recycle and len(self._pool) < VIRTUAL_LIST_POOL_SIZE:
+            self.canvas.itemconfigure(window, state='hidden')
+            self._pool.append((widget, window))
+        else:
+            self.canvas.delete(window)
+            widget.destroy()
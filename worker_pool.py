@@ -0,0 +1,238 @@
+"""
+Worker Pool - общий пул фоновых задач вместо отдельного потока на каждое действие.
+
+- Классы приоритета: interactive > detection > preload > news. Свободный
+  поток всегда берёт самую приоритетную задачу. Выполняющиеся задачи не
+  прерываются, поэтому: один поток - только под interactive, один - под
+  interactive и detection, а долгих фоновых задач (preload, news)
+  одновременно выполняется не больше WORKER_POOL_BACKGROUND_LIMIT. Клик
+  пользователя и опрос составов не ждут предзагрузку, новости или AI.
+- Дедупликация по key: повторная задача с тем же key, пока прежняя в
+  очереди или выполняется, не ставится (быстрые повторные клики не
+  дублируют сетевые и AI запросы). Если новая важнее - ожидающая
+  задача повышается в приоритете.
+- CancelToken: отмена при закрытии окна или смене даты. Отменённая задача
+  из очереди не запускается; выполняющаяся проверяет token сама
+  (token.cancelled) в точках, где можно остановиться.
+- Статистика: глубина очереди по классам, выполняется, ожидание в очереди.
+"""
+
+import time
+import heapq
+import itertools
+import threading
+
+# Классы приоритета (меньше - важнее)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DETECTION = 1
+PRIORITY_PRELOAD = 2
+PRIORITY_NEWS = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_DETECTION: 'detection',
+    PRIORITY_PRELOAD: 'preload',
+    PRIORITY_NEWS: 'news',
+}
+
+# Потоков всего / из них только для interactive / для interactive и detection
+WORKER_POOL_SIZE = 5
+WORKER_POOL_INTERACTIVE_RESERVED = 1
+WORKER_POOL_DETECTION_RESERVED = 1
+
+# Фоновых задач (preload, news) одновременно - остальные потоки свободны для важных
+WORKER_POOL_BACKGROUND_LIMIT = 2
+
+
+class CancelToken:
+    """Флаг отмены, общий для группы задач (окно, выбранная дата)."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: str = ''):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class Task:
+    """Задача пула."""
+
+    def __init__(self, fn, args, kwargs, priority, key, token, seq):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.token = token
+        self.seq = seq
+        self.state = 'queued'  # queued / running / done / failed / cancelled
+        self.submitted_at = time.perf_counter()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token is not None and self.token.cancelled
+
+    @property
+    def active(self) -> bool:
+        return self.state in ('queued', 'running') and not self.cancelled
+
+
+class WorkerPool:
+    """Ограниченный пул потоков с приоритетами, дедупликацией и отменой."""
+
+    def __init__(self, workers=WORKER_POOL_SIZE, interactive_reserved=WORKER_POOL_INTERACTIVE_RESERVED,
+                 detection_reserved=WORKER_POOL_DETECTION_RESERVED, background_limit=WORKER_POOL_BACKGROUND_LIMIT):
+        self._cond = threading.Condition()
+        self.background_limit = background_limit
+        self._background_running = 0
+        self._heap = []          # (priority, seq, task)
+        self._seq = itertools.count()
+        self._by_key = {}        # key -> Task (в очереди или выполняется)
+        self._running = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0,
+            'deduplicated': 0, 'promoted': 0,
+            'wait_ms': {name: [0, 0.0, 0.0] for name in PRIORITY_NAMES.values()},  # [count, total, max]
+        }
+
+        for i in range(workers):
+            # Самый низкий класс, который берёт поток
+            if i < interactive_reserved:
+                max_priority = PRIORITY_INTERACTIVE
+            elif i < interactive_reserved + detection_reserved:
+                max_priority = PRIORITY_DETECTION
+            else:
+                max_priority = max(PRIORITY_NAMES)
+            role = PRIORITY_NAMES[max_priority] if max_priority != max(PRIORITY_NAMES) else 'worker'
+            thread = threading.Thread(target=self._worker_loop, args=(max_priority,),
+                                      name=f"pool-{role}-{i}", daemon=True)
+            thread.start()
+
+    def submit(self, fn, *args, priority=PRIORITY_PRELOAD, key=None, token=None, **kwargs) -> Task:
+        """
+        Поставить задачу в очередь.
+
+        Args:
+            fn, args, kwargs: Функция и её аргументы
+            priority: PRIORITY_INTERACTIVE / _DETECTION / _PRELOAD / _NEWS
+            key: Ключ дедупликации (None - без дедупликации)
+            token: CancelToken группы задачи
+
+        Returns:
+            Task (существующая, если задача с тем же key уже в работе)
+        """
+        with self._cond:
+            existing = self._by_key.get(key) if key is not None else None
+            if existing is not None and existing.active:
+                self.stats['deduplicated'] += 1
+                if existing.state == 'queued' and priority < existing.priority:
+                    # Старая запись в куче станет устаревшей (seq не совпадёт)
+                    existing.priority = priority
+                    existing.seq = next(self._seq)
+                    heapq.heappush(self._heap, (priority, existing.seq, existing))
+                    self.stats['promoted'] += 1
+                    self._cond.notify_all()
+                return existing
+
+            task = Task(fn, args, kwargs, priority, key, token, next(self._seq))
+            if key is not None:
+                self._by_key[key] = task
+            heapq.heappush(self._heap, (priority, task.seq, task))
+            self.stats['submitted'] += 1
+            self._cond.notify_all()
+            return task
+
+    def _next_task(self, max_priority):
+        """Самая приоритетная задача для потока (под self._cond) или None."""
+        while self._heap:
+            priority, seq, task = self._heap[0]
+            if task.state != 'queued' or seq != task.seq:
+                heapq.heappop(self._heap)  # Устаревшая запись (повышена или уже взята)
+                continue
+            if task.cancelled:
+                heapq.heappop(self._heap)
+                self._finish(task, 'cancelled')
+                continue
+            if priority > max_priority:
+                return None
+            if priority >= PRIORITY_PRELOAD and self._background_running >= self.background_limit:
+                return None  # Дальше в куче - только фоновые задачи
+            heapq.heappop(self._heap)
+            return task
+        return None
+
+    def _finish(self, task, state):
+        task.state = state
+        self.stats[state] += 1
+        if task.key is not None and self._by_key.get(task.key) is task:
+            del self._by_key[task.key]
+
+    def _worker_loop(self, max_priority):
+        while True:
+            with self._cond:
+                task = self._next_task(max_priority)
+                while task is None:
+                    self._cond.wait()
+                    task = self._next_task(max_priority)
+                task.state = 'running'
+                name = PRIORITY_NAMES[task.priority]
+                background = task.priority >= PRIORITY_PRELOAD
+                self._running[name] += 1
+                if background:
+                    self._background_running += 1
+                wait = self.stats['wait_ms'][name]
+                waited = (time.perf_counter() - task.submitted_at) * 1000
+                wait[0] += 1
+                wait[1] += waited
+                wait[2] = max(wait[2], waited)
+
+            state = 'completed'
+            try:
+                task.fn(*task.args, **task.kwargs)
+            except Exception as e:
+                state = 'failed'
+                print(f"[POOL] Ошибка задачи {task.key or task.fn.__name__}: {e}")
+
+            with self._cond:
+                self._running[name] -= 1
+                if background:
+                    self._background_running -= 1
+                    self._cond.notify_all()  # Освободилось место для следующей фоновой задачи
+                self._finish(task, 'cancelled' if task.cancelled and state == 'completed' else state)
+
+    def get_queue_depth(self) -> dict:
+        """Задач в очереди по классам приоритета."""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        with self._cond:
+            for priority, seq, task in self._heap:
+                if task.state == 'queued' and seq == task.seq and not task.cancelled:
+                    depth[PRIORITY_NAMES[priority]] += 1
+        return depth
+
+    def get_status_report(self) -> str:
+        """Текстовый отчёт: очередь, выполняемые задачи, ожидание по классам."""
+        depth = self.get_queue_depth()
+        with self._cond:
+            running = dict(self._running)
+            stats = {k: v for k, v in self.stats.items() if k != 'wait_ms'}
+            wait_ms = {name: list(values) for name, values in self.stats['wait_ms'].items()}
+
+        lines = ["Worker pool", ""]
+        header = f"{'class':<13}{'queued':>8}{'running':>9}{'avg wait':>10}{'max wait':>10}"
+        lines.append(header)
+        lines.append('-' * len(header))
+        for name in PRIORITY_NAMES.values():
+            count, total, longest = wait_ms[name]
+            avg = f"{total / count:>8.0f}ms" if count else f"{'-':>10}"
+            lines.append(f"{name:<13}{depth[name]:>8}{running[name]:>9}{avg}{longest:>8.0f}ms")
+        lines.append("")
+        lines.append(f"submitted {stats['submitted']}, completed {stats['completed']}, failed {stats['failed']}, "
+                     f"cancelled {stats['cancelled']}, deduplicated {stats['deduplicated']}, "
+                     f"promoted {stats['promoted']}")
+        return "\n".join(lines)